@@ -0,0 +1,13 @@
+import os
+
+# Importing `server` builds SETTINGS, which requires the Azure OpenAI and Bing configuration. Benchmarks
+# never reach the real services, so placeholders are enough when nothing is configured.
+for _key, _value in {
+    "AZURE_OPENAI_DEPLOYMENT_NAME_GPT4": "fake-gpt",
+    "AZURE_OPENAI_API_KEY": "fake-key",
+    "AZURE_OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OPENAI_API_VERSION": "2024-02-01",
+    "AZURE_BING_SEARCH_END_POINT": "http://127.0.0.1:9/v7.0/search",
+    "AZURE_BING_SEARCH_SUBSCRIPTION_KEY": "fake-key",
+}.items():
+    os.environ.setdefault(_key, _value)
@@ -0,0 +1,109 @@
+"""
+Deterministic synthetic HTML corpus used by the benchmarks.
+
+Pages mimic real article markup: navigation, inline scripts and styles, tracking pixels,
+attribute-heavy wrappers, an article body with headings, lists and tables, and a footer.
+"""
+import hashlib
+import random
+from typing import Dict, List
+
+
+WORDS = (
+    "innovation community leadership members credit union insurance growth mindset digital "
+    "strategy collaboration inclusive financial wellbeing customers research teams product "
+    "platform data experience future technology culture trust impact service market value"
+).split()
+
+# Page sizes (approximate bytes) representative of what Bing returns for news/blog sources
+DEFAULT_SIZES = (20_000, 80_000, 250_000, 800_000, 2_000_000)
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return (
+        f'<p class="article-body__paragraph" data-track-id="{rng.randint(1, 10**6)}" style="margin:0 0 1em">'
+        + " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+        + "</p>"
+    )
+
+
+def _section(rng: random.Random, index: int) -> str:
+    parts = [f'<h2 id="section-{index}" class="heading heading--h2">{_sentence(rng, 6)}</h2>']
+    parts.extend(_paragraph(rng) for _ in range(rng.randint(2, 5)))
+    if rng.random() < 0.5:
+        items = "".join(f'<li class="list__item"><a href="/t/{rng.choice(WORDS)}">{_sentence(rng, 8)}</a></li>' for _ in range(5))
+        parts.append(f'<ul class="list list--bullets">{items}</ul>')
+    if rng.random() < 0.3:
+        rows = "".join(
+            "<tr>" + "".join(f"<td class=\"cell\">{rng.randint(1, 999)}</td>" for _ in range(4)) + "</tr>"
+            for _ in range(6)
+        )
+        parts.append(f'<table class="data-table"><thead><tr><th>A</th><th>B</th><th>C</th><th>D</th></tr></thead><tbody>{rows}</tbody></table>')
+    if rng.random() < 0.4:
+        parts.append(f'<img src="https://cdn.example.com/{rng.randint(1, 10**6)}.jpg" alt="{_sentence(rng, 4)}" loading="lazy">')
+        parts.append(f'<script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"section":{index}}});</script>')
+    return '<section class="article-section">' + "".join(parts) + "</section>"
+
+
+def generate_page(name: str, size: int) -> str:
+    """
+    Generates a deterministic HTML page of roughly `size` bytes.
+
+    Args:
+        name (str): Seed for the page content.
+        size (int): Approximate size in bytes.
+
+    Returns:
+        str: The HTML document.
+    """
+    rng = random.Random(hashlib.sha256(name.encode()).hexdigest())
+    head = (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{_sentence(rng, 7)}</title>"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+        "<link rel=\"stylesheet\" href=\"/static/site.css\">"
+        "<style>.article-body__paragraph{font-size:1rem;line-height:1.6}.nav a{color:#333}</style>"
+        "<script async src=\"https://www.googletagmanager.com/gtag/js\"></script>"
+        "</head>"
+    )
+    nav = "<nav class=\"nav\" role=\"navigation\"><ul>" + "".join(
+        f"<li class=\"nav__item\"><a class=\"nav__link\" href=\"/{word}\">{word.title()}</a></li>" for word in WORDS[:12]
+    ) + "</ul></nav>"
+    footer = "<footer class=\"site-footer\"><p>&copy; Example Media. All rights reserved.</p></footer>"
+
+    body_parts: List[str] = [f"<header class=\"masthead\"><h1 class=\"headline\">{_sentence(rng, 9)}</h1></header>"]
+    length = len(head) + len(nav) + len(footer) + 64
+    index = 0
+    while length < size:
+        section = _section(rng, index)
+        body_parts.append(section)
+        length += len(section)
+        index += 1
+
+    return (
+        head + "<body class=\"page page--article\">" + nav
+        + "<main id=\"main\"><article class=\"article\">" + "".join(body_parts) + "</article></main>"
+        + footer + "</body></html>"
+    )
+
+
+def build_corpus(sizes=DEFAULT_SIZES, pages_per_size: int = 3) -> Dict[str, str]:
+    """
+    Builds a named corpus of pages covering a range of sizes.
+
+    Args:
+        sizes (Sequence[int]): Approximate page sizes in bytes.
+        pages_per_size (int): Number of distinct pages per size.
+
+    Returns:
+        Dict[str, str]: Mapping of page name to HTML.
+    """
+    return {
+        f"page-{size // 1000}k-{i}": generate_page(f"page-{size}-{i}", size)
+        for size in sizes
+        for i in range(pages_per_size)
+    }
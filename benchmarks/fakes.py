@@ -0,0 +1,229 @@
+"""
+Local stand-ins for the external services the pipeline depends on, so benchmarks run offline:
+
+- a Bing Web Search v7 stub returning results that point at the local corpus server,
+- a static HTML corpus server generating deterministic article pages,
+- an OpenAI/Azure OpenAI compatible chat completions endpoint with configurable latency
+  and token generation rate (streaming and non-streaming).
+"""
+import asyncio
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+
+from .corpus import DEFAULT_SIZES, WORDS, generate_page
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """
+    Runs an ASGI app with uvicorn on a background thread.
+    """
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None) -> None:
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Fake server on port {self.port} did not start.")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def create_corpus_app(page_size: Optional[int] = None) -> FastAPI:
+    """
+    Serves deterministic HTML pages at /pages/{name}. Unless `page_size` is fixed, each page
+    name maps to one of the corpus' representative sizes.
+    """
+    app = FastAPI()
+
+    @lru_cache(maxsize=256)
+    def render(name: str) -> str:
+        size = page_size or DEFAULT_SIZES[int(hashlib.sha256(name.encode()).hexdigest(), 16) % len(DEFAULT_SIZES)]
+        return generate_page(name, size)
+
+    @app.get("/pages/{name:path}")
+    async def page(name: str):
+        return HTMLResponse(render(name))
+
+    return app
+
+
+def create_bing_app(corpus_url: str, latency: float = 0.05) -> FastAPI:
+    """
+    Emulates the Bing Web Search v7 response shape. Results for `<topic> site:<domain>` point to
+    corpus pages namespaced by domain, so the same query always yields the same URLs.
+    """
+    app = FastAPI()
+
+    @app.get("/{path:path}")
+    async def search(request: Request, path: str):
+        await asyncio.sleep(latency)
+        query = request.query_params.get("q", "")
+        count = int(request.query_params.get("count", 10))
+        site = next((part[5:] for part in query.split() if part.startswith("site:")), "example.com")
+        slug = hashlib.sha1(query.encode()).hexdigest()[:10]
+        value = [
+            {
+                "name": f"{query} result {i}",
+                "url": f"{corpus_url}/pages/{site}/{slug}-{i}",
+                "snippet": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(25)),
+                "displayUrl": f"{site}/{slug}-{i}",
+                "dateLastCrawled": "2024-01-01T00:00:00.0000000Z",
+                "isFamilyFriendly": True,
+                "language": "en",
+            }
+            for i in range(count)
+        ]
+        body = {
+            "_type": "SearchResponse",
+            "webPages": {"totalEstimatedMatches": count, "value": value},
+            "relatedSearches": {"value": [{"text": f"{query} news", "url": f"https://www.bing.com/search?q={query}+news"}]},
+        }
+        # Like Bing, only the requested answer types are returned
+        response_filter = request.query_params.get("responseFilter")
+        if response_filter:
+            wanted = {answer.strip().lower() for answer in response_filter.split(",")}
+            body = {key: answer for key, answer in body.items() if key == "_type" or key.lower() in wanted}
+        return JSONResponse(body)
+
+    return app
+
+
+POST_BODY = (
+    "Innovation is not a department, it is a habit. This article reminds us that the organisations that "
+    "thrive are the ones that make room for curiosity at every level. "
+)
+
+
+def _completion_text(messages) -> str:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    if "Paragraphs to Revise" in prompt:
+        # Paragraph-level edits: one revised paragraph per paragraph sent, separated by `---`
+        return "\n---\n".join(POST_BODY for _ in re.findall(r"\[Revise \d+\]", prompt))
+    if "LinkedIn post" in system or "social media post" in system:
+        paragraphs = [POST_BODY * 4 for _ in range(4)]
+        return "\n\n".join(paragraphs) + "\n\nHow is your team making space for new ideas?\n\n#Innovation #Leadership #TruStage"
+    if "Markdown" in system:
+        return "# Article\n\n" + "\n\n".join(" ".join(WORDS[i:i + 20]) for i in range(0, len(WORDS), 5))
+    return "# **Summary**\n\n" + "\n".join(f"- Point {i}: {' '.join(WORDS[i:i + 8])}" for i in range(5))
+
+
+def create_llm_app(latency: float = 0.2, tokens_per_second: float = 80.0) -> FastAPI:
+    """
+    An OpenAI compatible `/chat/completions` endpoint (any path, so the Azure
+    `/openai/deployments/{model}/chat/completions` route works too). Each call waits for
+    `latency` seconds to first token, then generates tokens at `tokens_per_second`.
+    """
+    app = FastAPI()
+
+    @app.post("/{path:path}")
+    async def chat_completions(request: Request, path: str):
+        payload = await request.json()
+        messages = payload.get("messages", [])
+        text = _completion_text(messages)
+        words = text.split(" ")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = int(len(words) * 1.3)
+        model = payload.get("model", "fake-gpt")
+
+        if payload.get("stream"):
+            async def stream():
+                await asyncio.sleep(latency)
+                for word in words:
+                    await asyncio.sleep(1.3 / tokens_per_second)
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency + completion_tokens / tokens_per_second)
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    return app
+
+
+class FakeServices:
+    """
+    Starts the Bing stub, corpus server and fake LLM, and exposes the environment the app needs
+    to point at them.
+    """
+
+    def __init__(self, llm_latency: float = 0.2, llm_tokens_per_second: float = 80.0,
+                 bing_latency: float = 0.05, page_size: Optional[int] = None) -> None:
+        self.corpus = BackgroundServer(create_corpus_app(page_size))
+        self.bing = BackgroundServer(create_bing_app(self.corpus.url, bing_latency))
+        self.llm = BackgroundServer(create_llm_app(llm_latency, llm_tokens_per_second))
+
+    def start(self) -> "FakeServices":
+        for server in (self.corpus, self.bing, self.llm):
+            server.start()
+        return self
+
+    def stop(self) -> None:
+        for server in (self.llm, self.bing, self.corpus):
+            server.stop()
+
+    def environment(self) -> dict:
+        return {
+            "AZURE_OPENAI_DEPLOYMENT_NAME_GPT4": "fake-gpt",
+            "AZURE_OPENAI_API_KEY": "fake-key",
+            "AZURE_OPENAI_ENDPOINT": self.llm.url,
+            "AZURE_OPENAI_API_VERSION": "2024-02-01",
+            "AZURE_BING_SEARCH_END_POINT": f"{self.bing.url}/v7.0/search",
+            "AZURE_BING_SEARCH_SUBSCRIPTION_KEY": "fake-key",
+            "NO_PROXY": "127.0.0.1,localhost",
+        }
+
+    def __enter__(self) -> "FakeServices":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def source_domains(count: int):
+    """
+    Returns `count` distinct fake source domains.
+    """
+    return [f"source{i}.example.com" for i in range(count)]
@@ -0,0 +1,109 @@
+"""
+HTML processing microbenchmark.
+
+Measures parse and clean time and peak Python heap per parser backend over a representative
+corpus (synthetic by default, or a directory of saved .html pages), and checks each backend's
+cleaned output against the 'html.parser' baseline.
+
+Usage:
+    python -m benchmarks.html_processing
+    python -m benchmarks.html_processing --corpus-dir ./saved_pages --repeat 5 --json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+from server.agents.workflow_agents.web_extraction.parsers import BACKENDS, DEFAULT_BACKEND
+
+from .corpus import build_corpus
+
+
+def load_corpus(corpus_dir: str = None) -> Dict[str, bytes]:
+    if corpus_dir:
+        return {path.name: path.read_bytes() for path in sorted(Path(corpus_dir).glob("*.html"))}
+    return {name: html.encode("utf-8") for name, html in build_corpus().items()}
+
+
+def measure(backend, html: bytes, repeat: int) -> Dict:
+    parse_times: List[float] = []
+    clean_times: List[float] = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = backend.parse(html)
+        parsed = time.perf_counter()
+        output = backend.clean(body)
+        parse_times.append(parsed - start)
+        clean_times.append(time.perf_counter() - parsed)
+
+    # Memory is measured on a separate run so tracing overhead does not skew the timings
+    tracemalloc.start()
+    backend.clean(backend.parse(html))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "parse_ms": statistics.median(parse_times) * 1000,
+        "clean_ms": statistics.median(clean_times) * 1000,
+        "peak_kb": peak / 1024,
+        "output": output,
+    }
+
+
+def run(corpus: Dict[str, bytes], backends: List[str], repeat: int) -> List[Dict]:
+    rows = []
+    baseline = BACKENDS[DEFAULT_BACKEND]
+    for name, html in corpus.items():
+        expected = baseline.clean(baseline.parse(html))
+        for backend_name in backends:
+            result = measure(BACKENDS[backend_name], html, repeat)
+            output = result.pop("output")
+            rows.append({
+                "page": name,
+                "bytes": len(html),
+                "backend": backend_name,
+                **{key: round(value, 2) for key, value in result.items()},
+                "identical": output == expected,
+            })
+    return rows
+
+
+def format_rows(rows: List[Dict]) -> str:
+    header = f"{'page':<24} {'bytes':>9} {'backend':<12} {'parse ms':>9} {'clean ms':>9} {'peak KB':>9}  identical"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['page']:<24} {row['bytes']:>9} {row['backend']:<12} {row['parse_ms']:>9.2f} "
+            f"{row['clean_ms']:>9.2f} {row['peak_kb']:>9.0f}  {row['identical']}"
+        )
+
+    lines.append("")
+    lines.append("totals per backend:")
+    for backend_name in dict.fromkeys(row["backend"] for row in rows):
+        subset = [row for row in rows if row["backend"] == backend_name]
+        total = sum(row["parse_ms"] + row["clean_ms"] for row in subset)
+        lines.append(f"  {backend_name:<12} {total:>10.1f} ms  identical={all(row['identical'] for row in subset)}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-dir", help="Directory of .html files to use instead of the synthetic corpus.")
+    parser.add_argument("--backend", action="append", help="Backend to measure (default: all installed).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per page.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    backends = args.backend or [name for name, backend in BACKENDS.items() if backend.available]
+    rows = run(load_corpus(args.corpus_dir), backends, args.repeat)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
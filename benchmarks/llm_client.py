@@ -0,0 +1,121 @@
+"""
+LLM call path microbenchmark.
+
+Compares the two ways the extraction and summary agents can call the LLM against the local fake
+chat completions endpoint: an autogen `AssistantAgent.a_generate_reply` (the agent framework,
+with its synchronous OpenAI client run in a thread) and the thin async `LLMClient` with pooled
+connections (`LLM_CLIENT_ENABLED`). The fake answers after a fixed latency, so the difference is
+the client's own overhead. Reports median and p95 latency per call, throughput and the overhead
+over the fake's latency, at several concurrency levels.
+
+Usage:
+    python -m benchmarks.llm_client
+    python -m benchmarks.llm_client --concurrency 1 --concurrency 32 --calls 200 --json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from .fakes import BackgroundServer, create_llm_app
+
+SYSTEM_PROMPT = "Convert the web page to Markdown."
+PROMPT = "<html><body><h1>Article</h1><p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p></body></html>"
+
+
+def llm_config(url: str) -> Dict[str, str]:
+    return {
+        "model": "fake-gpt",
+        "api_key": "fake-key",
+        "base_url": url,
+        "api_type": "azure",
+        "api_version": "2024-02-01",
+    }
+
+
+async def measure(call: Callable[[], Awaitable[object]], calls: int, concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    times: List[float] = []
+
+    async def timed() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            times.append(time.perf_counter() - start)
+
+    # One call first, so connection set-up and lazy imports are not counted
+    await call()
+    start = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    times.sort()
+    return {
+        "p50_ms": statistics.median(times) * 1000,
+        "p95_ms": times[int(len(times) * 0.95) - 1] * 1000,
+        "calls_per_s": calls / elapsed,
+    }
+
+
+async def run_path(path: str, config: Dict[str, str], calls: int, concurrency: int) -> Dict:
+    messages = [{"content": SYSTEM_PROMPT, "role": "system"}, {"content": PROMPT, "role": "user"}]
+    if path == "autogen":
+        from autogen import AssistantAgent
+
+        agent = AssistantAgent(name="Benchmark", system_message=SYSTEM_PROMPT, llm_config={**config, "cache_seed": None})
+        return await measure(lambda: agent.a_generate_reply(messages=messages[1:]), calls, concurrency)
+
+    from server.utils.llm import LLMClient
+
+    client = LLMClient(config, max_connections=max(concurrency, 1))
+    try:
+        return await measure(lambda: client.complete(messages, agent="benchmark"), calls, concurrency)
+    finally:
+        await client.aclose()
+
+
+def run(concurrency_levels: List[int], calls: int, latency: float) -> List[Dict]:
+    server = BackgroundServer(create_llm_app(latency=latency, tokens_per_second=1e6)).start()
+    try:
+        rows = []
+        for concurrency in concurrency_levels:
+            for path in ("autogen", "client"):
+                result = asyncio.run(run_path(path, llm_config(server.url), calls, concurrency))
+                rows.append({
+                    "concurrency": concurrency, "path": path,
+                    **{key: round(value, 3) for key, value in result.items()},
+                    "overhead_ms": round(result["p50_ms"] - latency * 1000, 3),
+                })
+        return rows
+    finally:
+        server.stop()
+
+
+def format_rows(rows: List[Dict]) -> str:
+    header = f"{'conc':>5} {'path':<8} {'p50 ms':>9} {'p95 ms':>9} {'calls/s':>9} {'overhead ms':>12}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['concurrency']:>5} {row['path']:<8} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f}"
+            f" {row['calls_per_s']:>9.1f} {row['overhead_ms']:>12.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, action="append", help="Calls in flight at once (default: 1, 8, 32).")
+    parser.add_argument("--calls", type=int, default=100, help="Timed calls per path and concurrency.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake LLM takes per call.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    rows = run(args.concurrency or [1, 8, 32], args.calls, args.latency)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Offline end-to-end load test.
+
+Boots the FastAPI app in a subprocess pointed at local fakes (Bing stub, HTML corpus server and
+fake LLM), drives `/api/v1/content/{req_id}/get-content` and/or `/edit-content` at a fixed
+concurrency and reports throughput, latency percentiles, time-to-first-event and peak RSS.
+
+Usage:
+    python -m benchmarks.load_test --scenario get --requests 50 --concurrency 10
+    python -m benchmarks.load_test --scenario mixed --llm-latency 0.5 --llm-tps 60 --json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from .fakes import FakeServices, free_port, source_domains
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+TOPICS = [
+    "innovation in financial services",
+    "building inclusive communities",
+    "growth mindset in leadership",
+    "digital transformation for credit unions",
+    "customer trust and data privacy",
+]
+
+SAMPLE_POST = (
+    "Innovation is not just about new ideas, it is about creating space for people to try them.\n\n"
+    "This week I read a piece on how small, steady improvements compound into real change.\n\n"
+    "How is your team making room for experimentation?\n\n#Innovation #Leadership #TruStage"
+)
+
+
+@dataclass
+class RequestResult:
+    endpoint: str
+    status: int
+    latency: float
+    time_to_first_event: Optional[float]
+    events: int
+    error: Optional[str] = None
+
+
+@dataclass
+class Report:
+    scenario: str
+    concurrency: int
+    duration: float
+    results: List[RequestResult] = field(default_factory=list)
+    peak_rss_bytes: Optional[int] = None
+
+    def summary(self) -> Dict:
+        ok = [r for r in self.results if r.status == 200 and r.error is None]
+        latencies = sorted(r.latency for r in ok)
+        ttfe = sorted(r.time_to_first_event for r in ok if r.time_to_first_event is not None)
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": len(self.results),
+            "succeeded": len(ok),
+            "failed": len(self.results) - len(ok),
+            "duration_s": round(self.duration, 3),
+            "throughput_rps": round(len(ok) / self.duration, 3) if self.duration else 0.0,
+            "latency_s": {p: percentile(latencies, q) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+            "time_to_first_event_s": {p: percentile(ttfe, q) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+            "peak_rss_mb": round(self.peak_rss_bytes / 2**20, 1) if self.peak_rss_bytes else None,
+        }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return round(values[index], 4)
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    """
+    Returns the peak resident set size of a process and its children (Linux only).
+    """
+    pids = [pid]
+    children_file = Path(f"/proc/{pid}/task/{pid}/children")
+    if children_file.exists():
+        pids.extend(int(child) for child in children_file.read_text().split())
+
+    total = 0
+    for process_id in pids:
+        try:
+            for line in Path(f"/proc/{process_id}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    total += int(line.split()[1]) * 1024
+        except FileNotFoundError:
+            continue
+    return total or None
+
+
+class AppProcess:
+    """
+    Runs the service with uvicorn in a subprocess using the fake services' environment.
+    """
+
+    def __init__(self, environment: Dict[str, str], extra_args: Optional[List[str]] = None) -> None:
+        self.port = free_port()
+        self.environment = {**os.environ, **environment}
+        self.extra_args = extra_args or []
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60.0) -> "AppProcess":
+        command = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+                   "--port", str(self.port), "--log-level", "warning", *self.extra_args]
+        self.process = subprocess.Popen(command, cwd=REPO_ROOT, env=self.environment)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App exited during startup with code {self.process.returncode}.")
+            try:
+                if httpx.get(f"{self.url}/api/health", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("App did not become healthy in time.")
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def stream_request(client: httpx.AsyncClient, endpoint: str, url: str, payload: Dict) -> RequestResult:
+    start = time.perf_counter()
+    first_event = None
+    events = 0
+    try:
+        async with client.stream("POST", url, json=payload, headers={"user": "loadtest"}) as response:
+            async for chunk in response.aiter_text():
+                if not chunk:
+                    continue
+                if first_event is None:
+                    first_event = time.perf_counter() - start
+                events += 1
+            return RequestResult(endpoint, response.status_code, time.perf_counter() - start, first_event, events)
+    except httpx.HTTPError as e:
+        return RequestResult(endpoint, 0, time.perf_counter() - start, first_event, events, error=str(e))
+
+
+def build_requests(scenario: str, count: int, sources: List[str]) -> List[tuple]:
+    requests = []
+    for i in range(count):
+        req_id = uuid.uuid4().hex
+        use_edit = scenario == "edit" or (scenario == "mixed" and i % 3 == 2)
+        if use_edit:
+            requests.append(("edit-content", f"/api/v1/content/{req_id}/edit-content",
+                             {"feedback": "Make the opening more direct.", "postContent": SAMPLE_POST}))
+        else:
+            requests.append(("get-content", f"/api/v1/content/{req_id}/get-content",
+                             {"topic": TOPICS[i % len(TOPICS)], "sources": sources}))
+    return requests
+
+
+async def drive(base_url: str, scenario: str, count: int, concurrency: int, sources: List[str],
+                timeout: float) -> Report:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def run_one(endpoint: str, path: str, payload: Dict) -> RequestResult:
+            async with semaphore:
+                return await stream_request(client, endpoint, path, payload)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(*request) for request in build_requests(scenario, count, sources)))
+        duration = time.perf_counter() - start
+
+    return Report(scenario=scenario, concurrency=concurrency, duration=duration, results=list(results))
+
+
+def format_report(summary: Dict) -> str:
+    lines = [
+        f"scenario={summary['scenario']} concurrency={summary['concurrency']} "
+        f"requests={summary['requests']} ok={summary['succeeded']} failed={summary['failed']}",
+        f"throughput: {summary['throughput_rps']} req/s over {summary['duration_s']} s",
+        "latency:    " + "  ".join(f"{k}={v}s" for k, v in summary["latency_s"].items()),
+        "first evt:  " + "  ".join(f"{k}={v}s" for k, v in summary["time_to_first_event_s"].items()),
+        f"peak RSS:   {summary['peak_rss_mb']} MB",
+    ]
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["get", "edit", "mixed"], default="get")
+    parser.add_argument("--requests", type=int, default=20, help="Total number of requests to issue.")
+    parser.add_argument("--concurrency", type=int, default=5, help="Requests in flight at once.")
+    parser.add_argument("--sources", type=int, default=2, help="Number of source domains per get-content request.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token (s).")
+    parser.add_argument("--llm-tps", type=float, default=80.0, help="Fake LLM generation rate (tokens/s).")
+    parser.add_argument("--bing-latency", type=float, default=0.05, help="Fake Bing response latency (s).")
+    parser.add_argument("--page-size", type=int, default=None, help="Fix corpus page size in bytes.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout (s).")
+    parser.add_argument("--app-arg", action="append", default=[], help="Extra argument passed to uvicorn.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with FakeServices(args.llm_latency, args.llm_tps, args.bing_latency, args.page_size) as fakes:
+        app = AppProcess(fakes.environment(), args.app_arg).start()
+        try:
+            report = asyncio.run(drive(app.url, args.scenario, args.requests, args.concurrency,
+                                       source_domains(args.sources), args.timeout))
+            report.peak_rss_bytes = peak_rss(app.process.pid)
+        finally:
+            app.stop()
+
+    summary = report.summary()
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
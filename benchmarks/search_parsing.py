@@ -0,0 +1,114 @@
+"""
+Bing response processing microbenchmark.
+
+Compares the full mode of AzureBingSearchAgent (every answer type, decoded with `json` and
+validated into Pydantic models) with the lean mode (web pages only, decoded with orjson when
+installed, compact records) for a range of result counts. Reports median decode and processing
+time and peak Python heap per search.
+
+Usage:
+    python -m benchmarks.search_parsing
+    python -m benchmarks.search_parsing --count 10 --count 50 --repeat 200 --json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from server.agents.workflow_agents.azure_bing_search import agent as bing
+from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+
+from .corpus import WORDS
+
+
+def build_response(count: int, lean: bool) -> bytes:
+    """
+    Builds a Bing Web Search v7 response with `count` web results. The full response also has the
+    related searches and images Bing returns without a response filter.
+    """
+    words = WORDS
+    value = [
+        {
+            "id": f"https://api.bing.microsoft.com/api/v7/#WebPages.{i}",
+            "name": f"{words[i % len(words)]} result {i}",
+            "url": f"https://example.com/articles/{i}",
+            "isFamilyFriendly": True,
+            "displayUrl": f"example.com/articles/{i}",
+            "snippet": " ".join(words[(i + j) % len(words)] for j in range(40)),
+            "deepLinks": [{"name": f"section {k}", "url": f"https://example.com/articles/{i}#{k}"} for k in range(4)],
+            "dateLastCrawled": "2024-01-01T00:00:00.0000000Z",
+            "language": "en",
+            "isNavigational": False,
+        }
+        for i in range(count)
+    ]
+    body = {"_type": "SearchResponse", "webPages": {"totalEstimatedMatches": 1000, "value": value}}
+    if not lean:
+        body["relatedSearches"] = {"value": [
+            {"text": f"related {i}", "displayText": f"related {i}", "webSearchUrl": "https://www.bing.com/search?q=r"}
+            for i in range(8)
+        ]}
+        body["images"] = {"value": [
+            {"name": f"image {i}", "contentUrl": f"https://example.com/{i}.jpg",
+             "thumbnailUrl": f"https://tse.mm.bing.net/th?id={i}", "width": 1200, "height": 800}
+            for i in range(10)
+        ]}
+    return json.dumps(body).encode()
+
+
+def measure(process: Callable[[bytes], object], payload: bytes, repeat: int) -> Dict:
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process(payload)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = process(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": statistics.median(times) * 1000, "peak_kb": peak / 1024, "results": len(result.web_results)}
+
+
+def run(counts: List[int], repeat: int) -> List[Dict]:
+    agent = AzureBingSearchAgent.__new__(AzureBingSearchAgent)
+    modes = {
+        "full": (False, lambda payload: agent.process_search_results(json.loads(payload))),
+        "lean": (True, lambda payload: AzureBingSearchAgent.process_lean_results(bing.json_loads(payload))),
+    }
+    rows = []
+    for count in counts:
+        for mode, (lean, process) in modes.items():
+            payload = build_response(count, lean)
+            rows.append({"count": count, "mode": mode, "bytes": len(payload),
+                         **{key: round(value, 3) for key, value in measure(process, payload, repeat).items()}})
+    return rows
+
+
+def format_rows(rows: List[Dict]) -> str:
+    header = f"{'count':>6} {'mode':<6} {'bytes':>9} {'ms':>9} {'peak KB':>9}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(f"{row['count']:>6} {row['mode']:<6} {row['bytes']:>9} {row['ms']:>9.3f} {row['peak_kb']:>9.1f}")
+    lines.append("")
+    lines.append(f"lean decoder: {bing.json_loads.__module__}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, action="append", help="Web results per response (default: 2, 10, 50).")
+    parser.add_argument("--repeat", type=int, default=100, help="Timed repetitions per mode.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    rows = run(args.count or [2, 10, 50], args.repeat)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Start-up benchmark.
+
+Measures, in fresh interpreters, the cumulative import time of `server` and `server.setting` (as
+reported by `python -X importtime`), which heavy dependencies importing `server` pulls in, and the
+time to construct `Settings()` from a fresh environment snapshot and read the settings used on the
+request path.
+
+The run fails (exit code 1) when importing `server` takes longer than the import-time budget, or
+regresses by more than the allowed fraction against a baseline saved with `--json`.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --json > startup.json
+    python -m benchmarks.startup --baseline startup.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Budget for `import server` in a fresh interpreter. The heavy dependencies below are imported on
+# first use or by the warmup, so they should not count towards it.
+IMPORT_BUDGET_MS = 1000.0
+HEAVY_DEPENDENCIES = ("autogen", "openai", "flaml", "httpx", "bs4", "azure")
+
+SETTINGS_SNIPPET = """
+import time
+from server.setting import Settings
+try:
+    from server.setting import load_environ
+    load_environ.cache_clear()
+except ImportError:  # older trees without the shared environment snapshot
+    pass
+start = time.perf_counter()
+settings = Settings()
+settings.llm_config_list
+settings.azure._bing.endpoint
+settings.web_extraction.parser_backend
+print(time.perf_counter() - start)
+"""
+
+
+def _environment() -> Dict[str, str]:
+    # The benchmarks package provides placeholder Azure OpenAI settings when none are configured
+    import benchmarks  # noqa: F401
+
+    return {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    Imports `module` in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        Dict[str, int]: Cumulative import time in microseconds for every module imported. A module
+            reported twice (a package imported as the parent of the requested module and then
+            entered again) keeps its first, innermost figure.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=_environment(), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        fields = [part.strip() for part in line[len("import time:"):].split("|")]
+        if len(fields) != 3:
+            continue
+        _, cumulative_us, name = fields
+        times.setdefault(name, int(cumulative_us))
+    return times
+
+
+def run_snippet(snippet: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=REPO_ROOT, env=_environment(),
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> Dict:
+    server_imports: List[int] = []
+    setting_imports: List[int] = []
+    settings_construction: List[float] = []
+    azure_modules = 0
+    heavy_imported: List[str] = []
+    for _ in range(runs):
+        times = import_times("server")
+        server_imports.append(times.get("server", 0))
+        heavy_imported = sorted(name for name in times if name in HEAVY_DEPENDENCIES)
+
+        times = import_times("server.setting")
+        setting_imports.append(times.get("server.setting", 0))
+        azure_modules = sum(1 for name in times if name.startswith("azure."))
+        settings_construction.append(run_snippet(SETTINGS_SNIPPET))
+
+    return {
+        "runs": runs,
+        "server_import_ms": round(statistics.median(server_imports) / 1000, 2),
+        "heavy_dependencies_imported": heavy_imported,
+        "server_setting_import_ms": round(statistics.median(setting_imports) / 1000, 2),
+        "azure_modules_imported": azure_modules,
+        "settings_first_use_ms": round(statistics.median(settings_construction) * 1000, 2),
+    }
+
+
+def check_budget(results: Dict, budget_ms: float, baseline: Optional[Dict] = None, max_regression: float = 0.2) -> List[str]:
+    """
+    Compares the `server` import time against the budget and, optionally, a previous run, and
+    checks that no heavy dependency is imported eagerly.
+
+    Args:
+        results (Dict): The output of `measure`.
+        budget_ms (float): The absolute import-time budget in milliseconds.
+        baseline (Optional[Dict]): The output of an earlier `measure` run.
+        max_regression (float): Allowed relative slowdown against the baseline, e.g. 0.2 for 20%.
+
+    Returns:
+        List[str]: A description of every exceeded threshold; empty when within budget.
+    """
+    failures = []
+    import_ms = results["server_import_ms"]
+    if import_ms > budget_ms:
+        failures.append(f"importing server took {import_ms} ms, budget is {budget_ms} ms")
+    if results.get("heavy_dependencies_imported"):
+        failures.append(f"importing server pulled in {', '.join(results['heavy_dependencies_imported'])}")
+    if baseline and baseline.get("server_import_ms"):
+        allowed = baseline["server_import_ms"] * (1 + max_regression)
+        if import_ms > allowed:
+            failures.append(
+                f"importing server took {import_ms} ms, more than {max_regression:.0%} over the "
+                f"baseline of {baseline['server_import_ms']} ms"
+            )
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement.")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Import-time budget for `server`.")
+    parser.add_argument("--baseline", help="JSON output of an earlier run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown against the baseline.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    failures = check_budget(results, args.budget_ms, baseline, args.max_regression)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:<28} {value}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
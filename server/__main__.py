@@ -1,5 +1,4 @@
-import uvicorn
-from .app import app
+from .launcher import main
 
 if __name__ == '__main__':
-    uvicorn.run("server:app", host='0.0.0.0', port=8000, log_level="debug")
+    main()
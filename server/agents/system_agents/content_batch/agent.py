@@ -0,0 +1,213 @@
+import logging
+from collections import defaultdict
+from typing import AsyncGenerator, Dict, List, Optional, Set, Tuple
+from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+from server.agents.workflow_agents.azure_bing_search.types import SEARCH_RESPONSE_TYPES
+from server.agents.workflow_agents.web_extraction.agent import WebContentExtractorAgent
+from server.agents.workflow_agents.web_content_summary.agent import WebContentSummaryAgent
+from server.agents.system_agents.content_creator.stages import WebPage, WebPageStages
+from autogen import Agent
+from server.setting import SETTINGS
+from server.utils.metrics import REGISTRY, record_error
+from server.utils.pipeline import Pipeline, Stage
+from server.utils.tracing import trace_generator
+from .types import BatchTopic
+
+
+# Setup a logger for the system agent
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BATCH_DEDUPED = REGISTRY.counter(
+    "content_writer_batch_deduplicated_total",
+    "Bing queries and pages shared by several topics of a batch and therefore executed only once.",
+    ["kind"],
+)
+
+
+class ContentBatchSystemAgent(Agent):
+    """
+    A system agent that gathers web content for many topics at once. It plans the union of Bing
+    queries and result URLs over all topics, runs each unique query and summarizes each unique
+    page only once per batch through a staged pipeline, and streams the results per topic.
+    """
+
+    def __init__(self, req_id: str, user: str):
+        """
+        Initializes the agent with a unique request ID and user identifier.
+
+        Args:
+            req_id (str): A unique identifier for the request.
+            user (str): The user who is making the request.
+        """
+        super().__init__(name="ContentBatchSystemAgent", description="Coordinates batched content creation tasks.")
+        self.req_id = req_id
+        self.user = user
+
+        self.azure_bing_search_agent = AzureBingSearchAgent()
+        self.web_content_extractor_agent = WebContentExtractorAgent()
+        self.web_content_summary_agent = WebContentSummaryAgent()
+
+        # Batch bookkeeping: pages by URL, the pages each topic found and still waits for, and its searches left
+        self.pipeline: Optional[Pipeline] = None
+        self._topics: List[BatchTopic] = []
+        self._pages: Set[str] = set()
+        self._summaries: Dict[str, Optional[str]] = {}
+        self._found: Dict[int, Set[str]] = defaultdict(set)
+        self._remaining: Dict[int, Set[str]] = defaultdict(set)
+        self._pending_queries: Dict[int, int] = {}
+        self._completed: Set[int] = set()
+
+    @staticmethod
+    def _event(event_type: str, data: str, source: str = "", topic_id: Optional[int] = None) -> str:
+        topic = f"<topic_id>{topic_id}</topic_id>" if topic_id is not None else ""
+        return f"<event_type>{event_type}</event_type><event_data>{data}</event_data><source>{source}</source>{topic}"
+
+    def _plan_queries(self, topics: List[BatchTopic]) -> Dict[Tuple[str, str], List[int]]:
+        """
+        Maps every unique (search term, site) pair to the topics that need it.
+
+        Args:
+            topics (List[BatchTopic]): The topics of the batch.
+
+        Returns:
+            Dict[Tuple[str, str], List[int]]: Topic indexes per query.
+        """
+        queries: Dict[Tuple[str, str], List[int]] = {}
+        for topic_id, item in enumerate(topics):
+            for source in dict.fromkeys(item.sources):
+                queries.setdefault((item.topic.strip(), source), []).append(topic_id)
+        return queries
+
+    def _completed_topics(self) -> List[int]:
+        """
+        Returns the topics whose searches are all done and whose pages have all come out of the
+        pipeline, each only once.
+        """
+        completed = [
+            topic_id for topic_id, pending in self._pending_queries.items()
+            if pending == 0 and not self._remaining[topic_id] and topic_id not in self._completed
+        ]
+        self._completed.update(completed)
+        return completed
+
+    async def _search(self, query: Tuple[str, str, Tuple[int, ...]]) -> List[WebPage]:
+        """
+        Runs one unique query and passes on only the pages no other query of the batch has found.
+        Pages already summarized are sent to the topics of this query right away.
+
+        Args:
+            query (Tuple[str, str, Tuple[int, ...]]): The search term, the site and the topics
+                that need the query.
+
+        Returns:
+            List[WebPage]: The new pages to process.
+        """
+        search_term, site, topic_ids = query
+        try:
+            response = await self.azure_bing_search_agent._bing_search(search_term, site)
+            if not isinstance(response, SEARCH_RESPONSE_TYPES):
+                logger.error(f"[{self.req_id}] Search failed for '{search_term}' on {site}: {response}")
+                return []
+
+            pages = []
+            for result in response.web_results:
+                url = result.url
+                new_topics = [topic_id for topic_id in topic_ids if url not in self._found[topic_id]]
+                for topic_id in new_topics:
+                    self._found[topic_id].add(url)
+
+                if url in self._pages:
+                    BATCH_DEDUPED.inc(kind="page")
+                    if url in self._summaries:
+                        # Already out of the pipeline, so the topics get the summary right away
+                        for topic_id in new_topics:
+                            if self._summaries[url]:
+                                await self.pipeline.emit(self._event("WEB_DATA", self._summaries[url], url, topic_id))
+                    else:
+                        for topic_id in new_topics:
+                            self._remaining[topic_id].add(url)
+                    continue
+
+                # Each unique page is processed once; every topic that found it gets its summary
+                self._pages.add(url)
+                for topic_id in new_topics:
+                    self._remaining[topic_id].add(url)
+                pages.append(WebPage(url=url, title=result.title))
+            return pages
+        finally:
+            for topic_id in topic_ids:
+                self._pending_queries[topic_id] -= 1
+            for topic_id in self._completed_topics():
+                await self.pipeline.emit(self._event("TOPIC_COMPLETED", self._topics[topic_id].topic, topic_id=topic_id))
+
+    def _page_events(self, page: WebPage) -> List[str]:
+        self._summaries[page.url] = page.summary
+        events = []
+        for topic_id, urls in self._remaining.items():
+            if page.url not in urls:
+                continue
+            urls.discard(page.url)
+            if page.summary:
+                events.append(self._event("WEB_DATA", page.summary, page.url, topic_id))
+        for topic_id in self._completed_topics():
+            events.append(self._event("TOPIC_COMPLETED", self._topics[topic_id].topic, topic_id=topic_id))
+        return events
+
+    def _build_pipeline(self) -> Pipeline:
+        settings = SETTINGS.batch
+        search_stage = Stage("search", self._search, workers=settings.search_concurrency, fan_out=True)
+        page_stages = WebPageStages(self.req_id, self._emit, self.web_content_extractor_agent, self.web_content_summary_agent)
+        return Pipeline("content_batch", [search_stage] + page_stages.stages(workers=settings.page_concurrency))
+
+    async def _emit(self, event: str) -> None:
+        await self.pipeline.emit(event)
+
+    def run(self, topics: List[BatchTopic]) -> AsyncGenerator[str, None]:
+        """
+        Runs the batch and streams per-topic events. Events carry a `<topic_id>` with the index of
+        the topic in the request; WEB_DATA events for a page shared by several topics are emitted
+        once per topic.
+
+        Args:
+            topics (List[BatchTopic]): The topics and their sources.
+
+        Returns:
+            AsyncGenerator[str, None]: Status updates and per-topic content results.
+        """
+        return trace_generator("ContentBatchSystemAgent.run", self._run(topics),
+                               req_id=self.req_id, user=self.user, topics=len(topics))
+
+    async def _run(self, topics: List[BatchTopic]) -> AsyncGenerator[str, None]:
+        logger.info(f"[{self.req_id}] Starting batch content creation for {len(topics)} topics.")
+        yield self._event("STATUS", f"Starting content creation process for {len(topics)} topics.")
+
+        queries = self._plan_queries(topics)
+        total_queries = sum(len(item.sources) for item in topics)
+        BATCH_DEDUPED.inc(total_queries - len(queries), kind="query")
+        logger.info(f"[{self.req_id}] Batch of {len(topics)} topics planned as {len(queries)} unique searches "
+                    f"({total_queries} requested).")
+
+        self._topics = topics
+        self._pending_queries = {topic_id: 0 for topic_id in range(len(topics))}
+        for topic_ids in queries.values():
+            for topic_id in topic_ids:
+                self._pending_queries[topic_id] += 1
+
+        try:
+            for topic_id in self._completed_topics():
+                yield self._event("TOPIC_COMPLETED", topics[topic_id].topic, topic_id=topic_id)
+
+            self.pipeline = self._build_pipeline()
+            source = [(search_term, site, tuple(topic_ids)) for (search_term, site), topic_ids in queries.items()]
+            async for item in self.pipeline.run(source):
+                if isinstance(item, WebPage):
+                    for event in self._page_events(item):
+                        yield event
+                else:
+                    yield item
+        except Exception as e:
+            record_error("pipeline", e)
+            logger.error(f"[{self.req_id}] Error during batch content creation: {str(e)}")
+
+        yield self._event("WEB_DATA", "Process completed successfully.")
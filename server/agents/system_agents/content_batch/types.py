@@ -0,0 +1,7 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class BatchTopic(BaseModel):
+    topic: str
+    sources: List[str] = Field(default_factory=list)
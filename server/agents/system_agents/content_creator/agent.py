@@ -1,20 +1,23 @@
 import asyncio
 import logging
-from typing import List, Dict, AsyncGenerator
+from typing import List, Dict, AsyncGenerator, Optional, Set
 from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
 from server.agents.workflow_agents.web_extraction.agent import WebContentExtractorAgent
 from server.agents.workflow_agents.content_creator.agent import ContentCreationAgent
 from server.agents.workflow_agents.web_content_summary.agent import WebContentSummaryAgent
-from server.agents.workflow_agents.azure_bing_search.types import BingSearchResponse
+from server.agents.workflow_agents.azure_bing_search.types import SEARCH_RESPONSE_TYPES
 from autogen import Agent
-from .types import WebContent
+from server.setting import SETTINGS
+from server.utils.metrics import record_error
+from server.utils.pipeline import Pipeline, Stage
+from server.utils.tracing import trace_generator
+from .stages import WebPage, WebPageStages
 
 
 # Setup a logger for the system agent
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-CACHE:Dict[str,WebContent] = {}
 class ContentCreationSystemAgent(Agent):
     """
     A system agent that coordinates content creation by performing web searches, extracting content from URLs,
@@ -39,88 +42,92 @@ class ContentCreationSystemAgent(Agent):
         self.content_creation_agent = ContentCreationAgent()
         self.web_content_summary_agent = WebContentSummaryAgent()
 
-    async def _search_and_create_content(self, topic: str, sources: List[str]) -> AsyncGenerator[str, None]:
+        # The per-page stages, publishing their status events through the running pipeline
+        self.page_stages = WebPageStages(
+            req_id, self._emit, self.web_content_extractor_agent, self.web_content_summary_agent
+        )
+        self.pipeline: Optional[Pipeline] = None
+
+    async def _emit(self, event: str) -> None:
+        await self.pipeline.emit(event)
+
+    async def _search(self, topic: str, source: str, seen: Set[str]) -> Optional[List[WebPage]]:
         """
-        Orchestrates the web search, content extraction, and content creation process for a given topic and list of sources.
+        Searches one source for the topic.
 
         Args:
             topic (str): The content topic to search for.
-            sources (List[str]): List of sources (URLs or domains) to search for content.
+            source (str): The source (domain) to search.
+            seen (Set[str]): URLs already found by other sources of this request.
 
-        Yields:
-            str: The results or status messages from each step of the process.
+        Returns:
+            Optional[List[WebPage]]: The new pages found, or None if the search failed.
         """
-        try:
-            # Step 1: Web search for relevant content
-            logger.info(f"[{self.req_id}] Starting web search for topic: {topic}.")
-            yield f"<status>status_message</status><data>Conducting web search on: {topic}.</data>"
+        response = await self.azure_bing_search_agent._bing_search(topic, source)
+        if not isinstance(response, SEARCH_RESPONSE_TYPES):
+            logger.error(f"[{self.req_id}] Search failed for '{topic}' on {source}: {response}")
+            return None
+
+        # Only the results most relevant to the topic are fetched and summarized
+        results = self.azure_bing_search_agent.select_results(topic, response.web_results)
+        pages = [WebPage(url=result.url, title=result.title) for result in results if result.url not in seen]
+        seen.update(page.url for page in pages)
+        return pages
+
+    def _build_pipeline(self, topic: str) -> Pipeline:
+        """
+        Declares the content gathering stages: a search per source, then the page stages for
+        every result.
 
-            bing_search_response = await self.azure_bing_search_agent.run(topic, sources)
+        Args:
+            topic (str): The content topic to search for.
 
-            # Step 2: Process each search result concurrently
-            logger.info(f"[{self.req_id}] Processing {len(bing_search_response)} search results.")
-            yield f"<status>status_message</status><data>Analyzing web sources for content creation.</data>"
+        Returns:
+            Pipeline: The pipeline, taking sources and producing pages.
+        """
+        seen: Set[str] = set()
 
-            # tasks = [
-            #     self._process_search_result(topic, web_result)
-            #     for response in bing_search_response
-            #     for web_result in response.web_results
-            # ]
-
-            # # Run all tasks concurrently and yield the results
-            # for task in tasks:
-            #     async for result in task:
-            #         yield result
-
-            tasks = [
-                self._create_web_content_summary(web_result)
-                for response in bing_search_response
-                for web_result in response.web_results
-            ]
-
-            # Run all tasks concurrently and yield the results
-            for task in tasks:
-                async for result in task:
-                    yield result
-                    
-        except Exception as e:
-            logger.error(f"[{self.req_id}] Error during content creation process: {str(e)}")
-            # yield f"<status>error_message</status><data>An error occurred: {str(e)}</data>"
+        async def search(source: str) -> Optional[List[WebPage]]:
+            return await self._search(topic, source, seen)
+
+        search_stage = Stage("search", search, workers=SETTINGS.pipeline.search_workers, fan_out=True)
+        return Pipeline("content_creation", [search_stage] + self.page_stages.stages())
 
-    async def _create_web_content_summary(self,web_result: Dict) -> AsyncGenerator[str, None]:
+    async def _search_and_create_content(self, topic: str, sources: List[str]) -> AsyncGenerator[str, None]:
         """
-        Handles the process of extracting content from a web result and generating a LinkedIn post.
+        Orchestrates the web search, content extraction, and content creation process for a given topic and list of sources.
+        The stages overlap across pages, so one page can be fetched while another is summarized.
 
         Args:
-            topic (str): The content topic for which the post is being created.
-            web_result (Dict): The search result (URL, title, and snippet).
+            topic (str): The content topic to search for.
+            sources (List[str]): List of sources (URLs or domains) to search for content.
 
         Yields:
-            str: The result of the content extraction and LinkedIn post creation.
+            str: The results or status messages from each step of the process.
         """
         try:
-            url = web_result.url
-            title = web_result.title
-            summary = web_result.snippet
+            if not sources:
+                raise ValueError("Sources list cannot be empty or None.")
 
-            # Step 1: Extract content from the URL
-            logger.info(f"[{self.req_id}] Extracting content from URL: {url}.")
-            yield f"<event_type>STATUS</event_type><event_data>Extracting content from {title}.</event_data><source></source>"
+            # Step 1: Web search for relevant content
+            logger.info(f"[{self.req_id}] Starting web search for topic: {topic}.")
+            yield f"<status>status_message</status><data>Conducting web search on: {topic}.</data>"
 
-            markdown_content = await self.web_content_extractor_agent.run(url)
-            if markdown_content is not None:    
-                # Step 2: Create web summary from the extracted content
-                web_content_summary = await self.web_content_summary_agent.run(markdown_content)
-                # yield f"<status>status_message</status><data>Creating post from {title}.</data>"
+            # Step 2: Search every source and process each result as it comes out of the search
+            yield f"<status>status_message</status><data>Analyzing web sources for content creation.</data>"
 
-                # post_content = await self.content_creation_agent.run(topic, url, markdown_content)
-                if web_content_summary is not None:
-    
-                    yield f"<event_type>WEB_DATA</event_type><event_data>{web_content_summary}</event_data><source>{url}</source>"
+            self.pipeline = self._build_pipeline(topic)
+            async for item in self.pipeline.run(dict.fromkeys(sources)):
+                if isinstance(item, WebPage):
+                    if item.summary:
+                        yield f"<event_type>WEB_DATA</event_type><event_data>{item.summary}</event_data><source>{item.url}</source>"
+                else:
+                    yield item
 
         except Exception as e:
-            logger.error(f"[{self.req_id}] Error while processing {web_result.url}: {str(e)}")
-            # yield f"<status>error_message</status><data>Error processing {web_result.url}: {str(e)}</data>"
+            record_error("pipeline", e)
+            logger.error(f"[{self.req_id}] Error during content creation process: {str(e)}")
+            # yield f"<status>error_message</status><data>An error occurred: {str(e)}</data>"
 
     async def _process_search_result(self, topic: str, web_result: Dict) -> AsyncGenerator[str, None]:
         """
@@ -157,7 +164,7 @@ class ContentCreationSystemAgent(Agent):
             logger.error(f"[{self.req_id}] Error while processing {web_result.url}: {str(e)}")
             # yield f"<status>error_message</status><data>Error processing {web_result.url}: {str(e)}</data>"
 
-    async def run(self, topic: str, sources: List[str]) -> AsyncGenerator[str, None]:
+    def run(self, topic: str, sources: List[str]) -> AsyncGenerator[str, None]:
         """
         Orchestrates the entire process: web search, content extraction, and post creation.
 
@@ -165,13 +172,17 @@ class ContentCreationSystemAgent(Agent):
             topic (str): The topic for content creation.
             sources (List[str]): The sources for gathering content.
 
-        Yields:
-            str: Status updates and content results.
+        Returns:
+            AsyncGenerator[str, None]: Status updates and content results.
         """
+        return trace_generator("ContentCreationSystemAgent.run", self._run(topic, sources),
+                               req_id=self.req_id, user=self.user, topic=topic)
+
+    async def _run(self, topic: str, sources: List[str]) -> AsyncGenerator[str, None]:
         logger.info(f"[{self.req_id}] Starting content creation process for topic: {topic}.")
         yield f"<event_type>STATUS</event_type><event_data>Starting content creation process for topic: {topic}.</event_data><source></source>"
         # Call the main search and content creation handler
         async for result in self._search_and_create_content(topic, sources):
             yield result
-                    # Final status after completion
+        # Final status after completion
         yield f"<event_type>WEB_DATA</event_type><event_data>Process completed successfully.</event_data><source></source>"
@@ -0,0 +1,138 @@
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+from server.agents.workflow_agents.web_extraction.agent import WebContentExtractorAgent
+from server.agents.workflow_agents.web_content_summary.agent import WebContentSummaryAgent
+from server.setting import SETTINGS
+from server.utils.cache import get_cache, EXTRACTED, SUMMARY
+from server.utils.local_index import get_local_index
+from server.utils.metrics import record_error
+from server.utils.pipeline import Stage
+from server.utils.tracing import start_span
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WebPage:
+    """
+    A search result travelling through the page stages.
+    """
+    url: str
+    title: str
+    html: Optional[bytes] = None
+    cleaned: Optional[str] = None
+    markdown: Optional[str] = None
+    summary: Optional[str] = None
+    failed: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.failed or self.summary is not None
+
+
+class WebPageStages:
+    """
+    The per-page stages of gathering web content: fetch (network), parse (CPU), convert to
+    markdown and summarize (LLM). Pages served from the cache, or that failed, pass through the
+    remaining stages untouched, so every page comes out of the last stage exactly once.
+    """
+
+    def __init__(self, req_id: str, emit: Callable[[str], Awaitable[None]],
+                 extractor: Optional[WebContentExtractorAgent] = None,
+                 summarizer: Optional[WebContentSummaryAgent] = None) -> None:
+        """
+        Args:
+            req_id (str): The request the pages are gathered for, used in logs.
+            emit (Callable[[str], Awaitable[None]]): Publishes status events, e.g. `Pipeline.emit`.
+            extractor (Optional[WebContentExtractorAgent]): Fetches and converts pages.
+            summarizer (Optional[WebContentSummaryAgent]): Summarizes the markdown of pages.
+        """
+        self.req_id = req_id
+        self.emit = emit
+        self.extractor = extractor or WebContentExtractorAgent()
+        self.summarizer = summarizer or WebContentSummaryAgent()
+
+    def _fail(self, page: WebPage, stage: str, error: Exception) -> WebPage:
+        record_error(stage, error)
+        logger.error(f"[{self.req_id}] Error while processing {page.url}: {str(error)}")
+        page.failed = True
+        return page
+
+    async def fetch(self, page: WebPage) -> WebPage:
+        try:
+            # Serve previously summarized pages straight from the cache shared by all workers
+            page.summary = await get_cache().get(SUMMARY, page.url)
+            if page.summary:
+                logger.info(f"[{self.req_id}] Using cached summary for URL: {page.url}.")
+                return page
+            page.markdown = await get_cache().get(EXTRACTED, page.url)
+            if page.markdown is not None:
+                return page
+
+            logger.info(f"[{self.req_id}] Extracting content from URL: {page.url}.")
+            await self.emit(
+                f"<event_type>STATUS</event_type><event_data>Extracting content from {page.title}.</event_data><source></source>"
+            )
+            with start_span("WebPageStages.fetch", req_id=self.req_id, **{"http.url": page.url}):
+                page.html = await self.extractor.fetch_page(page.url)
+            page.failed = page.html is None
+        except Exception as e:
+            return self._fail(page, "fetch", e)
+        return page
+
+    async def parse(self, page: WebPage) -> WebPage:
+        if page.finished or page.markdown is not None:
+            return page
+        try:
+            page.cleaned = await self.extractor.parse_page(page.url, page.html)
+            page.html = None
+        except Exception as e:
+            return self._fail(page, "parse", e)
+        return page
+
+    async def convert(self, page: WebPage) -> WebPage:
+        if page.finished or page.markdown is not None:
+            return page
+        try:
+            page.markdown = await self.extractor.convert(page.url, page.cleaned)
+            page.cleaned = None
+            page.failed = page.markdown is None
+        except Exception as e:
+            return self._fail(page, "extraction_llm", e)
+        return page
+
+    async def summarize(self, page: WebPage) -> WebPage:
+        if page.finished:
+            return page
+        try:
+            with start_span("WebPageStages.summarize", req_id=self.req_id, **{"http.url": page.url}):
+                summary = await self.summarizer.run(page.markdown)
+            if not isinstance(summary, str):
+                page.failed = True
+                return page
+            await get_cache().set(SUMMARY, page.url, summary)
+            await get_local_index().add(page.url, title=page.title, summary=summary)
+            page.summary = summary
+        except Exception as e:
+            return self._fail(page, "summary", e)
+        return page
+
+    def stages(self, workers: Optional[int] = None) -> List[Stage]:
+        """
+        Declares the page stages with their worker counts from the pipeline settings.
+
+        Args:
+            workers (Optional[int]): Overrides the workers of the network and LLM stages.
+
+        Returns:
+            List[Stage]: The fetch, parse, convert and summarize stages.
+        """
+        settings = SETTINGS.pipeline
+        return [
+            Stage("fetch", self.fetch, workers=workers or settings.fetch_workers, max_queue=settings.queue_size),
+            Stage("parse", self.parse, workers=settings.parse_workers, max_queue=settings.queue_size),
+            Stage("convert", self.convert, workers=workers or settings.convert_workers, max_queue=settings.queue_size),
+            Stage("summarize", self.summarize, workers=workers or settings.summarize_workers, max_queue=settings.queue_size),
+        ]
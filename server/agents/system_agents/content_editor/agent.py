@@ -1,14 +1,37 @@
 import asyncio
+import json
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Tuple
 from server.agents.workflow_agents.content_editor.agent import ContentEditorAgent
+from server.agents.workflow_agents.content_editor.paragraphs import (
+    split_paragraphs,
+    join_paragraphs,
+    find_target_paragraphs,
+    diff_paragraphs,
+)
 from autogen import Agent
+from server.setting import SETTINGS
+from server.utils.metrics import REGISTRY
+from server.utils.tracing import start_span
+from .sessions import SESSIONS, EditSession
+from .versions import get_version_store, prune_versions
 
 
 # Setup a logger for the system agent
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+EDITS = REGISTRY.counter(
+    "content_writer_edits_total",
+    "Content edits by mode: only the targeted paragraphs regenerated, or the whole post.",
+    ["mode"],
+)
+EDIT_PROMPTS = REGISTRY.counter(
+    "content_writer_edit_prompts_total",
+    "Full-post edit rounds by prompt: a follow-up continuing the session's conversation, or the whole post.",
+    ["prompt"],
+)
+
 
 class ContentEditorSystemAgent(Agent):
     """
@@ -28,40 +51,116 @@ class ContentEditorSystemAgent(Agent):
         self.req_id = req_id
         self.user = user
 
-        # Instantiate the content editing agent
-        self.content_editing_agent = ContentEditorAgent()
+        # The content editing agent belongs to the edit session and is reused across its rounds
+        self.content_editing_agent: Optional[ContentEditorAgent] = None
 
-    async def run(self, user_feedback: str, post_content: str) -> AsyncGenerator[str, None]:
+    async def _revise(self, user_feedback: str, session: EditSession, version: int, post: str) -> Tuple[Optional[str], str]:
         """
-        Orchestrates the content editing process: refining posts based on feedback.
+        Regenerates only the paragraphs the feedback targets when it names them, and the whole post
+        otherwise. A whole-post round continues the session's editor conversation when it ends with
+        the current version, so only the new feedback is sent.
+
+        Args:
+            user_feedback (str): The feedback provided by the user.
+            session (EditSession): The edit session holding the editor conversation.
+            version (int): The number of the stored version being revised.
+            post (str): The post content of that version.
+
+        Returns:
+            Tuple[Optional[str], str]: The revised post (None on failure) and the edit mode used.
+        """
+        paragraphs = split_paragraphs(post)
+        targets = find_target_paragraphs(user_feedback, paragraphs)
+        if targets:
+            logger.info(f"[{self.req_id}] Regenerating paragraphs {targets} of {len(paragraphs)}.")
+            merged = await self.content_editing_agent.edit_paragraphs(user_feedback, paragraphs, targets)
+            if merged is not None:
+                return join_paragraphs(merged), "paragraph"
+            logger.info(f"[{self.req_id}] Paragraph edit failed, regenerating the whole post.")
+
+        follow_up = (session.conversation_version == version
+                     and 0 < session.conversation_turns < SETTINGS.edit_sessions.max_turns)
+        EDIT_PROMPTS.inc(prompt="follow_up" if follow_up else "full_post")
+        revised_post = await self.content_editing_agent.run(
+            user_feedback=user_feedback, post_content=post, follow_up=follow_up
+        )
+        if not revised_post.response:
+            # A failed round leaves the conversation in an unknown state; the next one starts over
+            session.conversation_turns = 0
+        else:
+            session.conversation_turns = session.conversation_turns + 1 if follow_up else 1
+        return revised_post.response, "full"
+
+    async def run(self, user_feedback: str, post_content: Optional[str] = None) -> AsyncGenerator[str, None]:
+        """
+        Orchestrates the content editing process: refining posts based on feedback. The post
+        versions and the editor conversation of each req_id are kept server-side, so follow-up edits
+        can omit the post and only send the new feedback to the model, and only the paragraphs the
+        feedback targets are regenerated where possible.
 
         Args:
             user_feedback (str): The feedback provided by the user for improving the content.
-            post_content (str): The original post content that requires editing.
+            post_content (Optional[str]): The post to edit. Defaults to the latest version of this
+                req_id's edit session.
 
         Yields:
-            str: Status updates and the revised content in Markdown format.
+            str: Status updates and the revised content in Markdown format, followed by the version
+                number, the edit mode and a JSON paragraph diff against the previous version.
         """
         logger.info(f"Content editing initiated by user: {self.user}, Request ID: {self.req_id}")
-        
+
         try:
-            # Log the input details
-            logger.debug(f"Original post content: {post_content}")
-            logger.debug(f"User feedback: {user_feedback}")
-            
-            # Step 1: Refine the post using the content editing agent
-            revised_post = await self.content_editing_agent.run(
-                user_feedback=user_feedback,
-                post_content=post_content,
+            versions = get_version_store()
+            # Ownership is checked before the session is touched, so other users cannot keep it alive
+            owner = await versions.owner(self.req_id)
+            if owner is not None and owner != self.user:
+                raise PermissionError("This edit session belongs to another user.")
+            session = SESSIONS.get_or_create(self.req_id, self.user)
+            if session.user != self.user:
+                raise PermissionError("This edit session belongs to another user.")
+
+            # Rounds of one session run one at a time in this process, since they share the editor
+            # conversation; the versions are shared with the other workers through the store
+            async with session.lock:
+                latest = await versions.latest(self.req_id)
+                # A post sent by the client that differs from the stored one becomes the new base version
+                if post_content and (latest[1] if latest else "").strip() != post_content.strip():
+                    latest = (await versions.add(self.req_id, self.user, post_content.strip()), post_content.strip())
+                if not latest:
+                    raise ValueError("No post content provided and no previous version for this request.")
+                base_version, base_post = latest
+
+                if session.agent is None:
+                    session.agent = ContentEditorAgent()
+                self.content_editing_agent = session.agent
+
+                # Log the input details
+                logger.debug(f"Original post content: {base_post}")
+                logger.debug(f"User feedback: {user_feedback}")
+
+                # Step 1: Refine the post using the content editing agent
+                with start_span("ContentEditorSystemAgent.run", req_id=self.req_id, user=self.user) as span:
+                    revised_post, mode = await self._revise(user_feedback, session, base_version, base_post)
+                    span.set_attribute("edit.mode", mode)
+
+                if not revised_post:
+                    SESSIONS.update(session)
+                    raise ValueError("No revised content was generated.")
+
+                EDITS.inc(mode=mode)
+                version = await versions.add(self.req_id, self.user, revised_post.strip())
+                if mode == "full":
+                    session.conversation_version = version
+                SESSIONS.update(session)
+            await prune_versions()
+            diff = diff_paragraphs(split_paragraphs(base_post), split_paragraphs(revised_post))
+
+            yield (
+                f"<status>data_message</status><data>{revised_post}</data>"
+                f"<version>{version}</version><edit_mode>{mode}</edit_mode><diff>{json.dumps(diff)}</diff>"
             )
-            
- 
-            yield f"<status>data_message</status><data>{revised_post.response}</data>"
 
         except Exception as e:
             error_message = f"An error occurred during content editing: {str(e)}"
             logger.exception(error_message)
             yield f"<status>error</status><message>{error_message}</message>"
-
-
- 
\ No newline at end of file
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+from server.utils.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from server.agents.workflow_agents.content_editor.agent import ContentEditorAgent
+
+EDIT_SESSIONS = REGISTRY.gauge(
+    "content_writer_edit_sessions",
+    "Edit sessions held in memory by this process.",
+)
+EDIT_SESSION_BYTES = REGISTRY.gauge(
+    "content_writer_edit_session_bytes",
+    "Approximate size of the editor conversations held by the edit sessions.",
+)
+EDIT_SESSION_EVICTIONS = REGISTRY.counter(
+    "content_writer_edit_session_evictions_total",
+    "Edit sessions dropped from memory, by reason (idle, count or memory limit).",
+    ["reason"],
+)
+
+
+def _conversation_bytes(agent: Optional["ContentEditorAgent"]) -> int:
+    if agent is None:
+        return 0
+    size = 0
+    for member in (agent.editing_assistant, agent.reflection_assistant, agent.user_proxy):
+        for messages in member.chat_messages.values():
+            size += sum(len(str(message.get("content") or "").encode()) for message in messages)
+    return size
+
+
+@dataclass
+class EditSession:
+    """
+    The in-process part of an edit session: the live editor conversation. The post versions are
+    kept in the version store shared by the workers (see `versions.py`).
+    """
+    req_id: str
+    user: str
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # The editor agent and its conversation, reused by every round of this session
+    agent: Optional[Any] = field(default=None, repr=False)
+    # The stored version the editor conversation ends with, and the rounds it holds
+    conversation_version: int = 0
+    conversation_turns: int = 0
+    size_bytes: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def measure(self) -> int:
+        """
+        Recomputes the approximate memory held by the session: the text of the editor
+        conversation. The agent objects themselves are not counted.
+
+        Returns:
+            int: The size in bytes.
+        """
+        self.size_bytes = _conversation_bytes(self.agent)
+        return self.size_bytes
+
+
+class EditSessionStore:
+    """
+    Keeps the edit sessions of this process, keyed by req_id, in a bounded LRU. Sessions idle for
+    longer than `idle_ttl` are dropped, and the least recently used ones go first when the number
+    of sessions or their approximate size exceeds the limits. Sessions in the middle of an edit
+    round (their lock is held) are never dropped; the limits are enforced again after the round.
+
+    Workers do not need affinity: the post versions are shared through the version store, and a
+    round handled by a worker without the session's conversation, or after its eviction, starts a
+    new conversation from the latest stored version with the whole post. Routing a req_id to the
+    same worker only makes follow-up prompts more frequent.
+    """
+
+    def __init__(self, max_sessions: int, max_bytes: int, idle_ttl: float) -> None:
+        """
+        Args:
+            max_sessions (int): Sessions kept at most.
+            max_bytes (int): Approximate memory the sessions may hold, in bytes.
+            idle_ttl (float): Seconds a session is kept without being used.
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, EditSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        EDIT_SESSIONS.set_function(lambda: len(self._sessions))
+        EDIT_SESSION_BYTES.set_function(self.total_bytes)
+
+    def total_bytes(self) -> int:
+        return sum(session.size_bytes for session in list(self._sessions.values()))
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        now = time.time()
+        for req_id, session in list(self._sessions.items()):
+            if now - session.updated_at > self.idle_ttl and req_id != keep and not session.lock.locked():
+                del self._sessions[req_id]
+                EDIT_SESSION_EVICTIONS.inc(reason="idle")
+
+        total = self.total_bytes()
+        for req_id in list(self._sessions):
+            over_count = len(self._sessions) > self.max_sessions
+            if not over_count and total <= self.max_bytes:
+                break
+            if req_id == keep or self._sessions[req_id].lock.locked():
+                continue
+            total -= self._sessions.pop(req_id).size_bytes
+            EDIT_SESSION_EVICTIONS.inc(reason="count" if over_count else "memory")
+
+    def get(self, req_id: str) -> Optional[EditSession]:
+        """
+        Returns a live session and marks it as recently used.
+
+        Args:
+            req_id (str): The request id of the session.
+
+        Returns:
+            Optional[EditSession]: The session, or None if it is unknown or expired.
+        """
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(req_id)
+            if session is not None:
+                session.updated_at = time.time()
+                self._sessions.move_to_end(req_id)
+            return session
+
+    def get_or_create(self, req_id: str, user: str) -> EditSession:
+        """
+        Returns the session of a req_id for a user whose ownership was checked, creating it if
+        needed. A session left by another user, e.g. from a round that failed before any version
+        was stored, is replaced unless one of its rounds is running.
+
+        Args:
+            req_id (str): The request id of the session.
+            user (str): The user editing.
+
+        Returns:
+            EditSession: The session, owned by `user` unless another user's round is running.
+        """
+        with self._lock:
+            self._evict(keep=req_id)
+            session = self._sessions.get(req_id)
+            if session is None or (session.user != user and not session.lock.locked()):
+                session = self._sessions[req_id] = EditSession(req_id=req_id, user=user)
+            session.updated_at = time.time()
+            self._sessions.move_to_end(req_id)
+            return session
+
+    def update(self, session: EditSession) -> None:
+        """
+        Re-measures a session after an edit round, keeps it if it was dropped meanwhile, and
+        enforces the limits.
+
+        Args:
+            session (EditSession): The session that changed.
+        """
+        with self._lock:
+            session.measure()
+            session.updated_at = time.time()
+            # A session dropped while a round waited for its lock comes back with that round's conversation
+            self._sessions.setdefault(session.req_id, session)
+            self._sessions.move_to_end(session.req_id)
+            self._evict(keep=session.req_id)
+
+
+def _create_store() -> EditSessionStore:
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.edit_sessions
+    return EditSessionStore(
+        max_sessions=settings.max_sessions,
+        max_bytes=settings.max_bytes,
+        idle_ttl=settings.idle_ttl_seconds,
+    )
+
+
+SESSIONS = _create_store()
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from server.utils.sqlite import SqliteConnections
+
+
+class VersionOwnerError(PermissionError):
+    """Raised when a user adds a version to another user's post."""
+
+
+class MemoryVersionStore:
+    """
+    Keeps the post versions of each req_id in the memory of the current process. Only suitable for
+    a single worker: the versions can only be edited through the process that stored them.
+    """
+
+    def __init__(self, max_versions: int) -> None:
+        """
+        Args:
+            max_versions (int): Versions kept per req_id; the oldest are dropped first.
+        """
+        self.max_versions = max_versions
+        self._owners: Dict[str, str] = {}
+        self._versions: Dict[str, List[Tuple[int, str, float]]] = {}
+        self._lock = threading.Lock()
+
+    async def owner(self, req_id: str) -> Optional[str]:
+        return self._owners.get(req_id)
+
+    async def latest(self, req_id: str) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            versions = self._versions.get(req_id)
+            return versions[-1][:2] if versions else None
+
+    async def list(self, req_id: str) -> List[Tuple[int, str]]:
+        with self._lock:
+            return [version[:2] for version in self._versions.get(req_id, [])]
+
+    async def add(self, req_id: str, user: str, post: str) -> int:
+        with self._lock:
+            if self._owners.setdefault(req_id, user) != user:
+                raise VersionOwnerError("This edit session belongs to another user.")
+            versions = self._versions.setdefault(req_id, [])
+            version = versions[-1][0] + 1 if versions else 1
+            versions.append((version, post, time.time()))
+            del versions[:max(len(versions) - self.max_versions, 0)]
+            return version
+
+    async def prune(self, updated_before: float) -> None:
+        with self._lock:
+            for req_id, versions in list(self._versions.items()):
+                if not versions or versions[-1][2] < updated_before:
+                    self._versions.pop(req_id, None)
+                    self._owners.pop(req_id, None)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteVersionStore:
+    """
+    Keeps the post versions of each req_id in a SQLite database shared by every worker process on
+    the host, so an edit session can continue through any of them. Version numbers are assigned in
+    the database and never reused, even when old versions are dropped.
+    """
+
+    def __init__(self, path: str, max_versions: int) -> None:
+        """
+        Args:
+            path (str): The database file.
+            max_versions (int): Versions kept per req_id; the oldest are dropped first.
+        """
+        self.max_versions = max_versions
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS post_versions ("
+            " req_id TEXT NOT NULL, version INTEGER NOT NULL, user TEXT NOT NULL, post TEXT NOT NULL,"
+            " created_at REAL NOT NULL, PRIMARY KEY (req_id, version))",
+        ])
+
+    def _owner(self, req_id: str) -> Optional[str]:
+        row = self._connections.get().execute(
+            "SELECT user FROM post_versions WHERE req_id = ? LIMIT 1", (req_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _latest(self, req_id: str) -> Optional[Tuple[int, str]]:
+        row = self._connections.get().execute(
+            "SELECT version, post FROM post_versions WHERE req_id = ? ORDER BY version DESC LIMIT 1", (req_id,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def _list(self, req_id: str) -> List[Tuple[int, str]]:
+        return [tuple(row) for row in self._connections.get().execute(
+            "SELECT version, post FROM post_versions WHERE req_id = ? ORDER BY version", (req_id,)
+        ).fetchall()]
+
+    def _add(self, req_id: str, user: str, post: str) -> int:
+        connection = self._connections.get()
+        # Taking the write lock up front numbers versions written by different workers one after the other
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT version, user FROM post_versions WHERE req_id = ? ORDER BY version DESC LIMIT 1", (req_id,)
+            ).fetchone()
+            if row is not None and row[1] != user:
+                raise VersionOwnerError("This edit session belongs to another user.")
+            version = row[0] + 1 if row else 1
+            connection.execute(
+                "INSERT INTO post_versions (req_id, version, user, post, created_at) VALUES (?, ?, ?, ?, ?)",
+                (req_id, version, user, post, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM post_versions WHERE req_id = ? AND version <= ?", (req_id, version - self.max_versions)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return version
+
+    def _prune(self, updated_before: float) -> None:
+        self._connections.get().execute(
+            "DELETE FROM post_versions WHERE req_id IN ("
+            " SELECT req_id FROM post_versions GROUP BY req_id HAVING MAX(created_at) < ?)",
+            (updated_before,),
+        )
+
+    async def owner(self, req_id: str) -> Optional[str]:
+        return await asyncio.to_thread(self._owner, req_id)
+
+    async def latest(self, req_id: str) -> Optional[Tuple[int, str]]:
+        return await asyncio.to_thread(self._latest, req_id)
+
+    async def list(self, req_id: str) -> List[Tuple[int, str]]:
+        return await asyncio.to_thread(self._list, req_id)
+
+    async def add(self, req_id: str, user: str, post: str) -> int:
+        return await asyncio.to_thread(self._add, req_id, user, post)
+
+    async def prune(self, updated_before: float) -> None:
+        await asyncio.to_thread(self._prune, updated_before)
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+def create_version_store(backend: str, path: str, max_versions: int):
+    """
+    Creates the configured post version store.
+
+    Args:
+        backend (str): 'sqlite' or 'memory'.
+        path (str): The database file for the SQLite store.
+        max_versions (int): Versions kept per req_id.
+
+    Returns:
+        The version store.
+    """
+    if backend == "memory":
+        return MemoryVersionStore(max_versions)
+    return SqliteVersionStore(path, max_versions)
+
+
+_STORE = None
+_LAST_PRUNE = 0.0
+
+
+def get_version_store():
+    """
+    Returns the process wide post version store, configured from the edit session settings.
+
+    Returns:
+        The shared version store.
+    """
+    global _STORE
+    if _STORE is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.edit_sessions
+        _STORE = create_version_store(settings.store, settings.store_path, settings.max_versions)
+    return _STORE
+
+
+async def prune_versions() -> None:
+    """
+    Drops the versions of posts not edited within the version TTL, at most once a minute.
+    """
+    global _LAST_PRUNE
+    from server.setting import SETTINGS
+
+    now = time.time()
+    if now - _LAST_PRUNE < 60:
+        return
+    _LAST_PRUNE = now
+    await get_version_store().prune(now - SETTINGS.edit_sessions.version_ttl_seconds)
+
+
+def close_version_store() -> None:
+    """
+    Closes the shared version store, if it was opened.
+    """
+    global _STORE
+    if _STORE is not None:
+        _STORE.close()
+        _STORE = None
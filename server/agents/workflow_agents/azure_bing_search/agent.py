@@ -1,9 +1,24 @@
 import httpx
 from autogen import Agent
 import asyncio
-from typing import List, Dict, Union
+import json
+from typing import List, Dict, Optional, Union
 from server.setting import SETTINGS
-from .types import BingSearchResponse, WebResult, ImageResult, RelatedSearch
+from server.utils.metrics import STAGE_LATENCY, OPEN_CONNECTIONS, record_cache, record_error
+from server.utils.tracing import start_span, traced
+from server.utils.cache import get_cache, SEARCH
+from server.utils.http import get_http_client
+from server.utils.local_index import get_local_index
+from .types import BingSearchResponse, WebResult, ImageResult, RelatedSearch, WebHit, WebHits, SEARCH_RESPONSE_TYPES
+from .ranking import rank_results
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Fields of a Bing web result kept by lean searches, besides name, url and snippet
+_WEB_RESULT_EXTRA_FIELDS = ("displayUrl", "dateLastCrawled", "about", "keywords", "isFamilyFriendly", "language")
 
 class AzureBingSearchAgent(Agent):
     """
@@ -19,23 +34,77 @@ class AzureBingSearchAgent(Agent):
         super().__init__(name="Azure Bing Search Agent")
         self.subscription_key: str = SETTINGS.azure._bing.subscription_key
         self.web_search_endpoint: str = SETTINGS.azure._bing.endpoint
+        self.lean: bool = SETTINGS.azure._bing.lean
+
+        # With ranking, more results are requested than are fetched, and only the best are kept
+        ranking = SETTINGS.search_ranking
+        if ranking.enabled:
+            self.SEARCH_COUNT = ranking.search_count
+        self.fetch_count: int = ranking.top_k if ranking.enabled else self.SEARCH_COUNT
 
         # Validate critical settings
         if not self.subscription_key or not self.web_search_endpoint:
             raise ValueError("Azure Bing Search subscription key or endpoint is not configured properly.")
 
-    async def _bing_search(self, search_term: str, search_site: str = None) -> Union[BingSearchResponse, Dict[str, str]]:
+    async def _local_search(self, search_term: str, search_site: str = None) -> Optional[WebHits]:
         """
-        Performs a web search using the Azure Bing Search API.
+        Looks the query up in the local index of pages already extracted and summarized.
 
         Args:
             search_term (str): The term to search for.
             search_site (str): Optional domain to restrict search to a specific site.
 
         Returns:
-            Union[BingSearchResponse, Dict[str, str]]: A BingSearchResponse model or an error dictionary.
+            Optional[WebHits]: The best local pages, or None when too few fresh pages match.
+        """
+        settings = SETTINGS.local_index
+        if not settings.enabled:
+            return None
+        needed = settings.min_results or min(self.fetch_count, self.SEARCH_COUNT)
+        with start_span("local_index.search", **{"search.query": search_term, "search.site": search_site or ""}) as span:
+            hits = await get_local_index().search(search_term, search_site, self.SEARCH_COUNT, settings.max_age_seconds)
+            span.set_attribute("search.local_hits", len(hits))
+        record_cache("local_index", len(hits) >= needed)
+        if len(hits) < needed:
+            return None
+        return WebHits(web_results=[WebHit(title=hit.title, url=hit.url, snippet=hit.summary, raw={}) for hit in hits])
+
+    def search_cache_key(self, search_term: str, search_site: str = None) -> str:
+        """
+        Returns the key the results of a search are cached under.
         """
         query = self.construct_search_query(search_term, search_site)
+        return f"{'lean:' if self.lean else ''}{self.SEARCH_COUNT}:{query}"
+
+    async def _bing_search(self, search_term: str, search_site: str = None,
+                           refresh: bool = False) -> Union[BingSearchResponse, WebHits, Dict[str, str]]:
+        """
+        Performs a web search, served from the local index when it has enough fresh pages for the
+        query and otherwise by the Azure Bing Search API.
+
+        Args:
+            search_term (str): The term to search for.
+            search_site (str): Optional domain to restrict search to a specific site.
+            refresh (bool): Asks Bing even when the local index or the cache has results, and
+                caches the new results.
+
+        Returns:
+            Union[BingSearchResponse, WebHits, Dict[str, str]]: A BingSearchResponse model, compact
+                WebHits in lean mode, or an error dictionary.
+        """
+        if not refresh:
+            local = await self._local_search(search_term, search_site)
+            if local is not None:
+                return local if self.lean else local.full()
+
+        query = self.construct_search_query(search_term, search_site)
+
+        # Search results are shared between workers through the cache tier
+        cache_key = self.search_cache_key(search_term, search_site)
+        cached = await get_cache().get(SEARCH, cache_key) if not refresh else None
+        if cached is not None:
+            return self.process_lean_results(cached) if self.lean else BingSearchResponse(**cached)
+
         headers = {"Ocp-Apim-Subscription-Key": self.subscription_key}
         params = {
             "q": query,
@@ -43,21 +112,58 @@ class AzureBingSearchAgent(Agent):
             "textFormat": "HTML",
             "count": self.SEARCH_COUNT,
         }
+        if self.lean:
+            # Only web pages are used, so Bing does not have to build the other answers
+            params["responseFilter"] = "Webpages"
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.web_search_endpoint, headers=headers, params=params)
+            with start_span("http.get", **{"http.url": self.web_search_endpoint, "search.query": query}) as span, \
+                    STAGE_LATENCY.time(stage="search"):
+                with OPEN_CONNECTIONS.track_inprogress(target="bing"):
+                    response = await get_http_client().get(self.web_search_endpoint, headers=headers, params=params)
+
+                span.set_attribute("http.status_code", response.status_code)
+                response.raise_for_status()
+                response_json = json_loads(response.content)
+                if self.lean:
+                    search_response = self.process_lean_results(response_json)
+                else:
+                    search_response = self.process_search_results(response_json)
 
-            response.raise_for_status()
-            return self.process_search_results(response.json())
+            if search_response.web_results:
+                await get_cache().set(SEARCH, cache_key, self.cache_value(search_response))
+            return search_response
 
         except httpx.HTTPStatusError as e:
+            record_error("search", e)
             return {"error": f"HTTP error occurred: {e.response.status_code}", "details": e.response.text}
         except httpx.RequestError as e:
+            record_error("search", e)
             return {"error": "Request error occurred", "details": str(e)}
         except Exception as e:
+            record_error("search", e)
             return {"error": "Unexpected error occurred", "details": str(e)}
 
+    def select_results(self, topic: str, web_results: List[Union[WebResult, WebHit]]) -> List[Union[WebResult, WebHit]]:
+        """
+        Picks the results worth fetching for a topic: the best ranked ones when ranking is
+        enabled, and every result otherwise.
+
+        Args:
+            topic (str): The content topic.
+            web_results (List[Union[WebResult, WebHit]]): The results of a search, in Bing's order.
+
+        Returns:
+            List[Union[WebResult, WebHit]]: The results to fetch, best first.
+        """
+        ranking = SETTINGS.search_ranking
+        if not ranking.enabled:
+            return list(web_results)
+        return [
+            ranked.result
+            for ranked in rank_results(topic, web_results, self.fetch_count, ranking.min_score, ranking.language)
+        ]
+
     @staticmethod
     def construct_search_query(search_term: str, search_site: str = None) -> str:
         """
@@ -127,7 +233,49 @@ class AzureBingSearchAgent(Agent):
         except (KeyError, TypeError) as e:
             return BingSearchResponse(web_results=[], related_searches=[], images=[])
 
-    async def run(self, topic: str, sources: List[str]) -> List[BingSearchResponse]:
+    @staticmethod
+    def process_lean_results(response_json: Dict) -> WebHits:
+        """
+        Extracts compact records of the web results from a Bing response, without validating
+        models for them or for the other answers.
+
+        Args:
+            response_json (Dict): The parsed JSON response from the Bing API.
+
+        Returns:
+            WebHits: The web results.
+        """
+        web_pages = response_json.get("webPages") or {}
+        return WebHits(web_results=[
+            WebHit(
+                title=result.get("name", "N/A"),
+                url=result.get("url", "N/A"),
+                snippet=result.get("snippet", "N/A"),
+                raw={field: result[field] for field in _WEB_RESULT_EXTRA_FIELDS if field in result},
+            )
+            for result in web_pages.get("value") or [] if isinstance(result, dict)
+        ])
+
+    @staticmethod
+    def cache_value(search_response: Union[BingSearchResponse, WebHits]) -> Dict:
+        """
+        Returns the cached form of a search: the model dump in full mode, and in lean mode the
+        kept fields in the shape of a Bing response, for process_lean_results.
+
+        Args:
+            search_response (Union[BingSearchResponse, WebHits]): The search results.
+
+        Returns:
+            Dict: The JSON serializable value to cache.
+        """
+        if isinstance(search_response, BingSearchResponse):
+            return search_response.model_dump()
+        return {"webPages": {"value": [
+            {"name": hit.title, "url": hit.url, "snippet": hit.snippet, **hit.raw} for hit in search_response.web_results
+        ]}}
+
+    @traced("AzureBingSearchAgent.run")
+    async def run(self, topic: str, sources: List[str]) -> List[Union[BingSearchResponse, WebHits]]:
         """
         Executes a search query for the given topic across multiple sources.
 
@@ -136,7 +284,7 @@ class AzureBingSearchAgent(Agent):
             sources (List[str]): List of domains to restrict the search.
 
         Returns:
-            List[BingSearchResponse]: A list of BingSearchResponse models for each source.
+            List[Union[BingSearchResponse, WebHits]]: The search results of each source.
         """
         if not sources:
             raise ValueError("Sources list cannot be empty or None.")
@@ -146,7 +294,7 @@ class AzureBingSearchAgent(Agent):
 
         results = []
         for result in search_results:
-            if isinstance(result, BingSearchResponse):
+            if isinstance(result, SEARCH_RESPONSE_TYPES):
                 results.append(result)  # Successful result
             elif isinstance(result, dict):  # Error response
                 results.append(result)
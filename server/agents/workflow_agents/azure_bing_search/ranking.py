@@ -0,0 +1,134 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Set, Union
+
+from server.utils.local_index import query_terms
+from server.utils.metrics import REGISTRY
+from .types import WebHit, WebResult
+
+RANKED_RESULTS = REGISTRY.counter(
+    "content_writer_search_results_ranked_total",
+    "Search results after local ranking, by decision (kept, or dropped for their score, "
+    "language or rank).",
+    ["decision"],
+)
+
+_TAGS = re.compile(r"<[^>]+>")
+_TERM = re.compile(r"\w+")
+# Relative weight of a topic term found in each field of a result
+_FIELD_WEIGHTS = {"title": 3.0, "keywords": 2.0, "about": 2.0, "snippet": 1.5}
+_MAX_WEIGHT = max(_FIELD_WEIGHTS.values())
+# Bonus for the whole topic appearing as written, and the largest bonus for Bing's own order
+_PHRASE_BONUS = 0.1
+_POSITION_BONUS = 0.05
+
+
+@dataclass
+class RankedResult:
+    """
+    A search result with its relevance to the topic, from 0 (unrelated) to about 1.
+    """
+    result: Union[WebHit, WebResult]
+    score: float
+
+
+def _stem(term: str) -> str:
+    # Plurals match their singular, which is most of what matters in short titles
+    return term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term
+
+
+def _terms(text: str) -> Set[str]:
+    return {_stem(term) for term in _TERM.findall(_TAGS.sub(" ", text).lower())}
+
+
+def _text(value) -> str:
+    if not value or value == "N/A":
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return str(value.get("name", ""))
+    if isinstance(value, Iterable):
+        return " ".join(_text(item) for item in value)
+    return ""
+
+
+def _fields(result: Union[WebHit, WebResult]):
+    if isinstance(result, WebHit):
+        raw = result.raw
+        return result.title, result.snippet, raw.get("keywords"), raw.get("about"), raw.get("language")
+    return result.title, result.snippet, result.keywords, result.about, result.language
+
+
+def score_result(topic_terms: Sequence[str], phrase: str, result: Union[WebHit, WebResult]) -> float:
+    """
+    Scores how well a result covers the topic: each topic term counts with the weight of the best
+    field it appears in (title, keywords, about entities, snippet), relative to appearing in the title.
+
+    Args:
+        topic_terms (Sequence[str]): The stemmed terms of the topic.
+        phrase (str): The topic, lower-cased, to reward results containing it as written.
+        result (Union[WebHit, WebResult]): The search result.
+
+    Returns:
+        float: The score, 0 when no topic term appears.
+    """
+    title, snippet, keywords, about, _ = _fields(result)
+    fields = {
+        "title": _terms(_text(title)),
+        "keywords": _terms(_text(keywords)),
+        "about": _terms(_text(about)),
+        "snippet": _terms(_text(snippet)),
+    }
+    covered = sum(
+        max((weight for name, weight in _FIELD_WEIGHTS.items() if term in fields[name]), default=0.0)
+        for term in topic_terms
+    )
+    score = covered / (_MAX_WEIGHT * len(topic_terms))
+    text = f"{_TAGS.sub(' ', _text(title))} {_TAGS.sub(' ', _text(snippet))}".lower()
+    if score and phrase and phrase in text:
+        score += _PHRASE_BONUS
+    return score
+
+
+def rank_results(topic: str, results: Sequence[Union[WebHit, WebResult]], top_k: int, min_score: float,
+                 language: Optional[str] = None) -> List[RankedResult]:
+    """
+    Ranks search results by relevance to the topic and keeps the best `top_k`. Results in another
+    language than `language`, and results scoring below `min_score`, are dropped before anything
+    is fetched; when every result scores too low, the best one is kept so the source still
+    contributes. Ties keep Bing's order.
+
+    Args:
+        topic (str): The content topic.
+        results (Sequence[Union[WebHit, WebResult]]): The search results, in Bing's order.
+        top_k (int): Results to keep at most.
+        min_score (float): The lowest score a result may have to be kept.
+        language (Optional[str]): The language results must be in, e.g. 'en'. Empty keeps every language.
+
+    Returns:
+        List[RankedResult]: The results kept, best first.
+    """
+    topic_terms = [_stem(term) for term in query_terms(topic)]
+    phrase = " ".join(_TERM.findall(topic.lower()))
+    language = (language or "").lower()
+    ranked = []
+    for position, result in enumerate(results):
+        result_language = _text(_fields(result)[4]).lower()
+        if language and result_language and not result_language.startswith(language):
+            RANKED_RESULTS.inc(decision="dropped_language")
+            continue
+        score = score_result(topic_terms, phrase, result) if topic_terms else 0.0
+        # Bing's order breaks ties and nudges otherwise equal results
+        score += _POSITION_BONUS * (1 - position / len(results))
+        ranked.append(RankedResult(result, score))
+
+    ranked.sort(key=lambda item: item.score, reverse=True)
+    kept = [item for item in ranked if item.score >= min_score] if topic_terms else ranked
+    if not kept and ranked:
+        kept = ranked[:1]
+    RANKED_RESULTS.inc(len(ranked) - len(kept), decision="dropped_score")
+    kept, beyond = kept[:top_k], kept[top_k:]
+    RANKED_RESULTS.inc(len(beyond), decision="dropped_rank")
+    RANKED_RESULTS.inc(len(kept), decision="kept")
+    return kept
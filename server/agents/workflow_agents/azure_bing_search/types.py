@@ -1,5 +1,6 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 # Pydantic Models
 class RelatedSearch(BaseModel):
@@ -31,6 +32,50 @@ class BingSearchResponse(BaseModel):
     images: List[ImageResult]
 
 
+# Compact records of the lean search mode
+@dataclass(slots=True)
+class WebHit:
+    """
+    A web result with only the fields the content pipeline reads. The fields Bing returned are
+    kept as decoded, so the full model is only built when something asks for it.
+    """
+    title: str
+    url: str
+    snippet: str
+    raw: Dict[str, Any]
+
+    def full(self) -> WebResult:
+        """
+        Returns:
+            WebResult: The validated model with every field of the result.
+        """
+        return WebResult(
+            title=self.title,
+            url=self.url,
+            snippet=self.snippet,
+            display_url=self.raw.get("displayUrl", "N/A"),
+            date_last_crawled=self.raw.get("dateLastCrawled", "N/A"),
+            about=self.raw.get("about", []),
+            keywords=self.raw.get("keywords", "N/A"),
+            is_family_friendly=self.raw.get("isFamilyFriendly", True),
+            language=self.raw.get("language", "N/A"),
+        )
+
+
+@dataclass(slots=True)
+class WebHits:
+    """
+    The web results of a lean search. Related searches and images are not requested.
+    """
+    web_results: List[WebHit]
 
+    def full(self) -> BingSearchResponse:
+        """
+        Returns:
+            BingSearchResponse: The validated model of the search.
+        """
+        return BingSearchResponse(web_results=[hit.full() for hit in self.web_results], related_searches=[], images=[])
 
 
+# Successful results of AzureBingSearchAgent._bing_search, in full or lean mode
+SEARCH_RESPONSE_TYPES = (BingSearchResponse, WebHits)
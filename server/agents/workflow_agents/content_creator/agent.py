@@ -1,5 +1,9 @@
 from autogen import AssistantAgent, UserProxyAgent
 from server.setting import SETTINGS
+from server.utils.metrics import STAGE_LATENCY, record_error
+from server.utils.quality import gate_reflection
+from server.utils.tokens import get_prompt_budget
+from server.utils.tracing import start_span, traced
 from typing import Dict
 from .prompt import (
     CONTENT_WRITER_SYSTEM_PROMPT,
@@ -34,6 +38,8 @@ class ContentCreationAgent(AssistantAgent):
             "temperature": temperature,
         }
         self.max_turns = max_turns
+        self.prompt_budget = get_prompt_budget("writer", CONTENT_WRITER_HUMAN_PROMPT,
+                                               SETTINGS.token_budget.writer_max_tokens, CONTENT_WRITER_SYSTEM_PROMPT)
 
         # Initialize writing assistant agent
         self.writing_assistant = AssistantAgent(
@@ -58,19 +64,24 @@ class ContentCreationAgent(AssistantAgent):
         )
 
         # Register nested chats for reflection assistant
-        nested_chat_queue = [
-            {
-                "recipient": self.reflection_assistant,
-                "message": self.reflection_message,
-                "max_turns": self.max_turns,
-            }
-        ]
+        self.reflection_chat = {
+            "recipient": self.reflection_assistant,
+            "message": self.reflection_message,
+            "max_turns": self.max_turns,
+        }
+        nested_chat_queue = [self.reflection_chat]
 
         self.user_proxy.register_nested_chats(
             nested_chat_queue,
             trigger=self.writing_assistant,
         )
 
+        # Checked before the nested chats: drafts that pass the quality gate skip reflection. The
+        # writer is only used by ContentCreationSystemAgent._process_search_result, which no route
+        # calls since content creation streams page summaries, so the gate is not on a live path.
+        self._source_url = None
+        self.user_proxy.register_reply(self.writing_assistant, self.reflection_gate, position=0)
+
     def reflection_message(self, recipient, messages, sender, config) -> str:
         """
         Returns the latest message content from the sender to be used in reflection.
@@ -93,6 +104,26 @@ class ContentCreationAgent(AssistantAgent):
 
         return last_message[-1].get("content", "No content available for reflection.")
 
+    def reflection_gate(self, recipient, messages, sender, config):
+        """
+        Ends the chat with the draft when it passes the local quality gate, so the reflection
+        assistant is not consulted; otherwise sets the number of reflection turns and lets the
+        nested reflection chat run.
+
+        Args:
+            recipient (UserProxyAgent): The user proxy replying to the draft.
+            messages (list): List of messages exchanged so far.
+            sender (AssistantAgent): The agent that generated the draft.
+            config (dict): Configuration parameters of the reply function.
+
+        Returns:
+            Tuple[bool, None]: (True, None) to end the chat, (False, None) to continue with reflection.
+        """
+        draft = messages[-1].get("content") if messages else None
+        skip = gate_reflection("writer", draft, self.reflection_chat, self.max_turns, source_url=self._source_url)
+        return skip, None
+
+    @traced("ContentCreationAgent.run")
     async def run(self, topic: str, url: str, markdown_content: str) -> ContentCreationResponse:
         """
         Executes the content creation and reflection process in two steps.
@@ -105,12 +136,14 @@ class ContentCreationAgent(AssistantAgent):
         Returns:
             ContentCreationResponse: A structured response using Pydantic.
         """
+        self._source_url = url
         try:
             # Step 1: Content Generation
-            with Cache.disk(cache_seed=42) as content_cache:
+            with start_span("llm.chat", **{"llm.agent": self.name, "llm.max_turns": self.max_turns}), \
+                    STAGE_LATENCY.time(stage="writer"), Cache.disk(cache_seed=42) as content_cache:
                 response = self.user_proxy.initiate_chat(
                     self.writing_assistant,
-                    message=CONTENT_WRITER_HUMAN_PROMPT.format(topic=topic, url=url, content=markdown_content),
+                    message=self.prompt_budget.fit("content", markdown_content, topic=topic, url=url),
                     max_turns=self.max_turns,
                     cache=content_cache,
                 )
@@ -124,6 +157,7 @@ class ContentCreationAgent(AssistantAgent):
             )
 
         except Exception as e:
+            record_error("writer", e)
             # Return error response
             return ContentCreationResponse(
                 status="error",
@@ -1,14 +1,28 @@
 from autogen import AssistantAgent, UserProxyAgent
 from server.setting import SETTINGS
-from typing import Dict
+from server.utils.metrics import STAGE_LATENCY, record_error
+from server.utils.quality import gate_reflection
+from server.utils.tokens import get_prompt_budget
+from server.utils.tracing import start_span, traced
+import logging
+import re
+from typing import Dict, List, Optional
 from .prompt import (
     CONTENT_EDITOR_SYSTEM_PROMPT,
     CONTENT_EDITOR_HUMAN_PROMPT,
+    CONTENT_EDITOR_FOLLOWUP_PROMPT,
     CONTENT_EDITOR_REFLECTION_PROMPT,
+    CONTENT_EDITOR_PARAGRAPH_PROMPT,
 )
 from autogen.cache import Cache
+from .paragraphs import format_paragraph_excerpt
 from .types import ContentEditingResponse  # Updated to reflect 'Editing' terminology
 
+logger = logging.getLogger(__name__)
+
+# Echoed `[Revise n]` markers of the paragraph edit prompt
+_REVISE_MARKER = re.compile(r"^\[Revise \d+\]\s*")
+
 
 class ContentEditorAgent(AssistantAgent):
     """
@@ -34,6 +48,12 @@ class ContentEditorAgent(AssistantAgent):
             "temperature": temperature,
         }
         self.max_turns = max_turns
+        # The post belongs to the user, so editor prompts are only measured, never cut
+        max_tokens = SETTINGS.token_budget.editor_max_tokens
+        self.prompt_budgets = {
+            template: get_prompt_budget("editor", template, max_tokens, CONTENT_EDITOR_SYSTEM_PROMPT, lossless=True)
+            for template in (CONTENT_EDITOR_HUMAN_PROMPT, CONTENT_EDITOR_FOLLOWUP_PROMPT, CONTENT_EDITOR_PARAGRAPH_PROMPT)
+        }
 
         # Initialize Writing Assistant for content editing
         self.editing_assistant = AssistantAgent(
@@ -58,18 +78,22 @@ class ContentEditorAgent(AssistantAgent):
         )
 
         # Register reflection step within the content editing process
-        nested_chat_queue = [
-            {
-                "recipient": self.reflection_assistant,
-                "message": self.reflection_message,
-                "max_turns": self.max_turns,
-            }
-        ]
+        self.reflection_chat = {
+            "recipient": self.reflection_assistant,
+            "message": self.reflection_message,
+            "max_turns": self.max_turns,
+        }
+        nested_chat_queue = [self.reflection_chat]
         self.user_proxy.register_nested_chats(
             nested_chat_queue,
             trigger=self.editing_assistant,
         )
 
+        # Checked before the nested chats: drafts that pass the quality gate skip reflection. With
+        # the default single turn the chat ends on the first draft, before the user proxy replies,
+        # so neither the gate nor reflection runs; both only apply with max_turns > 1.
+        self.user_proxy.register_reply(self.editing_assistant, self.reflection_gate, position=0)
+
     def reflection_message(self, recipient, messages, sender, config) -> str:
         """
         Extracts and returns the latest message content to be used for reflection.
@@ -92,25 +116,59 @@ class ContentEditorAgent(AssistantAgent):
         
         return last_message[-1].get("content", "No content available for reflection.")
 
-    async def run(self, user_feedback: str, post_content: str) -> ContentEditingResponse:
+    def reflection_gate(self, recipient, messages, sender, config):
+        """
+        Ends the chat with the draft when it passes the local quality gate, so the reflection
+        assistant is not consulted; otherwise sets the number of reflection turns and lets the
+        nested reflection chat run.
+
+        Args:
+            recipient (UserProxyAgent): The user proxy replying to the draft.
+            messages (list): List of messages exchanged so far.
+            sender (AssistantAgent): The agent that generated the draft.
+            config (dict): Configuration parameters of the reply function.
+
+        Returns:
+            Tuple[bool, None]: (True, None) to end the chat, (False, None) to continue with reflection.
+        """
+        draft = messages[-1].get("content") if messages else None
+        skip = gate_reflection("editor", draft, self.reflection_chat, self.max_turns, source_url=None)
+        return skip, None
+
+    @traced("ContentEditorAgent.run")
+    async def run(self, user_feedback: str, post_content: str, follow_up: bool = False) -> ContentEditingResponse:
         """
         Executes the content editing and reflection process in two steps.
 
         Args:
             user_feedback (str): User feedback.
             post_content (str): post_content.
+            follow_up (bool): Continue the previous conversation of this agent, whose last reply is
+                `post_content`, by sending only the new feedback. The unchanged system prompt and
+                earlier turns form a stable prefix the provider can serve from its prompt cache.
+                Otherwise the conversation starts over with the full post.
 
         Returns:
             ContentEditingResponse: A structured response containing the result.
         """
+        if follow_up:
+            message = self.prompt_budgets[CONTENT_EDITOR_FOLLOWUP_PROMPT].fit("user_feedback", user_feedback)
+        else:
+            message = self.prompt_budgets[CONTENT_EDITOR_HUMAN_PROMPT].fit(
+                "content", post_content, user_feedback=user_feedback
+            )
+
         try:
             # Step 1: Content Editing (with cache)
-            with Cache.disk(cache_seed=42) as content_cache:
+            with start_span("llm.chat", **{"llm.agent": self.name, "llm.max_turns": self.max_turns,
+                                           "edit.follow_up": follow_up}), \
+                    STAGE_LATENCY.time(stage="editor"), Cache.disk(cache_seed=42) as content_cache:
                 response = self.user_proxy.initiate_chat(
                     self.editing_assistant,
-                    message=CONTENT_EDITOR_HUMAN_PROMPT.format(content=post_content, user_feedback=user_feedback),
+                    message=message,
                     max_turns=self.max_turns,
                     cache=content_cache,
+                    clear_history=not follow_up,
                 )
             
             if not response:
@@ -126,9 +184,61 @@ class ContentEditorAgent(AssistantAgent):
             )
 
         except Exception as e:
+            record_error("editor", e)
             # Log and return error response
             error_message = f"Content editing process failed: {str(e)}"
             return ContentEditingResponse(
                 status="error",
                 message=error_message,
             )
+
+    @traced("ContentEditorAgent.edit_paragraphs")
+    async def edit_paragraphs(self, user_feedback: str, paragraphs: List[str], targets: List[int]) -> Optional[List[str]]:
+        """
+        Regenerates only the targeted paragraphs of a post, each run of consecutive targets shown
+        with its own neighbours as context. A single reply from the editing assistant, without the
+        reflection round, keeps the prompt and the output small.
+
+        Args:
+            user_feedback (str): User feedback.
+            paragraphs (List[str]): The paragraphs of the current post.
+            targets (List[int]): Indexes of the paragraphs to regenerate.
+
+        Returns:
+            Optional[List[str]]: The full list of paragraphs with the targeted ones replaced, or
+                None if the reply could not be matched to the targeted paragraphs.
+        """
+        prompt = self.prompt_budgets[CONTENT_EDITOR_PARAGRAPH_PROMPT].fit(
+            "excerpt", format_paragraph_excerpt(paragraphs, targets),
+            count=str(len(targets)),
+            user_feedback=user_feedback,
+        )
+
+        try:
+            with start_span("llm.chat", **{"llm.agent": self.name, "edit.paragraphs": len(targets)}), \
+                    STAGE_LATENCY.time(stage="editor_paragraph"):
+                reply = await self.editing_assistant.a_generate_reply(messages=[{"content": prompt, "role": "user"}])
+        except Exception as e:
+            record_error("editor_paragraph", e)
+            logger.error(f"Paragraph editing failed: {e}")
+            return None
+
+        content = reply.get("content") if isinstance(reply, dict) else reply
+        if not isinstance(content, str) or not content.strip():
+            return None
+
+        revised = [
+            _REVISE_MARKER.sub("", part.strip())
+            for part in re.split(r"^\s*---\s*$", content.strip(), flags=re.MULTILINE) if part.strip()
+        ]
+        if len(revised) != len(targets):
+            # A single paragraph may legitimately come back as several; anything else is ambiguous
+            if len(targets) != 1:
+                logger.warning(f"Paragraph edit returned {len(revised)} parts for {len(targets)} paragraphs.")
+                return None
+            revised = [_REVISE_MARKER.sub("", content.strip())]
+
+        merged = list(paragraphs)
+        for index, paragraph in zip(targets, revised):
+            merged[index] = paragraph
+        return merged
@@ -0,0 +1,179 @@
+import difflib
+import re
+from typing import Dict, List, Optional
+
+# Feedback that refers to a paragraph by position, e.g. "the second paragraph" or "last sentence"
+_ORDINALS = {
+    "first": 0, "1st": 0, "opening": 0, "intro": 0, "introductory": 0,
+    "second": 1, "2nd": 1, "third": 2, "3rd": 2, "fourth": 3, "4th": 3, "fifth": 4, "5th": 4,
+    "sixth": 5, "6th": 5, "seventh": 6, "7th": 6,
+}
+_LAST = ("last", "final", "closing", "ending", "concluding")
+_POSITION_PATTERN = re.compile(
+    r"\b(" + "|".join(list(_ORDINALS) + list(_LAST)) + r")\s+(paragraph|para|sentence|line|section|part)s?\b"
+)
+_NUMBERED_PATTERN = re.compile(r"\b(?:paragraph|para)\s*#?\s*(\d+)\b")
+_QUOTED_PATTERN = re.compile(r"[\"“”]([^\"“”]{4,})[\"“”]")
+_OPENING_PATTERN = re.compile(r"\b(hook|headline|title|introduction|opening)\b")
+_CTA_PATTERN = re.compile(r"\b(call to action|cta|conclusion)\b")
+_HASHTAG_PATTERN = re.compile(r"\bhashtags?\b")
+
+# Feedback about the post as a whole is never narrowed down to single paragraphs
+_GLOBAL_PATTERN = re.compile(
+    r"\b(whole|entire|overall|throughout|everywhere|every paragraph|all paragraphs|rewrite the post|"
+    r"shorter|longer|tone|voice|restructure|reorder)\b"
+)
+
+PARAGRAPH_SEPARATOR = "\n\n"
+
+
+def split_paragraphs(post: str) -> List[str]:
+    """
+    Splits a post into paragraphs on blank lines.
+
+    Args:
+        post (str): The post content.
+
+    Returns:
+        List[str]: The non-empty paragraphs, stripped.
+    """
+    return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", post.strip()) if paragraph.strip()]
+
+
+def join_paragraphs(paragraphs: List[str]) -> str:
+    return PARAGRAPH_SEPARATOR.join(paragraphs)
+
+
+def _is_hashtag_paragraph(paragraph: str) -> bool:
+    words = paragraph.split()
+    return bool(words) and sum(word.startswith("#") for word in words) >= len(words) / 2
+
+
+def _last_prose_paragraph(paragraphs: List[str]) -> int:
+    for index in range(len(paragraphs) - 1, -1, -1):
+        if not _is_hashtag_paragraph(paragraphs[index]):
+            return index
+    return len(paragraphs) - 1
+
+
+def find_target_paragraphs(feedback: str, paragraphs: List[str]) -> Optional[List[int]]:
+    """
+    Works out which paragraphs a piece of feedback is about, from explicit references such as
+    "the second paragraph", "paragraph 3", "the last sentence", "the hashtags" or a quoted phrase.
+
+    Args:
+        feedback (str): The user feedback.
+        paragraphs (List[str]): The paragraphs of the current post.
+
+    Returns:
+        Optional[List[int]]: Sorted paragraph indexes, or None when the feedback is about the whole
+            post, does not reference anything specific, or touches most of the post anyway.
+    """
+    if len(paragraphs) < 2:
+        return None
+
+    text = feedback.lower()
+    if _GLOBAL_PATTERN.search(text):
+        return None
+
+    targets = set()
+    for word, _ in _POSITION_PATTERN.findall(text):
+        targets.add(_last_prose_paragraph(paragraphs) if word in _LAST else _ORDINALS[word])
+    for number in _NUMBERED_PATTERN.findall(text):
+        targets.add(int(number) - 1)
+    for quoted in _QUOTED_PATTERN.findall(feedback):
+        targets.update(index for index, paragraph in enumerate(paragraphs) if quoted.lower() in paragraph.lower())
+    if _OPENING_PATTERN.search(text):
+        targets.add(0)
+    if _CTA_PATTERN.search(text):
+        targets.add(_last_prose_paragraph(paragraphs))
+    if _HASHTAG_PATTERN.search(text):
+        targets.update(index for index, paragraph in enumerate(paragraphs) if _is_hashtag_paragraph(paragraph))
+
+    targets = sorted(index for index in targets if 0 <= index < len(paragraphs))
+    # Regenerating most of the post paragraph by paragraph would lose its flow
+    if not targets or len(targets) > len(paragraphs) / 2:
+        return None
+    return targets
+
+
+def contiguous_runs(targets: List[int]) -> List[List[int]]:
+    """
+    Groups sorted paragraph indexes into runs of consecutive paragraphs, e.g. [0, 1, 4] into
+    [[0, 1], [4]].
+
+    Args:
+        targets (List[int]): Sorted paragraph indexes.
+
+    Returns:
+        List[List[int]]: The runs, in order.
+    """
+    runs: List[List[int]] = []
+    for index in targets:
+        if runs and index == runs[-1][-1] + 1:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    return runs
+
+
+def format_paragraph_excerpt(paragraphs: List[str], targets: List[int]) -> str:
+    """
+    Lays out the targeted paragraphs for a paragraph edit, each run of consecutive targets between
+    the paragraphs right before and after it, so every target is revised with its own neighbours.
+    Targets are numbered `[Revise n]` and neighbours marked `[Context]`; paragraphs left out in
+    between are shown as `[...]`.
+
+    Args:
+        paragraphs (List[str]): The paragraphs of the post.
+        targets (List[int]): Sorted indexes of the paragraphs to revise.
+
+    Returns:
+        str: The excerpt.
+    """
+    lines: List[str] = []
+    shown = -1
+    number = 0
+    for run in contiguous_runs(targets):
+        first = max(run[0] - 1, 0)
+        last = min(run[-1] + 1, len(paragraphs) - 1)
+        if run[0] == 0:
+            lines.append("(start of the post)")
+        elif first > shown + 1:
+            lines.append("[...]")
+        for index in range(max(first, shown + 1), last + 1):
+            if index in run:
+                number += 1
+                lines.append(f"[Revise {number}] {paragraphs[index]}")
+            else:
+                lines.append(f"[Context] {paragraphs[index]}")
+        shown = last
+    lines.append("(end of the post)" if shown == len(paragraphs) - 1 else "[...]")
+    return PARAGRAPH_SEPARATOR.join(lines)
+
+
+def diff_paragraphs(before: List[str], after: List[str]) -> List[Dict]:
+    """
+    Describes the paragraph-level changes between two versions of a post.
+
+    Args:
+        before (List[str]): The paragraphs of the previous version.
+        after (List[str]): The paragraphs of the new version.
+
+    Returns:
+        List[Dict]: One entry per change with its operation ('replace', 'insert' or 'delete'), the
+            affected paragraph indexes in both versions and the old and new text.
+    """
+    changes = []
+    matcher = difflib.SequenceMatcher(a=before, b=after, autojunk=False)
+    for operation, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+        if operation == "equal":
+            continue
+        changes.append({
+            "op": operation,
+            "before_index": list(range(a_start, a_end)),
+            "after_index": list(range(b_start, b_end)),
+            "before": join_paragraphs(before[a_start:a_end]),
+            "after": join_paragraphs(after[b_start:b_end]),
+        })
+    return changes
@@ -19,6 +19,13 @@ Please review the provided post content and the user feedback, and refine the po
 
 '''
 
+CONTENT_EDITOR_FOLLOWUP_PROMPT = '''
+Please refine your latest version of the post with the additional user feedback below, keeping the earlier feedback in mind.
+
+- **User Feedback**: {user_feedback}
+
+'''
+
 CONTENT_EDITOR_REFLECTION_PROMPT = '''
 You are tasked with reviewing the refined social media post to ensure it effectively aligns with TruStage’s mission and engages the audience. Evaluate and provide actionable feedback based on the following criteria:
 
@@ -52,3 +59,14 @@ You are tasked with reviewing the refined social media post to ensure it effecti
 
 
 '''
+
+CONTENT_EDITOR_PARAGRAPH_PROMPT = '''
+Please revise only the paragraphs of the post marked `[Revise n]` under "Paragraphs to Revise", applying the user feedback. Each one is shown between the paragraphs around it, marked `[Context]`, which are given for context only and must not be repeated. Keep TruStage’s professional and engaging tone, and keep each paragraph roughly the same length unless the feedback asks otherwise.
+
+### Provided Details:
+- **Paragraphs to Revise**:
+{excerpt}
+- **User Feedback**: {user_feedback}
+
+Return only the {count} revised paragraph(s), in order and without their `[Revise n]` markers, separated by a line containing only `---`. Do not add headings, labels or commentary.
+'''
@@ -2,6 +2,10 @@ import logging
 from typing import Optional
 from autogen import AssistantAgent
 from server.setting import SETTINGS
+from server.utils.metrics import STAGE_LATENCY, record_error
+from server.utils.tokens import get_prompt_budget
+from server.utils.llm import get_llm_client
+from server.utils.tracing import start_span, traced
 from .prompt import CONTENT_SUMMARY_SYSTEM_PROMPT, CONTENT_SUMMARY_HUMAN_PROMPT
 import json
 from .types import WebContentSummary
@@ -20,7 +24,12 @@ class WebContentSummaryAgent(AssistantAgent):
         super().__init__(name="Web Content Summary Agent", 
                          system_message=CONTENT_SUMMARY_SYSTEM_PROMPT, 
                          llm_config=SETTINGS.llm_config_list[0])
+        self.prompt_budget = get_prompt_budget("summary", CONTENT_SUMMARY_HUMAN_PROMPT,
+                                               SETTINGS.token_budget.summary_max_tokens, CONTENT_SUMMARY_SYSTEM_PROMPT)
+        # One stateless call per page needs none of the agent machinery
+        self.llm_client = get_llm_client() if SETTINGS.llm_client.enabled else None
         
+    @traced("WebContentSummaryAgent.run")
     async def run(self, web_content: Optional[str] = None) -> str:
         """
         Processes the provided web content and generates a concise markdown summary.
@@ -35,16 +44,24 @@ class WebContentSummaryAgent(AssistantAgent):
             logger.error("No web content provided.")
             return None
 
-        # Format the content into a prompt suitable for the assistant's summary generation.
-        prompt = CONTENT_SUMMARY_HUMAN_PROMPT.format(data=web_content)
+        # Format the content into a prompt suitable for the assistant's summary generation, within the token budget.
+        prompt = self.prompt_budget.fit("data", web_content)
 
         try:
             # Request the assistant to generate a summary in markdown format.
-            response = await self.a_generate_reply(messages=[{"content": prompt, "role": "user"}])
+            with start_span("llm.chat", **{"llm.agent": self.name}), STAGE_LATENCY.time(stage="summary_llm"):
+                if self.llm_client is not None:
+                    response = await self.llm_client.complete(
+                        [{"content": CONTENT_SUMMARY_SYSTEM_PROMPT, "role": "system"}, {"content": prompt, "role": "user"}],
+                        agent="summary",
+                    )
+                else:
+                    response = await self.a_generate_reply(messages=[{"content": prompt, "role": "user"}])
 
             return response
 
         except Exception as e:
+            record_error("summary_llm", e)
             logger.error(f"Error generating markdown content: {e}")
             return {"error": "Unexpected error occurred during content creation", "details": str(e)}
 
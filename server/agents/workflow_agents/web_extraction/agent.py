@@ -1,12 +1,20 @@
 import httpx
-from bs4 import BeautifulSoup
 import asyncio
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 from autogen import AssistantAgent
 from server.setting import SETTINGS
+from server.utils.metrics import STAGE_LATENCY, OPEN_CONNECTIONS, record_error
+from server.utils.tracing import start_span, traced
+from server.utils.cpu_pool import get_cpu_pool
+from server.utils.cache import get_cache, EXTRACTED
+from server.utils.http import get_http_client
+from server.utils.local_index import get_local_index
+from server.utils.llm import get_llm_client
+from server.utils.tokens import get_prompt_budget
 import json
 from .prompt import HTML_CONTENT_SYSTEM_PROMPT, HTML_CONTENT_HUMAN_PROMPT
+from .parsers import get_backend, parse_and_clean
 
 logger = logging.getLogger(__name__)
 
@@ -23,50 +31,84 @@ class WebContentExtractorAgent(AssistantAgent):
         """
         super().__init__(name="Web Content Extraction Agent", system_message=HTML_CONTENT_SYSTEM_PROMPT, llm_config=SETTINGS.llm_config_list[0])
         self.timeout = 10  # Timeout in seconds for HTTP requests
+        self.parser = get_backend(SETTINGS.web_extraction.parser_backend)
+        self.offload_threshold = SETTINGS.web_extraction.offload_threshold_bytes
+        self.prompt_budget = get_prompt_budget("extraction", HTML_CONTENT_HUMAN_PROMPT,
+                                               SETTINGS.token_budget.extraction_max_tokens, HTML_CONTENT_SYSTEM_PROMPT)
+        # One stateless call per page needs none of the agent machinery
+        self.llm_client = get_llm_client() if SETTINGS.llm_client.enabled else None
         
-    async def fetch_content(self, url: str) -> str:
+    async def fetch_page(self, url: str) -> Optional[bytes]:
         """
-        Fetches the content from a web URL and extracts the main body text.
+        Downloads a web page.
 
         Args:
-            url (str): The URL from which to fetch content.
+            url (str): The URL of the page.
 
         Returns:
-            str: The cleaned HTML content of the page, or an error message if fetching fails.
+            Optional[bytes]: The raw HTML, or None if fetching fails.
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=self.timeout)
+            with start_span("http.get", **{"http.url": url}) as span, \
+                    STAGE_LATENCY.time(stage="fetch"), OPEN_CONNECTIONS.track_inprogress(target="web"):
+                response = await get_http_client().get(url, timeout=self.timeout)
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("http.response_content_length", len(response.content))
                 response.raise_for_status()  # Raises an error for bad responses (4xx, 5xx)
-                return self.clean_content(BeautifulSoup(response.content, 'html.parser').body)
         except (httpx.HTTPStatusError, httpx.RequestError) as e:
+            record_error("fetch", e)
             logger.error(f"Error fetching {url}: {e}")
             return None
+        return response.content
+
+    async def parse_page(self, url: str, content: bytes) -> str:
+        """
+        Extracts and cleans the body of a downloaded page.
+
+        Args:
+            url (str): The URL of the page.
+            content (bytes): The raw HTML.
+
+        Returns:
+            str: The cleaned HTML content of the page.
+        """
+        # Large pages are parsed in the CPU pool so they do not block other streams on the event loop
+        with start_span("html.parse", **{"http.url": url, "html.parser": self.parser.name}), \
+                STAGE_LATENCY.time(stage="parse"):
+            return await get_cpu_pool().run(
+                parse_and_clean, content, self.parser.name,
+                size=len(content), threshold=self.offload_threshold, task="html_parse",
+            )
+
+    async def fetch_content(self, url: str) -> str:
+        """
+        Fetches the content from a web URL and extracts the main body text.
+
+        Args:
+            url (str): The URL from which to fetch content.
+
+        Returns:
+            str: The cleaned HTML content of the page, or an error message if fetching fails.
+        """
+        content = await self.fetch_page(url)
+        if content is None:
+            return None
+        return await self.parse_page(url, content)
 
-    def clean_content(self, body: BeautifulSoup) -> str:
+    def clean_content(self, body) -> str:
         """
         Cleans the HTML body by removing unnecessary tags and attributes.
 
         Args:
-            body (BeautifulSoup): The BeautifulSoup object representing the HTML body.
+            body (Tag): The BeautifulSoup tag representing the HTML body.
 
         Returns:
             str: The cleaned HTML content.
         """
-        if not body:
-            return None
-        
-        # Remove unwanted tags like meta, style, script, img, and link
-        for tag in body(['meta', 'style', 'script', 'img', 'link']):
-            tag.decompose()
-        
-        # Clear attributes for all other tags
-        for element in body.find_all(True):
-            element.attrs.clear()
-        
-        # Return the cleaned HTML as a string
-        return str(body).strip()
+        # Remove unwanted tags like meta, style, script, img, and link and clear attributes
+        return get_backend('html.parser').clean(body)
 
+    @traced("WebContentExtractorAgent.run")
     async def run(self, web_url: str = None) -> str:
         """
         Fetches the content from the provided URL and generates a markdown version.
@@ -79,6 +121,10 @@ class WebContentExtractorAgent(AssistantAgent):
         """
         if not web_url:
             raise None
+
+        cached = await get_cache().get(EXTRACTED, web_url)
+        if cached is not None:
+            return cached
         
         # Fetch and clean the content from the web page
         web_content = await self.fetch_content(web_url)
@@ -87,14 +133,41 @@ class WebContentExtractorAgent(AssistantAgent):
         if web_content is None:
             return None
         
-        # Prepare the prompt for content generation using the fetched web content
-        prompt = HTML_CONTENT_HUMAN_PROMPT.format(data=web_content)
+        return await self.convert(web_url, web_content)
+
+    async def convert(self, web_url: str, web_content: str) -> Optional[str]:
+        """
+        Generates the markdown version of a cleaned page and caches it.
+
+        Args:
+            web_url (str): The URL of the page.
+            web_content (str): The cleaned HTML content of the page.
+
+        Returns:
+            Optional[str]: The markdown content, or None if generation fails.
+        """
+        # Prepare the prompt for content generation using the fetched web content, fitted to the token budget
+        prompt = self.prompt_budget.fit("data", web_content)
         
         # Generate the markdown content from the assistant
         try:
-            return await self.a_generate_reply(messages=[{"content": prompt, "role": "user"}])
+            with start_span("llm.chat", **{"llm.agent": self.name}), STAGE_LATENCY.time(stage="extraction_llm"):
+                if self.llm_client is not None:
+                    markdown_content = await self.llm_client.complete(
+                        [{"content": HTML_CONTENT_SYSTEM_PROMPT, "role": "system"}, {"content": prompt, "role": "user"}],
+                        agent="extraction",
+                    )
+                else:
+                    markdown_content = await self.a_generate_reply(messages=[{"content": prompt, "role": "user"}])
  
         except Exception as e:
+            record_error("extraction_llm", e)
             logger.error(f"Error generating markdown content: {e}")
             return None
 
+        if isinstance(markdown_content, str):
+            await get_cache().set(EXTRACTED, web_url, markdown_content)
+            # Later searches for this content can be answered locally
+            await get_local_index().add(web_url, content=markdown_content)
+        return markdown_content
+
@@ -0,0 +1,139 @@
+import importlib.util
+import logging
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Tags removed (with their content) before the HTML is handed to the LLM
+REMOVED_TAGS = frozenset(['meta', 'style', 'script', 'img', 'link'])
+
+DEFAULT_BACKEND = 'html.parser'
+
+
+class SoupBackend:
+    """
+    Parses HTML with BeautifulSoup using the given tree builder ('html.parser', 'lxml' or 'html5lib').
+    All BeautifulSoup builders share the same cleaning code, so their output only differs where the
+    builders themselves repair malformed markup differently.
+    """
+
+    def __init__(self, builder: str, requires: Optional[str] = None) -> None:
+        self.name = builder
+        self.builder = builder
+        self.requires = requires
+
+    @property
+    def available(self) -> bool:
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+    def parse(self, html: Union[bytes, str]):
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html, self.builder).body
+
+    def clean(self, body) -> Optional[str]:
+        """
+        Removes unwanted tags and clears the attributes of every remaining element in a single
+        walk over the tree.
+
+        Args:
+            body (Tag): The <body> element.
+
+        Returns:
+            Optional[str]: The cleaned HTML, or None if there is no body.
+        """
+        if not body:
+            return None
+
+        for element in body.find_all(True):
+            # Descendants of a removed tag are still in the list but already detached
+            if element.decomposed:
+                continue
+            if element.name in REMOVED_TAGS:
+                element.decompose()
+            else:
+                element.attrs.clear()
+
+        return str(body).strip()
+
+
+class SelectolaxBackend:
+    """
+    Parses HTML with selectolax (lexbor engine where available), a C parser that is several times faster than
+    BeautifulSoup on large pages. The same tags are removed and attributes cleared; the serializer
+    differs from BeautifulSoup's in minor details such as void-element and entity formatting.
+    """
+
+    name = 'selectolax'
+    requires = 'selectolax'
+
+    @property
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.requires) is not None
+
+    def parse(self, html: Union[bytes, str]):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        except ImportError:
+            from selectolax.parser import HTMLParser
+
+        return HTMLParser(html).body
+
+    def clean(self, body) -> Optional[str]:
+        if body is None:
+            return None
+
+        body.strip_tags(list(REMOVED_TAGS))
+        for node in body.traverse(include_text=False):
+            if node.mem_id == body.mem_id or not node.attributes:
+                continue
+            attributes = node.attrs
+            for key in list(node.attributes):
+                del attributes[key]
+
+        return body.html.strip()
+
+
+BACKENDS: Dict[str, Union[SoupBackend, SelectolaxBackend]] = {
+    'html.parser': SoupBackend('html.parser'),
+    'lxml': SoupBackend('lxml', requires='lxml'),
+    'html5lib': SoupBackend('html5lib', requires='html5lib'),
+    'selectolax': SelectolaxBackend(),
+}
+
+_WARNED_BACKENDS = set()
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    Returns the requested parser backend, falling back to the pure-Python 'html.parser' when the
+    backend is unknown or its package is not installed.
+
+    Args:
+        name (Optional[str]): The backend name. Defaults to 'html.parser'.
+
+    Returns:
+        The parser backend.
+    """
+    backend = BACKENDS.get(name or DEFAULT_BACKEND)
+    if backend is None or not backend.available:
+        if name not in _WARNED_BACKENDS:
+            _WARNED_BACKENDS.add(name)
+            logger.warning(f"HTML parser backend '{name}' is not available, falling back to '{DEFAULT_BACKEND}'.")
+        backend = BACKENDS[DEFAULT_BACKEND]
+    return backend
+
+
+def parse_and_clean(html: Union[bytes, str], backend: Optional[str] = None) -> Optional[str]:
+    """
+    Parses an HTML document and returns its cleaned <body>.
+
+    Args:
+        html (Union[bytes, str]): The raw HTML document.
+        backend (Optional[str]): The parser backend name.
+
+    Returns:
+        Optional[str]: The cleaned HTML body, or None if the document has no body.
+    """
+    parser = get_backend(backend)
+    return parser.clean(parser.parse(html))
@@ -14,6 +14,8 @@ Your response should directly provide the Markdown content as output.
 Below is the HTML content that you need to convert to Markdown:
 '''
 
+HTML_CONTENT_SYSTEM_PROMPT = ARTICLE_REFINER_PROMPT
+
 HTML_CONTENT_HUMAN_PROMPT = '''
 Here is the HTML content that requires conversion to Markdown format:
 {data}
@@ -1,14 +1,131 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import StreamingResponse
-from server.agents.system_agents.content_creator.agent import ContentCreationSystemAgent
-from server.agents.system_agents.content_editor.agent import ContentEditorSystemAgent
+from fastapi.responses import JSONResponse, StreamingResponse
+from server.setting import SETTINGS
+from server.utils.admission import AdmissionTicket, admit, guard_stream
+from server.utils.cache_warming import record_request
+from server.utils.profiling import should_profile, profile_stream
+from server.utils.rate_limit import UserLease, guard_user_stream, limit_user
+from server.utils.sse import format_sse
+from server.utils.warmup import wait_for_preimport
+import asyncio
 import json
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Tuple
 
 # Initialize a logger for error handling
 logger = logging.getLogger(__name__)
 
+
+async def _admit_pipeline(route: str, user: str) -> Tuple[Optional[AdmissionTicket], Optional[UserLease]]:
+    """
+    Admits a pipeline, then counts it against the user's limits, so a request that is not admitted
+    is not counted. A request over the user's limits gives its admission slot back right away.
+    """
+    ticket = await admit(route)
+    try:
+        return ticket, await limit_user(user)
+    except BaseException:
+        if ticket is not None:
+            ticket.release()
+        raise
+
+
+async def _release_pipeline(ticket: Optional[AdmissionTicket], lease: Optional[UserLease]) -> None:
+    """
+    Gives back the slots of a pipeline whose stream may never run. Slots already released when
+    the stream ended are not released twice.
+    """
+    if ticket is not None:
+        ticket.release()
+    if lease is not None:
+        await lease.release()
+
+
+class _PipelineResponse(StreamingResponse):
+    """
+    Streams a pipeline and gives back its slots once the response is over, including when the
+    client went away before the body started and the pipeline stream never ran.
+    """
+
+    def __init__(self, content, ticket: Optional[AdmissionTicket], lease: Optional[UserLease], **kwargs) -> None:
+        super().__init__(content=content, **kwargs)
+        self._ticket = ticket
+        self._lease = lease
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await asyncio.shield(_release_pipeline(self._ticket, self._lease))
+
+
+async def _resumable_content_stream(req_id: str, request: Request, user: str, topic: str, sources: list,
+                                    create_agent_stream) -> StreamingResponse:
+    """
+    Runs the content creation pipeline for a req_id in the background with its events buffered,
+    and streams them to the client. A client whose connection dropped sends the same request
+    again with `Last-Event-ID` set to the last event it received (events are numbered from 1 in
+    stream order; SSE clients get the ids in the stream) and gets the remaining events without
+    the pipeline running twice. A request for a req_id that already has a stream is only a
+    resume if it carries `Last-Event-ID` and the same topic and sources; otherwise it is rejected
+    with 409. Only a new stream counts against the user's limits and goes through admission control.
+    """
+    from server.jobs import Job, get_stream_manager
+
+    manager = get_stream_manager()
+    last_event_id = request.headers.get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    job = await manager.get(req_id)
+    if job is None and manager.is_running(req_id):
+        # Started by a concurrent request and not saved yet
+        logger.warning(f"Request id already used by a starting content stream [req_id={req_id}].")
+        raise HTTPException(status_code=409, detail="This request id is already in use.")
+    if job is not None and job.user != user:
+        logger.warning(f"Request id already used by another user [req_id={req_id}].")
+        raise HTTPException(status_code=409, detail="This request id is already in use.")
+    if job is not None and (not last_event_id or job.topic != topic or list(job.sources) != list(sources)):
+        logger.warning(f"Request id already used by another content stream [req_id={req_id}].")
+        raise HTTPException(
+            status_code=409,
+            detail="This request id is already in use. Send Last-Event-ID with the same topic and sources to resume it.",
+        )
+    if job is None:
+        # A stream that expired cannot be resumed; it starts over
+        after = 0
+        ticket, lease = await _admit_pipeline("get-content", user)
+        try:
+            # A concurrent request may have started the stream while this one was admitted. Nothing
+            # is awaited between this check and `start` reserving the id.
+            if manager.is_running(req_id):
+                logger.warning(f"Request id already used by a starting content stream [req_id={req_id}].")
+                raise HTTPException(status_code=409, detail="This request id is already in use.")
+            job = await manager.start(
+                Job(job_id=req_id, user=user, topic=topic, sources=sources),
+                lambda *args: guard_stream(ticket, guard_user_stream(lease, create_agent_stream(*args))),
+            )
+        except BaseException:
+            await _release_pipeline(ticket, lease)
+            raise
+        await record_request(topic, sources)
+        logger.info(f"Successfully initiated content creation process [req_id={req_id}, topic={topic}].")
+    else:
+        logger.info(f"Resuming content stream after event {after} [req_id={req_id}, status={job.status.value}].")
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def content_stream() -> AsyncGenerator[str, None]:
+        # Disconnecting only ends this subscription; the pipeline keeps running for a resume
+        async for seq, event in manager.subscribe(req_id, after):
+            yield format_sse(seq, event) if sse else event
+
+    return StreamingResponse(
+        content=content_stream(),
+        media_type="text/event-stream" if sse else "application/json",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 async def fetch_content(req_id: str, request: Request) -> StreamingResponse:
     """
     Handle requests to fetch content by orchestrating the content creation process.
@@ -28,16 +145,38 @@ async def fetch_content(req_id: str, request: Request) -> StreamingResponse:
             logger.warning(f"Invalid sources format. Expected list, got {type(sources)} [req_id={req_id}].")
             raise HTTPException(status_code=400, detail="Sources must be a list.")
         
-        # Orchestrate content creation using the ContentCreationSystemAgent
+        # Orchestrate content creation using the ContentCreationSystemAgent. The agents (and autogen
+        # with them) are imported on first use, or ahead of time by the warmup in the app lifespan.
+        await wait_for_preimport()
+        from server.agents.system_agents.content_creator.agent import ContentCreationSystemAgent
+
         user = request.headers.get("user", "default_user")
-        content_agent = ContentCreationSystemAgent(req_id=req_id, user=user)
+        profile = should_profile(request.headers, user)
+
+        def create_agent_stream(*_) -> AsyncGenerator[str, None]:
+            content_agent = ContentCreationSystemAgent(req_id=req_id, user=user)
+            agent_stream = content_agent.run(topic, sources)
+            if profile:
+                agent_stream = profile_stream(req_id, "get-content", agent_stream)
+            return agent_stream
+
+        if SETTINGS.streams.resumable:
+            return await _resumable_content_stream(req_id, request, user, topic, sources, create_agent_stream)
+
+        ticket, lease = await _admit_pipeline("get-content", user)
+        try:
+            agent_stream = guard_stream(ticket, guard_user_stream(lease, create_agent_stream()))
+            await record_request(topic, sources)
+        except BaseException:
+            await _release_pipeline(ticket, lease)
+            raise
 
         async def content_stream() -> AsyncGenerator[str, None]:
-            async for document_data in content_agent.run(topic, sources):
+            async for document_data in agent_stream:
                 yield document_data
 
         logger.info(f"Successfully initiated content creation process [req_id={req_id}, topic={topic}].")
-        return StreamingResponse(content=content_stream(), media_type="application/json")
+        return _PipelineResponse(content_stream(), ticket, lease, media_type="application/json")
 
     except HTTPException as http_ex:
         logger.error(f"Validation error in fetch_content [req_id={req_id}]: {http_ex.detail}")
@@ -45,6 +184,7 @@ async def fetch_content(req_id: str, request: Request) -> StreamingResponse:
             content=json.dumps({"error": http_ex.detail}),
             media_type="application/json",
             status_code=http_ex.status_code,
+            headers=http_ex.headers,
         )
     except Exception as ex:
         logger.error(f"Unhandled exception in fetch_content [req_id={req_id}]: {ex}")
@@ -54,6 +194,76 @@ async def fetch_content(req_id: str, request: Request) -> StreamingResponse:
         )
 
 
+async def fetch_batch_content(req_id: str, request: Request) -> StreamingResponse:
+    """
+    Handle requests to fetch content for many topics at once. Searches and pages shared between
+    topics are executed once per batch, and results are streamed per topic.
+    """
+    try:
+        request_body = await request.json()
+        default_sources = request_body.get("sources", [])
+        topics = request_body.get("topics")
+
+        # Validate required fields
+        if not topics or not isinstance(topics, list):
+            logger.warning(f"Missing or invalid field: 'topics' in request [req_id={req_id}].")
+            raise HTTPException(status_code=400, detail="Missing required field: 'topics' (a list).")
+        if len(topics) > SETTINGS.batch.max_topics:
+            logger.warning(f"Too many topics in batch: {len(topics)} [req_id={req_id}].")
+            raise HTTPException(status_code=400, detail=f"A batch can contain at most {SETTINGS.batch.max_topics} topics.")
+        if not isinstance(default_sources, list):
+            raise HTTPException(status_code=400, detail="Sources must be a list.")
+
+        # Topics are either plain strings using the shared sources, or objects with their own sources
+        await wait_for_preimport()
+        from server.agents.system_agents.content_batch.types import BatchTopic
+
+        batch = []
+        for item in topics:
+            item = {"topic": item} if isinstance(item, str) else item
+            if not isinstance(item, dict) or not item.get("topic"):
+                raise HTTPException(status_code=400, detail="Every topic needs a non-empty 'topic'.")
+            sources = item.get("sources") or default_sources
+            if not sources or not isinstance(sources, list):
+                raise HTTPException(status_code=400, detail=f"No sources given for topic '{item['topic']}'.")
+            batch.append(BatchTopic(topic=item["topic"], sources=sources))
+
+        from server.agents.system_agents.content_batch.agent import ContentBatchSystemAgent
+
+        user = request.headers.get("user", "default_user")
+        ticket, lease = await _admit_pipeline("get-batch-content", user)
+        try:
+            batch_agent = ContentBatchSystemAgent(req_id=req_id, user=user)
+            agent_stream = guard_stream(ticket, guard_user_stream(lease, batch_agent.run(batch)))
+            if should_profile(request.headers, user):
+                agent_stream = profile_stream(req_id, "get-batch-content", agent_stream)
+        except BaseException:
+            await _release_pipeline(ticket, lease)
+            raise
+
+        async def content_stream() -> AsyncGenerator[str, None]:
+            async for document_data in agent_stream:
+                yield document_data
+
+        logger.info(f"Successfully initiated batch content creation process [req_id={req_id}, topics={len(batch)}].")
+        return _PipelineResponse(content_stream(), ticket, lease, media_type="application/json")
+
+    except HTTPException as http_ex:
+        logger.error(f"Validation error in fetch_batch_content [req_id={req_id}]: {http_ex.detail}")
+        return StreamingResponse(
+            content=json.dumps({"error": http_ex.detail}),
+            media_type="application/json",
+            status_code=http_ex.status_code,
+            headers=http_ex.headers,
+        )
+    except Exception as ex:
+        logger.error(f"Unhandled exception in fetch_batch_content [req_id={req_id}]: {ex}")
+        return StreamingResponse(
+            content=json.dumps({"error": "An unexpected error occurred."}),
+            media_type="application/json",
+        )
+
+
 async def edit_content(req_id: str, request: Request) -> StreamingResponse:
     """
     Handle requests to edit content based on user feedback.
@@ -67,20 +277,36 @@ async def edit_content(req_id: str, request: Request) -> StreamingResponse:
         if not feedback:
             logger.warning(f"Missing required field: 'feedback' in request [req_id={req_id}].")
             raise HTTPException(status_code=400, detail="Missing required field: 'feedback'.")
-        if not post_content:
+        # The post can be omitted on follow-up edits; the latest stored version is edited then
+        from server.agents.system_agents.content_editor.versions import get_version_store
+
+        if not post_content and await get_version_store().latest(req_id) is None:
             logger.warning(f"Missing required field: 'postContent' in request [req_id={req_id}].")
             raise HTTPException(status_code=400, detail="Missing required field: 'postContent'.")
 
         # Orchestrate content refinement using the ContentRefinementSystemAgent
+        await wait_for_preimport()
+        from server.agents.system_agents.content_editor.agent import ContentEditorSystemAgent
+
         user = request.headers.get("user", "default_user")
-        content_agent = ContentEditorSystemAgent(req_id=req_id, user=user)
+        ticket, lease = await _admit_pipeline("edit-content", user)
+        try:
+            content_agent = ContentEditorSystemAgent(req_id=req_id, user=user)
+            agent_stream = guard_stream(
+                ticket, guard_user_stream(lease, content_agent.run(post_content=post_content, user_feedback=feedback))
+            )
+            if should_profile(request.headers, user):
+                agent_stream = profile_stream(req_id, "edit-content", agent_stream)
+        except BaseException:
+            await _release_pipeline(ticket, lease)
+            raise
 
         async def content_stream() -> AsyncGenerator[str, None]:
-            async for document_data in content_agent.run(post_content=post_content, user_feedback=feedback):
+            async for document_data in agent_stream:
                 yield document_data
 
         logger.info(f"Successfully initiated content refinement process [req_id={req_id}].")
-        return StreamingResponse(content=content_stream(), media_type="application/json")
+        return _PipelineResponse(content_stream(), ticket, lease, media_type="application/json")
 
     except HTTPException as http_ex:
         logger.error(f"Validation error in edit_content [req_id={req_id}]: {http_ex.detail}")
@@ -88,6 +314,7 @@ async def edit_content(req_id: str, request: Request) -> StreamingResponse:
             content=json.dumps({"error": http_ex.detail}),
             media_type="application/json",
             status_code=http_ex.status_code,
+            headers=http_ex.headers,
         )
     except Exception as ex:
         logger.error(f"Unhandled exception in edit_content [req_id={req_id}]: {ex}")
@@ -95,3 +322,22 @@ async def edit_content(req_id: str, request: Request) -> StreamingResponse:
             content=json.dumps({"error": "An unexpected error occurred."}),
             media_type="application/json",
         )
+
+
+async def get_content_versions(req_id: str, request: Request) -> JSONResponse:
+    """
+    Return the post versions stored for a request's edit session, oldest first.
+    """
+    from server.agents.system_agents.content_editor.versions import get_version_store
+
+    user = request.headers.get("user", "default_user")
+    store = get_version_store()
+    versions = await store.list(req_id) if await store.owner(req_id) == user else []
+    if not versions:
+        return JSONResponse(content={"error": f"No edit session found for request '{req_id}'."}, status_code=404)
+
+    return JSONResponse(content={
+        "req_id": req_id,
+        "version": versions[-1][0],
+        "versions": [{"version": version, "post": post} for version, post in versions],
+    })
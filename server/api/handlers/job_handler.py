@@ -0,0 +1,131 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from server.jobs import JobQueueFull, get_job_manager
+from server.utils.cache_warming import record_request
+from server.utils.rate_limit import RateLimited, limit_user
+from server.utils.sse import format_sse
+import logging
+from typing import AsyncGenerator
+
+# Initialize a logger for error handling
+logger = logging.getLogger(__name__)
+
+
+def _job_links(job_id: str) -> dict:
+    base = f"/api/v1/jobs/{job_id}"
+    return {"self": base, "events": f"{base}/events", "result": f"{base}/result"}
+
+
+def _not_found(job_id: str) -> JSONResponse:
+    return JSONResponse(content={"error": f"No job found with id '{job_id}'."}, status_code=404)
+
+
+async def submit_job(request: Request) -> JSONResponse:
+    """
+    Queue a content generation job and return its id immediately.
+    """
+    try:
+        request_body = await request.json()
+    except ValueError:
+        return JSONResponse(content={"error": "Request body must be JSON."}, status_code=400)
+
+    topic = request_body.get("topic")
+    sources = request_body.get("sources", [])
+    if not topic:
+        logger.warning("Missing required field: 'topic' in job submission.")
+        return JSONResponse(content={"error": "Missing required field: 'topic'."}, status_code=400)
+    if sources and not isinstance(sources, list):
+        logger.warning(f"Invalid sources format in job submission. Expected list, got {type(sources)}.")
+        return JSONResponse(content={"error": "Sources must be a list."}, status_code=400)
+
+    user = request.headers.get("user", "default_user")
+    try:
+        # The job holds no stream slot; its prompts are charged to the user when it runs
+        await limit_user(user, stream=False)
+    except RateLimited as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code, headers=e.headers)
+    try:
+        job = await get_job_manager().submit(user=user, topic=topic, sources=sources)
+    except JobQueueFull:
+        logger.warning(f"Rejected job submission from user {user}: job queue is full.")
+        return JSONResponse(
+            content={"error": "Too many jobs are queued. Please retry later."},
+            status_code=503,
+            headers={"Retry-After": "30"},
+        )
+
+    await record_request(topic, sources)
+    return JSONResponse(
+        content={"job_id": job.job_id, "status": job.status.value, "links": _job_links(job.job_id)},
+        status_code=202,
+        headers={"Location": _job_links(job.job_id)["self"]},
+    )
+
+
+async def get_job(job_id: str) -> JSONResponse:
+    """
+    Return the status of a job.
+    """
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        return _not_found(job_id)
+
+    return JSONResponse(content={**job.model_dump(mode="json", exclude={"result"}), "links": _job_links(job_id)})
+
+
+async def get_job_events(job_id: str, request: Request, after: int = 0, stream: bool = False):
+    """
+    Return the events of a job. Polling clients pass the last event id they have seen as `after`;
+    clients that ask for `text/event-stream` (or pass `stream=true`) are subscribed and receive
+    server-sent events until the job finishes, resuming from `Last-Event-ID` when reconnecting.
+    """
+    manager = get_job_manager()
+    job = await manager.get(job_id)
+    if job is None:
+        return _not_found(job_id)
+
+    if stream or "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id", "")
+        if last_event_id.isdigit():
+            after = max(after, int(last_event_id))
+
+        async def event_stream() -> AsyncGenerator[str, None]:
+            async for seq, event in manager.subscribe(job_id, after):
+                yield format_sse(seq, event)
+
+        return StreamingResponse(
+            content=event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    events = await manager.events(job_id, after)
+    return JSONResponse(content={
+        "job_id": job_id,
+        "status": job.status.value,
+        "events": [{"id": seq, "data": event} for seq, event in events],
+        "next": events[-1][0] if events else after,
+    })
+
+
+async def get_job_result(job_id: str) -> JSONResponse:
+    """
+    Return the result of a finished job, or 202 while it is still queued or running.
+    """
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        return _not_found(job_id)
+
+    if not job.done:
+        return JSONResponse(
+            content={"job_id": job_id, "status": job.status.value},
+            status_code=202,
+            headers={"Retry-After": "5"},
+        )
+
+    return JSONResponse(content={
+        "job_id": job_id,
+        "status": job.status.value,
+        "error": job.error,
+        "result": job.result,
+    })
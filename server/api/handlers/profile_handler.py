@@ -0,0 +1,36 @@
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse
+from server.utils.profiling import is_authorized, list_profiles, get_profile_path
+import logging
+import os
+
+# Initialize a logger for error handling
+logger = logging.getLogger(__name__)
+
+
+async def get_profiles(request: Request) -> JSONResponse:
+    """
+    List the stored request profiles. Restricted to users authorized for profiling.
+    """
+    user = request.headers.get("user", "default_user")
+    if not is_authorized(user):
+        logger.warning(f"Unauthorized profile listing attempt by user: {user}.")
+        return JSONResponse(content={"error": "Not authorized to access profiles."}, status_code=403)
+
+    return JSONResponse(content={"profiles": list_profiles()})
+
+
+async def download_profile(req_id: str, request: Request):
+    """
+    Download the stored profile of a request. Restricted to users authorized for profiling.
+    """
+    user = request.headers.get("user", "default_user")
+    if not is_authorized(user):
+        logger.warning(f"Unauthorized profile download attempt by user: {user} [req_id={req_id}].")
+        return JSONResponse(content={"error": "Not authorized to access profiles."}, status_code=403)
+
+    path = get_profile_path(req_id)
+    if path is None:
+        return JSONResponse(content={"error": f"No profile found for request '{req_id}'."}, status_code=404)
+
+    return FileResponse(path, filename=os.path.basename(path))
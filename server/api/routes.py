@@ -1,8 +1,18 @@
 from fastapi import APIRouter
-from .handlers.content_handler import fetch_content, edit_content
+from .handlers.content_handler import fetch_content, fetch_batch_content, edit_content, get_content_versions
+from .handlers.profile_handler import get_profiles, download_profile
+from .handlers.job_handler import submit_job, get_job, get_job_events, get_job_result
 from fastapi.responses import StreamingResponse
 
 api_router = APIRouter()
 
 api_router.post('/content/{req_id}/get-content' )(fetch_content)
-api_router.post('/content/{req_id}/edit-content' )(edit_content)
\ No newline at end of file
+api_router.post('/content/{req_id}/edit-content' )(edit_content)
+api_router.post('/content/{req_id}/get-batch-content')(fetch_batch_content)
+api_router.get('/content/{req_id}/versions')(get_content_versions)
+api_router.get('/profiles')(get_profiles)
+api_router.get('/profiles/{req_id}')(download_profile)
+api_router.post('/jobs')(submit_job)
+api_router.get('/jobs/{job_id}')(get_job)
+api_router.get('/jobs/{job_id}/events')(get_job_events)
+api_router.get('/jobs/{job_id}/result')(get_job_result)
\ No newline at end of file
@@ -1,22 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware import Middleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.errors import ServerErrorMiddleware
 from .api import api_router
+from .utils.metrics import EXECUTOR_QUEUE_DEPTH, InFlightRequestsMiddleware, render_metrics
+from .utils.cpu_pool import shutdown_cpu_pool
+from .utils.warmup import is_ready, start_warmup, warmup, warmup_report
+from .utils.cache import close_cache
+from .utils.local_index import close_local_index
+from .utils.rate_limit import close_rate_limiter
+from .utils.llm import close_llm_client
+from .utils.http import close_http_client
+from .utils.cache_warming import start_cache_warming, stop_cache_warming
+from .utils.tracing import close_tracer
+from .agents.system_agents.content_editor.versions import close_version_store
+from .jobs import shutdown_job_manager
+from .setting import SETTINGS
 
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy dependencies are imported, agents built and connections opened lazily; do it now so
+    # the first request does not pay for it. By default this runs in the background so health
+    # probes answer immediately, and /api/ready reports when the worker can take traffic.
+    warmup_task = None
+    if SETTINGS.warmup.blocking:
+        await warmup()
+    else:
+        warmup_task = start_warmup()
+    start_cache_warming()
+    yield
+    await stop_cache_warming()
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
+    await shutdown_job_manager()
+    # Stop CPU pool worker processes on shutdown
+    shutdown_cpu_pool()
+    close_cache()
+    close_local_index()
+    close_rate_limiter()
+    await close_llm_client()
+    await close_http_client()
+    close_version_store()
+    close_tracer()
+
+
 # Initialize FastAPI app with middleware
 app = FastAPI(
     title='DocumentProcessing',
+    lifespan=lifespan,
     middleware=[
         Middleware(ServerErrorMiddleware),
+        # Streaming responses keep the request in flight until the body has been sent
+        Middleware(InFlightRequestsMiddleware),
         Middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
     ]
 )
-# app.state.limiter = slowapi_rate_limiter
-# app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # API routes
 # @app.get('/api/user/validate')
@@ -35,5 +79,22 @@ app = FastAPI(
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get('/api/ready')
+async def readiness_check():
+    # Only ready once the warmup finished, so scaled out workers get traffic when they are warm
+    if not is_ready():
+        return JSONResponse(content={"status": "warming up", "steps": warmup_report()}, status_code=503)
+    return {"status": "ready", "steps": warmup_report()}
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    # Sample the default executor backlog (sync work pushed off the event loop) at scrape time
+    executor = getattr(asyncio.get_running_loop(), '_default_executor', None)
+    work_queue = getattr(executor, '_work_queue', None)
+    EXECUTOR_QUEUE_DEPTH.set(work_queue.qsize() if work_queue is not None else 0, executor="default")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Include additional API routes
 app.include_router(api_router, prefix='/api/v1')
\ No newline at end of file
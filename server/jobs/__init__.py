@@ -0,0 +1,4 @@
+from .manager import JobManager, JobQueueFull, get_job_manager, get_stream_manager, shutdown_job_manager
+from .types import Job, JobStatus
+
+__all__ = ['Job', 'JobStatus', 'JobManager', 'JobQueueFull', 'get_job_manager', 'get_stream_manager', 'shutdown_job_manager']
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from server.utils.metrics import REGISTRY, EXECUTOR_QUEUE_DEPTH, record_error
+from server.utils.rate_limit import charge_user_stream
+from server.utils.sse import parse_agent_event
+from server.utils.warmup import wait_for_preimport
+from .store import create_job_store
+from .types import Job, JobStatus
+
+
+logger = logging.getLogger(__name__)
+
+JOBS = REGISTRY.counter(
+    "content_writer_jobs_total",
+    "Content generation jobs by final status (rejected when the queue was full).",
+    ["status"],
+)
+
+
+# Creates the event stream of a job, e.g. the content creation pipeline for its topic
+StreamFactory = Callable[[Job], AsyncGenerator[str, None]]
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the job queue is at capacity."""
+
+
+class JobManager:
+    """
+    Runs content generation jobs on a fixed pool of background workers fed by a bounded queue.
+    Job state and events go to a job store, so clients can poll or subscribe from any worker
+    process and fetch the result after the submitting request has long returned.
+    """
+
+    def __init__(self, store, workers: int, max_queue: int, result_ttl: float, poll_interval: float = 0.5,
+                 max_events: int = 0, name: str = "jobs") -> None:
+        """
+        Args:
+            store: The job store (see `server.jobs.store`).
+            workers (int): Jobs executed concurrently by this process.
+            max_queue (int): Jobs allowed to wait for a worker before submissions are rejected.
+            result_ttl (float): Seconds finished jobs and their events are kept.
+            poll_interval (float): Seconds between store reads while subscribed to a job running elsewhere.
+            max_events (int): Events kept per job; older ones are dropped. 0 keeps all of them.
+            name (str): Name of the queue in metrics.
+        """
+        self.store = store
+        self.workers = max(workers, 1)
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.max_events = max_events
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self._detached: Dict[str, asyncio.Task] = {}
+        self._signals: Dict[str, asyncio.Event] = {}
+        self._last_prune = 0.0
+        EXECUTOR_QUEUE_DEPTH.set_function(self._queue.qsize, executor=name)
+
+    def _ensure_started(self) -> None:
+        # Workers are started on first use, inside the running event loop
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    def _notify(self, job_id: str) -> None:
+        signal = self._signals.pop(job_id, None)
+        if signal is not None:
+            signal.set()
+
+    async def submit(self, user: str, topic: str, sources: List[str]) -> Job:
+        """
+        Queues a content generation job.
+
+        Args:
+            user (str): The user submitting the job.
+            topic (str): The content topic.
+            sources (List[str]): The sources to search.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            JobQueueFull: If the queue is at capacity.
+        """
+        self._ensure_started()
+        if self._queue.full():
+            JOBS.inc(status="rejected")
+            raise JobQueueFull()
+
+        job = Job(job_id=uuid.uuid4().hex, user=user, topic=topic, sources=sources)
+        await self.store.save_job(job)
+        self._queue.put_nowait(job)
+        logger.info(f"[{job.job_id}] Queued content generation job for topic: {topic}.")
+        return job
+
+    async def start(self, job: Job, stream_factory: Optional[StreamFactory] = None) -> Job:
+        """
+        Runs a job right away in a background task, outside the queue. Unlike a queued job it
+        starts without waiting for a worker, and it keeps running when its client disconnects.
+
+        Args:
+            job (Job): The job to run. A job with the same id already running here is reused.
+            stream_factory (Optional[StreamFactory]): Creates the event stream for the job.
+                Defaults to the content creation pipeline.
+
+        Returns:
+            Job: The job that is running.
+        """
+        if job.job_id in self._detached:
+            return await self.store.get_job(job.job_id) or job
+
+        # Reserve the id before the first await, so that concurrent starts run the job once. The
+        # task saves the job as soon as it runs; subscribers wait for it meanwhile.
+        task = asyncio.create_task(self._run(job, stream_factory))
+        self._detached[job.job_id] = task
+        task.add_done_callback(lambda _: self._detached.pop(job.job_id, None))
+        return job
+
+    def is_running(self, job_id: str) -> bool:
+        """
+        Returns whether a job started with `start` is running in this process, including one
+        started so recently that it is not saved yet.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            bool: Whether the job is running here.
+        """
+        return job_id in self._detached
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _content_creation_stream(job: Job) -> AsyncGenerator[str, None]:
+        from server.agents.system_agents.content_creator.agent import ContentCreationSystemAgent
+
+        stream = ContentCreationSystemAgent(req_id=job.job_id, user=job.user).run(job.topic, job.sources)
+        return charge_user_stream(job.user, stream)
+
+    async def _run(self, job: Job, stream_factory: Optional[StreamFactory] = None) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        await self.store.save_job(job)
+        self._notify(job.job_id)
+
+        try:
+            await wait_for_preimport()
+            stream = (stream_factory or self._content_creation_stream)(job)
+            async for event in stream:
+                job.event_count += 1
+                await self.store.add_event(job.job_id, job.event_count, event)
+                if self.max_events and job.event_count > self.max_events:
+                    await self.store.trim_events(job.job_id, job.event_count - self.max_events)
+                self._notify(job.job_id)
+
+                parsed = parse_agent_event(event)
+                if parsed and parsed["type"] == "WEB_DATA" and parsed["source"]:
+                    job.result.append({"source": parsed["source"], "summary": parsed["data"]})
+            job.status = JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "The server shut down before the job finished."
+            raise
+        except Exception as e:
+            record_error("job", e)
+            logger.error(f"[{job.job_id}] Content generation job failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = "An unexpected error occurred."
+        finally:
+            job.finished_at = time.time()
+            JOBS.inc(status=job.status.value)
+            await asyncio.shield(self.store.save_job(job))
+            self._notify(job.job_id)
+            await self._prune()
+
+    async def _prune(self) -> None:
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        # Jobs still unfinished after the TTL were orphaned by a worker process that died
+        await self.store.prune(now - self.result_ttl, now - self.result_ttl)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """
+        Returns the current state of a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown or expired.
+        """
+        return await self.store.get_job(job_id)
+
+    async def events(self, job_id: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Returns the events of a job after the given sequence number.
+
+        Args:
+            job_id (str): The job id.
+            after (int): The last sequence number already seen.
+            limit (Optional[int]): Maximum number of events to return.
+
+        Returns:
+            List[Tuple[int, str]]: (sequence number, event) pairs.
+        """
+        return await self.store.read_events(job_id, after, limit)
+
+    async def subscribe(self, job_id: str, after: int = 0) -> AsyncGenerator[Tuple[int, str], None]:
+        """
+        Streams the events of a job as they are produced, until the job finishes.
+
+        Args:
+            job_id (str): The job id.
+            after (int): The last sequence number already seen.
+
+        Yields:
+            Tuple[int, str]: (sequence number, event) pairs.
+        """
+        try:
+            while True:
+                # Register before reading so an event added in between still wakes us up
+                signal = self._signals.setdefault(job_id, asyncio.Event())
+                events = await self.store.read_events(job_id, after)
+                for seq, event in events:
+                    yield seq, event
+                    after = seq
+                if events:
+                    continue
+
+                job = await self.store.get_job(job_id)
+                if job is None and job_id not in self._detached:
+                    return
+                if job is not None and job.done:
+                    # Events written between the read and the status check
+                    for seq, event in await self.store.read_events(job_id, after):
+                        yield seq, event
+                    return
+                if job is not None and time.time() - job.created_at > self.result_ttl:
+                    # Left running by a worker process that died
+                    logger.warning(f"[{job_id}] Job has not finished within {self.result_ttl}s, ending the subscription.")
+                    return
+
+                # Jobs run by another worker process do not signal this one, so poll as well
+                try:
+                    await asyncio.wait_for(signal.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Released once the job is done; a subscriber still waiting just falls back to polling
+            self._signals.pop(job_id, None)
+
+    async def shutdown(self) -> None:
+        """
+        Stops the workers. Running jobs are marked as failed; queued jobs are failed too, since
+        the queue lives in this process.
+        """
+        tasks = self._tasks + list(self._detached.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status = JobStatus.FAILED
+            job.error = "The server shut down before the job started."
+            job.finished_at = time.time()
+            await self.store.save_job(job)
+        self.store.close()
+
+
+_MANAGER: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """
+    Returns the process wide job manager, configured from the job settings.
+
+    Returns:
+        JobManager: The shared job manager.
+    """
+    global _MANAGER
+    if _MANAGER is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.jobs
+        _MANAGER = JobManager(
+            create_job_store(settings.store, settings.store_path),
+            workers=settings.workers,
+            max_queue=settings.max_queue,
+            result_ttl=settings.result_ttl_seconds,
+            poll_interval=settings.poll_interval,
+        )
+    return _MANAGER
+
+
+_STREAM_MANAGER: Optional[JobManager] = None
+
+
+def get_stream_manager() -> JobManager:
+    """
+    Returns the process wide manager of resumable get-content streams. Each stream runs as a
+    detached job keyed by its req_id, with its events buffered for replay, configured from the
+    stream settings.
+
+    Returns:
+        JobManager: The shared stream manager.
+    """
+    global _STREAM_MANAGER
+    if _STREAM_MANAGER is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.streams
+        _STREAM_MANAGER = JobManager(
+            create_job_store(settings.store, settings.store_path),
+            workers=1,
+            max_queue=1,
+            result_ttl=settings.ttl_seconds,
+            poll_interval=settings.poll_interval,
+            max_events=settings.max_events,
+            name="streams",
+        )
+    return _STREAM_MANAGER
+
+
+async def shutdown_job_manager() -> None:
+    """
+    Stops the shared job and stream managers, if they were started.
+    """
+    global _MANAGER, _STREAM_MANAGER
+    if _MANAGER is not None:
+        await _MANAGER.shutdown()
+        _MANAGER = None
+    if _STREAM_MANAGER is not None:
+        await _STREAM_MANAGER.shutdown()
+        _STREAM_MANAGER = None
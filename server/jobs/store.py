@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from server.utils.sqlite import SqliteConnections
+from .types import Job
+
+
+class MemoryJobStore:
+    """
+    Keeps jobs and their events in the memory of the current process. Only suitable for a single
+    worker: a job can only be polled through the process that accepted it.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, str] = {}
+        self._events: Dict[str, Dict[int, str]] = {}
+        self._lock = threading.Lock()
+
+    async def save_job(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job.model_dump_json()
+            self._events.setdefault(job.job_id, {})
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        data = self._jobs.get(job_id)
+        return Job.model_validate_json(data) if data is not None else None
+
+    async def add_event(self, job_id: str, seq: int, event: str) -> None:
+        with self._lock:
+            self._events.setdefault(job_id, {})[seq] = event
+
+    async def read_events(self, job_id: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        with self._lock:
+            # Sequence numbers are written in increasing order, so the dict is already sorted
+            events = [(seq, event) for seq, event in self._events.get(job_id, {}).items() if seq > after]
+        return events if limit is None else events[:limit]
+
+    async def trim_events(self, job_id: str, up_to: int) -> None:
+        with self._lock:
+            events = self._events.get(job_id, {})
+            for seq in [seq for seq in events if seq <= up_to]:
+                del events[seq]
+
+    async def prune(self, finished_before: float, created_before: float) -> None:
+        with self._lock:
+            for job_id, data in list(self._jobs.items()):
+                job = Job.model_validate_json(data)
+                if (job.finished_at and job.finished_at < finished_before) or \
+                        (not job.finished_at and job.created_at < created_before):
+                    self._jobs.pop(job_id, None)
+                    self._events.pop(job_id, None)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteJobStore:
+    """
+    Keeps jobs and their events in a SQLite database shared by every worker process on the host,
+    so a job submitted to one worker can be polled, streamed and fetched through any of them.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, data TEXT NOT NULL, finished_at REAL)",
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, seq))",
+        ])
+
+    def _save_job(self, job: Job) -> None:
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, finished_at) VALUES (?, ?, ?)",
+            (job.job_id, job.model_dump_json(), job.finished_at),
+        )
+
+    def _get_job(self, job_id: str) -> Optional[Job]:
+        row = self._connections.get().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def _add_event(self, job_id: str, seq: int, event: str) -> None:
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO job_events (job_id, seq, event) VALUES (?, ?, ?)", (job_id, seq, event)
+        )
+
+    def _read_events(self, job_id: str, after: int, limit: Optional[int]) -> List[Tuple[int, str]]:
+        return self._connections.get().execute(
+            "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after, -1 if limit is None else limit),
+        ).fetchall()
+
+    def _trim_events(self, job_id: str, up_to: int) -> None:
+        self._connections.get().execute("DELETE FROM job_events WHERE job_id = ? AND seq <= ?", (job_id, up_to))
+
+    def _prune(self, finished_before: float, created_before: float) -> None:
+        # Unfinished jobs are only left behind by worker processes that died while running them
+        expired = (
+            "SELECT job_id FROM jobs WHERE finished_at < ?"
+            " OR (finished_at IS NULL AND json_extract(data, '$.created_at') < ?)"
+        )
+        connection = self._connections.get()
+        connection.execute(f"DELETE FROM job_events WHERE job_id IN ({expired})", (finished_before, created_before))
+        connection.execute(f"DELETE FROM jobs WHERE job_id IN ({expired})", (finished_before, created_before))
+
+    async def save_job(self, job: Job) -> None:
+        await asyncio.to_thread(self._save_job, job)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._get_job, job_id)
+
+    async def add_event(self, job_id: str, seq: int, event: str) -> None:
+        await asyncio.to_thread(self._add_event, job_id, seq, event)
+
+    async def read_events(self, job_id: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        return await asyncio.to_thread(self._read_events, job_id, after, limit)
+
+    async def trim_events(self, job_id: str, up_to: int) -> None:
+        await asyncio.to_thread(self._trim_events, job_id, up_to)
+
+    async def prune(self, finished_before: float, created_before: float) -> None:
+        await asyncio.to_thread(self._prune, finished_before, created_before)
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+def create_job_store(backend: str, path: str):
+    """
+    Creates the configured job store.
+
+    Args:
+        backend (str): 'sqlite' or 'memory'.
+        path (str): The database file for the SQLite store.
+
+    Returns:
+        The job store.
+    """
+    if backend == "memory":
+        return MemoryJobStore()
+    return SqliteJobStore(path)
@@ -0,0 +1,30 @@
+import time
+from enum import Enum
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    job_id: str
+    kind: str = "get-content"
+    user: str
+    topic: str
+    sources: List[str] = Field(default_factory=list)
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    event_count: int = 0
+    error: Optional[str] = None
+    result: List[Dict[str, str]] = Field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional, Set
+
+import uvicorn
+
+
+logger = logging.getLogger(__name__)
+
+APP = "server:app"
+
+
+class Supervisor:
+    """
+    A pre-fork process manager for uvicorn. The app (and its heavy dependencies) is imported once
+    in the parent before forking, so workers start instantly and share those pages copy-on-write.
+    Workers that exit, whether recycled after `max_requests` or crashed, are replaced; SIGHUP
+    recycles all workers one by one and SIGTERM/SIGINT shut everything down gracefully.
+    """
+
+    def __init__(self, config: uvicorn.Config, workers: int, max_requests: int = 0,
+                 max_requests_jitter: int = 0, graceful_timeout: float = 30.0, preload: bool = True) -> None:
+        """
+        Args:
+            config (uvicorn.Config): The uvicorn configuration shared by all workers.
+            workers (int): Number of worker processes.
+            max_requests (int): Requests a worker serves before it is recycled. 0 disables recycling.
+            max_requests_jitter (int): Random extra requests per worker so they do not recycle together.
+            graceful_timeout (float): Seconds workers get to finish in-flight requests on shutdown.
+            preload (bool): Import the app in the parent before forking.
+        """
+        self.config = config
+        self.workers = max(workers, 1)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.preload = preload
+        self.children: Dict[int, float] = {}
+        self._retiring: Set[int] = set()
+        self._socket: Optional[socket.socket] = None
+        self._stopping = False
+        self._recycle = False
+
+    def _worker_limit(self) -> Optional[int]:
+        if not self.max_requests:
+            return None
+        return self.max_requests + random.randint(0, max(self.max_requests_jitter, 0))
+
+    def _spawn(self) -> int:
+        limit = self._worker_limit()
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installs its own graceful shutdown handlers
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                self.config.limit_max_requests = limit
+                uvicorn.Server(self.config).run(sockets=[self._socket])
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} failed.")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.children[pid] = time.monotonic()
+        logger.info(f"Started worker {pid} (max requests: {limit or 'unlimited'}).")
+        return pid
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_recycle(self, signum, frame) -> None:
+        self._recycle = True
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started_at = self.children.pop(pid, time.monotonic())
+            if self._stopping or pid in self._retiring:
+                self._retiring.discard(pid)
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == 0:
+                logger.info(f"Worker {pid} exited after reaching its request limit, replacing it.")
+            else:
+                logger.error(f"Worker {pid} exited with code {exit_code}, replacing it.")
+                # Do not spin when workers die straight after starting, e.g. on a bad configuration
+                if time.monotonic() - started_at < 1:
+                    time.sleep(1)
+            self._spawn()
+
+    def _recycle_workers(self) -> None:
+        # Replace workers one at a time so the socket is always being served
+        self._recycle = False
+        for pid in list(self.children):
+            self._spawn()
+            self._retiring.add(pid)
+            self._terminate(pid)
+
+    def _terminate(self, pid: int) -> None:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _shutdown(self) -> None:
+        logger.info(f"Stopping {len(self.children)} workers.")
+        for pid in list(self.children):
+            self._terminate(pid)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for pid in list(self.children):
+            logger.warning(f"Worker {pid} did not stop within {self.graceful_timeout}s, killing it.")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+
+    def run(self) -> None:
+        self._socket = self.config.bind_socket()
+        if self.preload:
+            from server.utils.warmup import preimport
+
+            self.config.load()
+            preimport()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+
+        logger.info(f"Starting {self.workers} workers on {self.config.host}:{self.config.port}.")
+        for _ in range(self.workers):
+            self._spawn()
+
+        try:
+            while not self._stopping:
+                if self._recycle:
+                    self._recycle_workers()
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            self._shutdown()
+            self._socket.close()
+
+
+def main() -> None:
+    """
+    Runs the API server as configured by the SERVER_* settings.
+    """
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.server
+    logging.basicConfig(level=settings.log_level.upper())
+
+    # A single worker without recycling needs no supervisor; neither can platforms without fork
+    if (settings.workers <= 1 and not settings.max_requests) or not hasattr(os, "fork"):
+        uvicorn.run(APP, host=settings.host, port=settings.port, log_level=settings.log_level,
+                    workers=settings.workers, timeout_graceful_shutdown=settings.graceful_timeout)
+        return
+
+    config = uvicorn.Config(APP, host=settings.host, port=settings.port, log_level=settings.log_level,
+                            timeout_graceful_shutdown=settings.graceful_timeout)
+    Supervisor(
+        config,
+        workers=settings.workers,
+        max_requests=settings.max_requests,
+        max_requests_jitter=settings.max_requests_jitter,
+        graceful_timeout=settings.graceful_timeout,
+        preload=settings.preload,
+    ).run()
+    sys.exit(0)
@@ -1,63 +1,91 @@
 
 # Imports for settings and configurations
-from typing import Union, Callable
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Union, Callable
+from functools import cached_property, lru_cache
 from starlette.config import Config
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from azure.keyvault.secrets import SecretClient
-from azure.core.credentials import AzureKeyCredential
+from starlette.datastructures import CommaSeparatedStrings
 from pathlib import Path
+import multiprocessing
 import os
 from dotenv import dotenv_values
 from collections import ChainMap
-from azure.cosmos import CosmosClient, DatabaseProxy
-from azure.mgmt.cosmosdb import CosmosDBManagementClient
+
+# The Azure SDKs are only needed when one of their clients is actually used, so they are
+# imported lazily inside the properties below to keep process start-up fast.
+if TYPE_CHECKING:
+    from azure.identity import DefaultAzureCredential
+    from azure.core.credentials import AzureKeyCredential
+    from azure.cosmos import CosmosClient, DatabaseProxy
+    from azure.mgmt.cosmosdb import CosmosDBManagementClient
+
+
+@lru_cache(maxsize=None)
+def load_environ(env_file: str = '.env') -> ChainMap:
+    """
+    Takes one snapshot of the process environment layered over the values of `env_file`.
+    Every settings object reads from the same snapshot instead of copying `os.environ` and
+    re-parsing the .env file itself.
+    """
+    env_vars = dotenv_values(env_file) if os.path.exists(env_file) else {}
+    return ChainMap(dict(os.environ), env_vars)
+
+
+@lru_cache(maxsize=None)
+def default_azure_credential() -> DefaultAzureCredential:
+    """
+    Returns the process wide DefaultAzureCredential, created on first use.
+    """
+    from azure.identity import DefaultAzureCredential
+
+    return DefaultAzureCredential()
 
 
 class BaseSettings(Config):
     def __init__(self, env_file, env_prefix) -> None:
-        environ = os.environ.copy()
-        environ = ChainMap(environ, self._load_env_file(env_file))
+        environ = load_environ(env_file)
         self.azure_subscription_id = environ.get('AZURE_SUBSCRIPTION_ID')
         self.azure_resource_group = environ.get('AZURE_RG_NAME')
         self.environment = environ.get('ENVIRONMENT')
         self.vault_url = environ.get('AZURE_VAULT_URL')
         # self.key_vault = self._get_vault()
-        self.llm_config_list = [{
-            "model": os.environ["AZURE_OPENAI_DEPLOYMENT_NAME_GPT4"],  # Azure deployment name
-            "api_key": os.environ["AZURE_OPENAI_API_KEY"],
-            "base_url": os.environ["AZURE_OPENAI_ENDPOINT"],
+    
+        super().__init__(environ=environ, env_prefix=env_prefix)
+
+    @cached_property
+    def llm_config_list(self) -> List[Dict[str, str]]:
+        return [{
+            "model": self.environ["AZURE_OPENAI_DEPLOYMENT_NAME_GPT4"],  # Azure deployment name
+            "api_key": self.environ["AZURE_OPENAI_API_KEY"],
+            "base_url": self.environ["AZURE_OPENAI_ENDPOINT"],
             "api_type": "azure",
-            "api_version": os.environ["AZURE_OPENAI_API_VERSION"],  # Optional, ensure this matches your Azure API version
+            "api_version": self.environ["AZURE_OPENAI_API_VERSION"],  # Optional, ensure this matches your Azure API version
             # "response_format": { "type": "json_object" }
         }]
-    
-        super().__init__(environ=environ, env_prefix=env_prefix)
 
     # def _get_vault(self):
     #     credential = DefaultAzureCredential()
     #     return SecretClient(vault_url=self.vault_url, credential=credential)
 
-    def _load_env_file(self, env_file):
-        env_vars = {}
-        if os.path.exists(env_file):
-            env_vars.update(dotenv_values(env_file))
-        return env_vars
-
 
 class AzureCosmosNOSqlDBSettings(BaseSettings):
     def __init__(self) -> None:
         self.timeout = 12000
         super().__init__('.env', env_prefix='COSMOSDB_NOSQL_')
 
-    @property
+    @cached_property
     def client(self) -> CosmosClient:
+        from azure.cosmos import CosmosClient
+
         return CosmosClient(url=self.server, credential=self.credential)
 
-    @property
+    @cached_property
     def mgmt_client(self) -> CosmosDBManagementClient:
+        from azure.mgmt.cosmosdb import CosmosDBManagementClient
+
         return CosmosDBManagementClient(self.credential, self.azure_subscription_id)
 
-    @property
+    @cached_property
     def db(self) -> DatabaseProxy:
         return self.client.get_database_client(self.database_name)
 
@@ -67,7 +95,7 @@ class AzureCosmosNOSqlDBSettings(BaseSettings):
 
     @property
     def credential(self) -> Union[AzureKeyCredential, DefaultAzureCredential]:
-        return DefaultAzureCredential()
+        return default_azure_credential()
 
     @property
     def database_name(self) -> str:
@@ -140,10 +168,12 @@ class AzureOpenaiSettings(BaseSettings):
 
     @property
     def credential(self) -> Union[AzureKeyCredential, DefaultAzureCredential]:
-        return DefaultAzureCredential()
+        return default_azure_credential()
 
-    @property
+    @cached_property
     def token_provider(self) -> Callable:
+        from azure.identity import get_bearer_token_provider
+
         return get_bearer_token_provider(
             self.credential, "https://cognitiveservices.azure.com/.default"
         )
@@ -187,7 +217,7 @@ class AzureDocAISettings(BaseSettings):
 
     @property
     def credential(self) -> Union[AzureKeyCredential, DefaultAzureCredential]:
-        return DefaultAzureCredential()
+        return default_azure_credential()
 
 
 class AzureAISearchSettings(BaseSettings):
@@ -204,7 +234,7 @@ class AzureAISearchSettings(BaseSettings):
 
     @property
     def credential(self) -> Union[AzureKeyCredential, DefaultAzureCredential]:
-        return DefaultAzureCredential()
+        return default_azure_credential()
 
 
 class AzureAppInsightsSettings(BaseSettings):
@@ -221,13 +251,31 @@ class AzureAppInsightsSettings(BaseSettings):
 
 
 class AzureSettings():
-    def __init__(self) -> None:
-        self._openai = AzureOpenaiSettings()
-        self._cosmos_nosql = AzureCosmosNOSqlDBSettings()
-        self._doc_ai = AzureDocAISettings()
-        self._search = AzureAISearchSettings()
-        self._insights = AzureAppInsightsSettings()
-        self._bing = AzureBingSearchSettings()
+    # Sub-settings are built on first access and cached
+
+    @cached_property
+    def _openai(self) -> AzureOpenaiSettings:
+        return AzureOpenaiSettings()
+
+    @cached_property
+    def _cosmos_nosql(self) -> AzureCosmosNOSqlDBSettings:
+        return AzureCosmosNOSqlDBSettings()
+
+    @cached_property
+    def _doc_ai(self) -> AzureDocAISettings:
+        return AzureDocAISettings()
+
+    @cached_property
+    def _search(self) -> AzureAISearchSettings:
+        return AzureAISearchSettings()
+
+    @cached_property
+    def _insights(self) -> AzureAppInsightsSettings:
+        return AzureAppInsightsSettings()
+
+    @cached_property
+    def _bing(self) -> AzureBingSearchSettings:
+        return AzureBingSearchSettings()
 
     @property
     def openai(self) -> AzureOpenaiSettings:
@@ -249,6 +297,10 @@ class AzureSettings():
     def insights(self) -> AzureAppInsightsSettings:
         return self._insights
 
+    @property
+    def bing(self) -> AzureBingSearchSettings:
+        return self._bing
+
 
 class AzureBingSearchSettings(BaseSettings):
     def __init__(self) -> None:
@@ -262,13 +314,621 @@ class AzureBingSearchSettings(BaseSettings):
     def subscription_key(self) -> str:
         return self('SUBSCRIPTION_KEY', cast=str)
 
+    @property
+    def lean(self) -> bool:
+        # Request web pages only and keep compact records; full models are built on demand
+        return self('LEAN', cast=bool, default=True)
+
+
+class SearchRankingSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='SEARCH_RANKING_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def search_count(self) -> int:
+        # Results requested from Bing per source, ranked locally before any is fetched
+        return self('SEARCH_COUNT', cast=int, default=10)
+
+    @property
+    def top_k(self) -> int:
+        # Results fetched and summarized per source
+        return self('TOP_K', cast=int, default=2)
+
+    @property
+    def min_score(self) -> float:
+        # Results covering less of the topic are dropped; the best result of a source is always kept
+        return self('MIN_SCORE', cast=float, default=0.2)
+
+    @property
+    def language(self) -> str:
+        # Results Bing reports in another language are dropped; empty keeps every language
+        return self('LANGUAGE', cast=str, default='en')
+
+
+class WebExtractionSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='WEB_EXTRACTION_')
+
+    @property
+    def parser_backend(self) -> str:
+        return self('PARSER_BACKEND', cast=str, default='html.parser')
+
+    @property
+    def offload_threshold_bytes(self) -> int:
+        return self('OFFLOAD_THRESHOLD_BYTES', cast=int, default=256_000)
+
+
+class CpuPoolSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='CPU_POOL_')
+
+    @property
+    def workers(self) -> int:
+        return self('WORKERS', cast=int, default=min(4, os.cpu_count() or 1))
+
+    @property
+    def max_pending(self) -> int:
+        return self('MAX_PENDING', cast=int, default=64)
+
+    @property
+    def start_method(self) -> str:
+        # The service runs threads (executors, the event loop), which fork would copy mid-state
+        default = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return self('START_METHOD', cast=str, default=default)
+
+
+class TracingSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='TRACING_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=False)
+
+    @property
+    def exporter(self) -> str:
+        return self('EXPORTER', cast=str, default='file')
+
+    @property
+    def file_path(self) -> str:
+        return self('FILE_PATH', cast=str, default='traces/spans.jsonl')
+
+    @property
+    def service_name(self) -> str:
+        return self('SERVICE_NAME', cast=str, default='content-writer')
+
+
+class ProfilingSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='PROFILING_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=False)
+
+    @property
+    def authorized_users(self) -> CommaSeparatedStrings:
+        return self('AUTHORIZED_USERS', cast=CommaSeparatedStrings, default='')
+
+    @property
+    def sample_rate(self) -> float:
+        return self('SAMPLE_RATE', cast=float, default=0.0)
+
+    @property
+    def directory(self) -> str:
+        return self('DIR', cast=str, default='profiles')
+
+
+class ServerSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='SERVER_')
+
+    @property
+    def host(self) -> str:
+        return self('HOST', cast=str, default='0.0.0.0')
+
+    @property
+    def port(self) -> int:
+        return self('PORT', cast=int, default=8000)
+
+    @property
+    def workers(self) -> int:
+        return self('WORKERS', cast=int, default=os.cpu_count() or 1)
+
+    @property
+    def preload(self) -> bool:
+        return self('PRELOAD', cast=bool, default=True)
+
+    @property
+    def max_requests(self) -> int:
+        return self('MAX_REQUESTS', cast=int, default=0)
+
+    @property
+    def max_requests_jitter(self) -> int:
+        return self('MAX_REQUESTS_JITTER', cast=int, default=0)
+
+    @property
+    def graceful_timeout(self) -> float:
+        return self('GRACEFUL_TIMEOUT', cast=float, default=30.0)
+
+    @property
+    def log_level(self) -> str:
+        return self('LOG_LEVEL', cast=str, default='info').lower()
+
+
+class CacheSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='CACHE_')
+
+    @property
+    def backend(self) -> str:
+        return self('BACKEND', cast=str, default='sqlite')
+
+    @property
+    def path(self) -> str:
+        return self('PATH', cast=str, default='cache/content-writer.sqlite3')
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self('TTL_SECONDS', cast=float, default=86400.0)
+
+    @property
+    def max_entries(self) -> int:
+        return self('MAX_ENTRIES', cast=int, default=10000)
+
+
+class JobSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='JOBS_')
+
+    @property
+    def workers(self) -> int:
+        return self('WORKERS', cast=int, default=4)
+
+    @property
+    def max_queue(self) -> int:
+        return self('MAX_QUEUE', cast=int, default=100)
+
+    @property
+    def store(self) -> str:
+        return self('STORE', cast=str, default='sqlite')
+
+    @property
+    def store_path(self) -> str:
+        return self('STORE_PATH', cast=str, default='cache/jobs.sqlite3')
+
+    @property
+    def result_ttl_seconds(self) -> float:
+        return self('RESULT_TTL_SECONDS', cast=float, default=3600.0)
+
+    @property
+    def poll_interval(self) -> float:
+        return self('POLL_INTERVAL', cast=float, default=0.5)
+
+
+class StreamSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='STREAM_')
+
+    @property
+    def resumable(self) -> bool:
+        return self('RESUMABLE', cast=bool, default=True)
+
+    @property
+    def store(self) -> str:
+        return self('STORE', cast=str, default='sqlite')
+
+    @property
+    def store_path(self) -> str:
+        return self('STORE_PATH', cast=str, default='cache/streams.sqlite3')
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self('TTL_SECONDS', cast=float, default=600.0)
+
+    @property
+    def max_events(self) -> int:
+        return self('MAX_EVENTS', cast=int, default=500)
+
+    @property
+    def poll_interval(self) -> float:
+        return self('POLL_INTERVAL', cast=float, default=0.25)
+
+
+class BatchSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='BATCH_')
+
+    @property
+    def max_topics(self) -> int:
+        return self('MAX_TOPICS', cast=int, default=50)
+
+    @property
+    def search_concurrency(self) -> int:
+        return self('SEARCH_CONCURRENCY', cast=int, default=8)
+
+    @property
+    def page_concurrency(self) -> int:
+        return self('PAGE_CONCURRENCY', cast=int, default=8)
+
+
+class EditSessionSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='EDIT_SESSION_')
+
+    @property
+    def max_sessions(self) -> int:
+        return self('MAX_SESSIONS', cast=int, default=500)
+
+    @property
+    def max_bytes(self) -> int:
+        return self('MAX_BYTES', cast=int, default=64 * 1024 * 1024)
+
+    @property
+    def idle_ttl_seconds(self) -> float:
+        return self('IDLE_TTL_SECONDS', cast=float, default=1800.0)
+
+    @property
+    def max_turns(self) -> int:
+        return self('MAX_TURNS', cast=int, default=10)
+
+    @property
+    def store(self) -> str:
+        # Where post versions are kept: 'sqlite' (shared by the workers on a host) or 'memory'
+        return self('STORE', cast=str, default='sqlite')
+
+    @property
+    def store_path(self) -> str:
+        return self('STORE_PATH', cast=str, default='cache/edit_sessions.sqlite3')
+
+    @property
+    def max_versions(self) -> int:
+        return self('MAX_VERSIONS', cast=int, default=20)
+
+    @property
+    def version_ttl_seconds(self) -> float:
+        return self('VERSION_TTL_SECONDS', cast=float, default=86400.0)
+
+
+class QualityGateSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='QUALITY_GATE_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def target_words(self) -> int:
+        return self('TARGET_WORDS', cast=int, default=350)
+
+    @property
+    def word_tolerance(self) -> float:
+        return self('WORD_TOLERANCE', cast=float, default=0.3)
+
+    @property
+    def min_hashtags(self) -> int:
+        return self('MIN_HASHTAGS', cast=int, default=2)
+
+    @property
+    def require_source_link(self) -> bool:
+        return self('REQUIRE_SOURCE_LINK', cast=bool, default=False)
+
+    @property
+    def short_reflection_failures(self) -> int:
+        return self('SHORT_REFLECTION_FAILURES', cast=int, default=1)
+
+
+class PipelineSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='PIPELINE_')
+
+    @property
+    def search_workers(self) -> int:
+        return self('SEARCH_WORKERS', cast=int, default=4)
+
+    @property
+    def fetch_workers(self) -> int:
+        return self('FETCH_WORKERS', cast=int, default=8)
+
+    @property
+    def parse_workers(self) -> int:
+        return self('PARSE_WORKERS', cast=int, default=2)
+
+    @property
+    def convert_workers(self) -> int:
+        return self('CONVERT_WORKERS', cast=int, default=4)
+
+    @property
+    def summarize_workers(self) -> int:
+        return self('SUMMARIZE_WORKERS', cast=int, default=4)
+
+    @property
+    def queue_size(self) -> int:
+        # 0 sizes each stage queue at twice its workers
+        return self('QUEUE_SIZE', cast=int, default=0)
+
+
+class LocalIndexSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='LOCAL_INDEX_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def store(self) -> str:
+        return self('STORE', cast=str, default='sqlite')
+
+    @property
+    def path(self) -> str:
+        return self('PATH', cast=str, default='cache/local_index.sqlite3')
+
+    @property
+    def max_age_seconds(self) -> float:
+        # Pages indexed longer ago are stale; kept below the cache TTL so local hits find their summaries
+        return self('MAX_AGE_SECONDS', cast=float, default=21600.0)
+
+    @property
+    def min_results(self) -> int:
+        # Local pages needed to skip the search; 0 requires as many as the search would return
+        return self('MIN_RESULTS', cast=int, default=0)
+
+    @property
+    def max_documents(self) -> int:
+        return self('MAX_DOCUMENTS', cast=int, default=10000)
+
+
+class AdmissionSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='ADMISSION_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def max_in_flight(self) -> int:
+        # Content pipelines (get-content, get-batch-content, edit-content) run at once per worker
+        return self('MAX_IN_FLIGHT', cast=int, default=16)
+
+    @property
+    def max_queue(self) -> int:
+        return self('MAX_QUEUE', cast=int, default=64)
+
+    @property
+    def queue_timeout_seconds(self) -> float:
+        return self('QUEUE_TIMEOUT_SECONDS', cast=float, default=30.0)
+
+    @property
+    def max_memory_mb(self) -> int:
+        # Resident memory of the worker above which no pipeline starts; 0 disables the check
+        return self('MAX_MEMORY_MB', cast=int, default=0)
+
+    @property
+    def retry_after_seconds(self) -> float:
+        # Initial estimate of a pipeline's duration, used for Retry-After until pipelines complete
+        return self('RETRY_AFTER_SECONDS', cast=float, default=5.0)
+
+
+class TokenBudgetSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='TOKEN_BUDGET_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def encoding(self) -> str:
+        # The tiktoken encoding of the deployed model. Without tiktoken, or until the encoding is loaded,
+        # token counts are estimated from the length of the text
+        return self('ENCODING', cast=str, default='cl100k_base')
+
+    @property
+    def compress(self) -> bool:
+        return self('COMPRESS', cast=bool, default=True)
+
+    @property
+    def extraction_max_tokens(self) -> int:
+        # Budgets cover the system prompt and the prompt; 0 disables the budget of an agent
+        return self('EXTRACTION_MAX_TOKENS', cast=int, default=16000)
+
+    @property
+    def summary_max_tokens(self) -> int:
+        return self('SUMMARY_MAX_TOKENS', cast=int, default=12000)
+
+    @property
+    def writer_max_tokens(self) -> int:
+        return self('WRITER_MAX_TOKENS', cast=int, default=12000)
+
+    @property
+    def editor_max_tokens(self) -> int:
+        return self('EDITOR_MAX_TOKENS', cast=int, default=8000)
+
+
+class LlmClientSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='LLM_CLIENT_')
+
+    @property
+    def enabled(self) -> bool:
+        # The extraction and summary agents call the LLM through the thin client instead of autogen
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def timeout_seconds(self) -> float:
+        return self('TIMEOUT_SECONDS', cast=float, default=60.0)
+
+    @property
+    def connect_timeout_seconds(self) -> float:
+        return self('CONNECT_TIMEOUT_SECONDS', cast=float, default=5.0)
+
+    @property
+    def max_retries(self) -> int:
+        return self('MAX_RETRIES', cast=int, default=2)
+
+    @property
+    def max_connections(self) -> int:
+        return self('MAX_CONNECTIONS', cast=int, default=32)
+
+    @property
+    def keepalive_seconds(self) -> float:
+        # Idle connections are kept this long, so the warmed up connection is still open for the first call
+        return self('KEEPALIVE_SECONDS', cast=float, default=120.0)
+
+    @property
+    def cache(self) -> bool:
+        # The agents cache their results already; this caches every reply by request
+        return self('CACHE', cast=bool, default=False)
+
+
+class HttpClientSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='HTTP_CLIENT_')
+
+    @property
+    def timeout_seconds(self) -> float:
+        # Bing searches use this; page fetches set their own timeout
+        return self('TIMEOUT_SECONDS', cast=float, default=5.0)
+
+    @property
+    def connect_timeout_seconds(self) -> float:
+        return self('CONNECT_TIMEOUT_SECONDS', cast=float, default=5.0)
+
+    @property
+    def max_connections(self) -> int:
+        return self('MAX_CONNECTIONS', cast=int, default=100)
+
+    @property
+    def keepalive_seconds(self) -> float:
+        return self('KEEPALIVE_SECONDS', cast=float, default=120.0)
+
+
+class CacheWarmingSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='CACHE_WARMING_')
+
+    @property
+    def enabled(self) -> bool:
+        # Refreshes the cache for popular requests in the background, spending LLM tokens
+        return self('ENABLED', cast=bool, default=False)
+
+    @property
+    def track(self) -> bool:
+        # Counts requests per topic and sources, also while warming is disabled
+        return self('TRACK', cast=bool, default=True)
+
+    @property
+    def store(self) -> str:
+        return self('STORE', cast=str, default='sqlite')
+
+    @property
+    def path(self) -> str:
+        return self('PATH', cast=str, default='cache/popularity.sqlite3')
+
+    @property
+    def interval_seconds(self) -> float:
+        # Kept below the cache TTL, so warmed entries do not expire between runs
+        return self('INTERVAL_SECONDS', cast=float, default=3600.0)
+
+    @property
+    def top_n(self) -> int:
+        return self('TOP_N', cast=int, default=10)
+
+    @property
+    def llm_budget_tokens(self) -> int:
+        # LLM prompt tokens a run may spend summarizing new pages
+        return self('LLM_BUDGET_TOKENS', cast=int, default=500_000)
+
+    @property
+    def max_age_hours(self) -> float:
+        # Requests not seen for this long are no longer warmed
+        return self('MAX_AGE_HOURS', cast=float, default=72.0)
+
+    @property
+    def half_life_hours(self) -> float:
+        return self('HALF_LIFE_HOURS', cast=float, default=24.0)
+
+
+class WarmupSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='WARMUP_')
+
+    @property
+    def preimport(self) -> bool:
+        return self('PREIMPORT', cast=bool, default=True)
+
+    @property
+    def blocking(self) -> bool:
+        return self('BLOCKING', cast=bool, default=False)
+
+    @property
+    def llm_call(self) -> bool:
+        # Sends a one token completion, so the deployment has served a request before traffic arrives. The
+        # connection to it is opened either way.
+        return self('LLM_CALL', cast=bool, default=False)
+
+    @property
+    def step_timeout_seconds(self) -> float:
+        # 0 lets every step run to completion
+        return self('STEP_TIMEOUT_SECONDS', cast=float, default=30.0)
+
+
+class RateLimitSettings(BaseSettings):
+    def __init__(self) -> None:
+        super().__init__('.env', env_prefix='RATE_LIMIT_')
+
+    @property
+    def enabled(self) -> bool:
+        return self('ENABLED', cast=bool, default=True)
+
+    @property
+    def backend(self) -> str:
+        # 'sqlite' shares the limits between the workers on a host, 'memory' limits per worker
+        return self('BACKEND', cast=str, default='sqlite')
+
+    @property
+    def path(self) -> str:
+        return self('PATH', cast=str, default='cache/rate_limits.sqlite3')
+
+    @property
+    def requests(self) -> int:
+        # Requests per user per window; 0 disables the limit
+        return self('REQUESTS', cast=int, default=60)
+
+    @property
+    def window_seconds(self) -> float:
+        return self('WINDOW_SECONDS', cast=float, default=60.0)
+
+    @property
+    def llm_tokens(self) -> int:
+        # LLM prompt tokens per user, refilled over the cooldown; 0 disables the limit
+        return self('LLM_TOKENS', cast=int, default=2_000_000)
+
+    @property
+    def cooldown_hours(self) -> float:
+        return self('COOLDOWN_IN_HRS', cast=float, default=1.0)
+
+    @property
+    def max_streams(self) -> int:
+        # Content streams a user runs at once; 0 disables the limit
+        return self('MAX_STREAMS', cast=int, default=4)
+
+    @property
+    def stream_lease_seconds(self) -> float:
+        # A stream slot not released by then, e.g. by a worker that died, is freed
+        return self('STREAM_LEASE_SECONDS', cast=float, default=3600.0)
+
 
 class Settings(BaseSettings):
     def __init__(self) -> None:
         super().__init__('.env', env_prefix='')
-        self._azure = AzureSettings()
-        self._api = ApiSettings()
-        self._oauth = OAuthSettings()
         self.FALLBACK_MESSAGE = "Oops! Something went wrong (Error Code: {error_code}). Please try again later."
 
     @property
@@ -276,8 +936,8 @@ class Settings(BaseSettings):
         return self('LOG_LEVEL').upper()
 
     @property
-    def rate_limit_cooldown(self) -> int:
-        return self('RATE_LIMIT_COOLDOWN_IN_HRS', cast=int)
+    def rate_limit_cooldown(self) -> float:
+        return self.rate_limit.cooldown_hours
 
     @property
     def whitelisted_ad_group(self) -> str:
@@ -287,17 +947,101 @@ class Settings(BaseSettings):
     def spa_uri(self) -> str:
         return self('SPA_URI', cast=str, default='http://localhost:5173/')
 
-    @property
+    @cached_property
     def api(self) -> ApiSettings:
-        return self._api
+        return ApiSettings()
 
-    @property
+    @cached_property
     def azure(self) -> AzureSettings:
-        return self._azure
+        return AzureSettings()
 
-    @property
+    @cached_property
     def oauth(self) -> OAuthSettings:
-        return self._oauth
+        return OAuthSettings()
+
+    @cached_property
+    def tracing(self) -> TracingSettings:
+        return TracingSettings()
+
+    @cached_property
+    def web_extraction(self) -> WebExtractionSettings:
+        return WebExtractionSettings()
+
+    @cached_property
+    def cpu_pool(self) -> CpuPoolSettings:
+        return CpuPoolSettings()
+
+    @cached_property
+    def profiling(self) -> ProfilingSettings:
+        return ProfilingSettings()
+
+    @cached_property
+    def warmup(self) -> WarmupSettings:
+        return WarmupSettings()
+
+    @cached_property
+    def server(self) -> ServerSettings:
+        return ServerSettings()
+
+    @cached_property
+    def cache(self) -> CacheSettings:
+        return CacheSettings()
+
+    @cached_property
+    def jobs(self) -> JobSettings:
+        return JobSettings()
+
+    @cached_property
+    def batch(self) -> BatchSettings:
+        return BatchSettings()
+
+    @cached_property
+    def streams(self) -> StreamSettings:
+        return StreamSettings()
+
+    @cached_property
+    def edit_sessions(self) -> EditSessionSettings:
+        return EditSessionSettings()
+
+    @cached_property
+    def quality_gate(self) -> QualityGateSettings:
+        return QualityGateSettings()
+
+    @cached_property
+    def pipeline(self) -> PipelineSettings:
+        return PipelineSettings()
+
+    @cached_property
+    def token_budget(self) -> TokenBudgetSettings:
+        return TokenBudgetSettings()
+
+    @cached_property
+    def local_index(self) -> LocalIndexSettings:
+        return LocalIndexSettings()
+
+    @cached_property
+    def admission(self) -> AdmissionSettings:
+        return AdmissionSettings()
+
+    @cached_property
+    def rate_limit(self) -> RateLimitSettings:
+        return RateLimitSettings()
+
+    @cached_property
+    def llm_client(self) -> LlmClientSettings:
+        return LlmClientSettings()
+
+    @cached_property
+    def http_client(self) -> HttpClientSettings:
+        return HttpClientSettings()
+
+    @cached_property
+    def cache_warming(self) -> CacheWarmingSettings:
+        return CacheWarmingSettings()
+
+    @cached_property
+    def search_ranking(self) -> SearchRankingSettings:
+        return SearchRankingSettings()
 
  
 
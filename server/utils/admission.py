@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Optional
+
+from fastapi import HTTPException
+
+from server.utils.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_DECISIONS = REGISTRY.counter(
+    "content_writer_admission_total",
+    "Pipeline admission decisions by route and result (admitted, queued, or rejected because the "
+    "queue was full, the wait timed out or memory was exhausted).",
+    ["route", "result"],
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "content_writer_admission_queue_seconds",
+    "Time admitted pipelines waited in the admission queue.",
+    ["route"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+ADMISSION_STATE = REGISTRY.gauge(
+    "content_writer_admission",
+    "Pipelines running (in_flight) and waiting for admission (queued) in this worker process.",
+    ["state"],
+)
+PROCESS_MEMORY = REGISTRY.gauge(
+    "content_writer_process_resident_memory_bytes",
+    "Resident memory of this worker process, as used by admission control.",
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_memory() -> Optional[int]:
+    """
+    Returns the resident memory of this process in bytes, or None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdmissionRejected(HTTPException):
+    """Raised when a pipeline is not admitted; carries the status and the `Retry-After` header."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class AdmissionTicket:
+    """
+    A slot held by an admitted pipeline. It is released once, when the pipeline's stream ends, or
+    when the ticket is garbage collected if the stream was never started.
+    """
+
+    def __init__(self, controller: "AdmissionController") -> None:
+        self._controller: Optional[AdmissionController] = controller
+        self._acquired_at = time.monotonic()
+
+    def release(self) -> None:
+        controller, self._controller = self._controller, None
+        if controller is not None:
+            controller._release(time.monotonic() - self._acquired_at)
+
+    def __del__(self) -> None:
+        self.release()
+
+    async def guard(self, stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+        """
+        Yields the items of a pipeline stream and releases the slot when it ends, fails or is closed.
+
+        Args:
+            stream (AsyncGenerator[Any, None]): The pipeline stream.
+
+        Returns:
+            AsyncGenerator[Any, None]: A generator yielding the items of `stream`.
+        """
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            self.release()
+            await stream.aclose()
+
+
+class AdmissionController:
+    """
+    Bounds the pipelines a worker process runs at once. Pipelines beyond `max_in_flight`, or
+    started while resident memory is above `max_memory_bytes`, wait in a FIFO queue for a slot;
+    when the queue is full they are rejected with 429, and when their wait times out, or memory
+    stays exhausted, with 503. Both carry a `Retry-After` estimated from recent pipeline durations.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float, max_memory_bytes: int = 0,
+                 retry_after: float = 5.0) -> None:
+        """
+        Args:
+            max_in_flight (int): Pipelines running at once.
+            max_queue (int): Pipelines allowed to wait for a slot.
+            queue_timeout (float): Seconds a pipeline waits for a slot before it is rejected.
+            max_memory_bytes (int): Resident memory above which no pipeline is started. 0 disables the check.
+            retry_after (float): Seconds suggested to rejected clients until pipelines have completed.
+        """
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_memory_bytes = max_memory_bytes
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long pipelines hold their slot
+        self._average_duration = retry_after
+        ADMISSION_STATE.set_function(lambda: self._in_flight, state="in_flight")
+        ADMISSION_STATE.set_function(lambda: sum(not waiter.done() for waiter in self._waiters), state="queued")
+        PROCESS_MEMORY.set_function(lambda: resident_memory() or 0)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _memory_exhausted(self) -> bool:
+        if not self.max_memory_bytes:
+            return False
+        memory = resident_memory()
+        return memory is not None and memory > self.max_memory_bytes
+
+    def _retry_after(self) -> int:
+        # The queue ahead drains max_in_flight pipelines per average duration
+        waiting = len(self._waiters) + 1
+        return min(max(math.ceil(self._average_duration * waiting / self.max_in_flight), 1), 300)
+
+    def _reject(self, route: str, result: str, status_code: int, detail: str) -> AdmissionRejected:
+        ADMISSION_DECISIONS.inc(route=route, result=result)
+        logger.warning(f"Rejected {route} pipeline ({result}): {self._in_flight} in flight, {len(self._waiters)} queued.")
+        return AdmissionRejected(status_code, detail, self._retry_after())
+
+    async def admit(self, route: str) -> AdmissionTicket:
+        """
+        Waits for a slot for a pipeline.
+
+        Args:
+            route (str): The route starting the pipeline, used in metrics, e.g. 'get-content'.
+
+        Returns:
+            AdmissionTicket: The slot, to be released when the pipeline ends.
+
+        Raises:
+            AdmissionRejected: If the queue is full, or no slot became free within the queue timeout.
+        """
+        self._waiters = deque(waiter for waiter in self._waiters if not waiter.done())
+        if not self._waiters and self._in_flight < self.max_in_flight and not self._memory_exhausted():
+            self._in_flight += 1
+            ADMISSION_DECISIONS.inc(route=route, result="admitted")
+            return AdmissionTicket(self)
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(route, "queue_full", 429, "The server is busy. Please retry later.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = time.monotonic()
+        ADMISSION_DECISIONS.inc(route=route, result="queued")
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            result = "memory" if self._memory_exhausted() else "timeout"
+            raise self._reject(route, result, 503, "The server is overloaded. Please retry later.") from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the client went away
+            if waiter.done() and not waiter.cancelled():
+                self._release(None)
+            raise
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - queued_at, route=route)
+        return AdmissionTicket(self)
+
+    def _release(self, duration: Optional[float]) -> None:
+        self._in_flight -= 1
+        if duration is not None:
+            self._average_duration = 0.9 * self._average_duration + 0.1 * duration
+        # Hand the slot straight to the next waiter, so a new arrival cannot take it first
+        while self._waiters and self._in_flight < self.max_in_flight and not self._memory_exhausted():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+
+_CONTROLLER: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Returns the process wide admission controller, configured from the admission settings.
+
+    Returns:
+        AdmissionController: The shared controller.
+    """
+    global _CONTROLLER
+    if _CONTROLLER is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.admission
+        _CONTROLLER = AdmissionController(
+            settings.max_in_flight, settings.max_queue, settings.queue_timeout_seconds,
+            settings.max_memory_mb * 1024 * 1024, settings.retry_after_seconds,
+        )
+    return _CONTROLLER
+
+
+async def admit(route: str) -> Optional[AdmissionTicket]:
+    """
+    Admits a pipeline through the shared controller, unless admission control is disabled.
+
+    Args:
+        route (str): The route starting the pipeline.
+
+    Returns:
+        Optional[AdmissionTicket]: The slot, or None when admission control is disabled.
+
+    Raises:
+        AdmissionRejected: If the pipeline is not admitted.
+    """
+    from server.setting import SETTINGS
+
+    if not SETTINGS.admission.enabled:
+        return None
+    return await get_admission_controller().admit(route)
+
+
+def guard_stream(ticket: Optional[AdmissionTicket], stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+    """
+    Ties an admission slot to a pipeline stream, see `AdmissionTicket.guard`.
+    """
+    return ticket.guard(stream) if ticket is not None else stream
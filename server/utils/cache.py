@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from server.utils.metrics import record_cache
+from server.utils.sqlite import SqliteConnections
+
+
+logger = logging.getLogger(__name__)
+
+# Namespaces used by the content pipeline
+SEARCH = "search"
+EXTRACTED = "extracted"
+SUMMARY = "summary"
+# Replies of the LLM client, when its cache is enabled
+LLM = "llm"
+# Markers of the entries refreshed by the cache warmer, keyed "<namespace>:<key>"
+WARMED = "warmed"
+
+
+class MemoryCacheBackend:
+    """
+    A per-process LRU cache with a time to live. Used when running a single worker, or as the
+    fallback when the shared backend cannot be opened.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used one is evicted.
+            ttl (float): Seconds an entry stays valid. 0 keeps entries until evicted.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[(namespace, key)] = (expires_at, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteCacheBackend:
+    """
+    A cache stored in a SQLite database file, shared by every worker process on the host.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int) -> None:
+        """
+        Args:
+            path (str): The database file.
+            ttl (float): Seconds an entry stays valid. 0 keeps entries until evicted.
+            max_entries (int): Entries kept per namespace; the oldest are pruned on write.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        ])
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def open(self) -> None:
+        """
+        Opens the database for the calling thread, raising if it cannot be used.
+        """
+        self._connection()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at and expires_at < time.time():
+            return None
+        return value
+
+    def set(self, namespace: str, key: str, value: str) -> None:
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, now + self.ttl if self.ttl else 0, now),
+        )
+        # Prune now and then rather than on every write
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune(connection, namespace, now)
+
+    def _prune(self, connection: sqlite3.Connection, namespace: str, now: float) -> None:
+        connection.execute("DELETE FROM cache WHERE expires_at > 0 AND expires_at < ?", (now,))
+        connection.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY updated_at DESC LIMIT ?)",
+            (namespace, namespace, self.max_entries),
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+class Cache:
+    """
+    Async facade over a cache backend. Values are stored as JSON; reads and writes against the
+    SQLite backend run in the default executor so they never block the event loop.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._offload = isinstance(backend, SqliteCacheBackend)
+
+    async def _call(self, method, *args):
+        if self._offload:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Looks up a cached value.
+
+        Args:
+            namespace (str): The cache namespace, e.g. `SEARCH`.
+            key (str): The key within the namespace.
+
+        Returns:
+            Optional[Any]: The cached value, or None on a miss.
+        """
+        try:
+            raw = await self._call(self.backend.get, namespace, key)
+        except sqlite3.Error as e:
+            logger.error(f"Cache read failed for {namespace}:{key}: {e}")
+            raw = None
+        record_cache(namespace, raw is not None)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        """
+        Stores a JSON serializable value.
+
+        Args:
+            namespace (str): The cache namespace.
+            key (str): The key within the namespace.
+            value (Any): The value to store.
+        """
+        try:
+            await self._call(self.backend.set, namespace, key, json.dumps(value))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Cache write failed for {namespace}:{key}: {e}")
+
+    async def delete(self, namespace: str, key: str) -> None:
+        try:
+            await self._call(self.backend.delete, namespace, key)
+        except sqlite3.Error as e:
+            logger.error(f"Cache delete failed for {namespace}:{key}: {e}")
+
+    async def mark_warmed(self, namespace: str, key: str) -> None:
+        """
+        Records that an entry was refreshed ahead of demand by the cache warmer.
+
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry.
+        """
+        await self.set(WARMED, f"{namespace}:{key}", time.time())
+
+    async def warmed_at(self, namespace: str, key: str) -> Optional[float]:
+        """
+        Returns when the cache warmer last refreshed an entry, or None if it did not.
+        """
+        try:
+            raw = await self._call(self.backend.get, WARMED, f"{namespace}:{key}")
+        except sqlite3.Error as e:
+            logger.error(f"Cache read failed for {WARMED}:{namespace}:{key}: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+_CACHE: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """
+    Returns the process wide cache, configured from the cache settings.
+
+    Returns:
+        Cache: The shared cache.
+    """
+    global _CACHE
+    if _CACHE is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.cache
+        backend = None
+        if settings.backend == "sqlite":
+            backend = SqliteCacheBackend(settings.path, settings.ttl_seconds, settings.max_entries)
+            try:
+                backend.open()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Cannot open the cache database {settings.path}, using the in-memory cache: {e}")
+                backend.close()
+                backend = None
+        elif settings.backend != "memory":
+            logger.warning(f"Unknown cache backend '{settings.backend}', using the in-memory cache.")
+        if backend is None:
+            backend = MemoryCacheBackend(settings.max_entries, settings.ttl_seconds)
+        _CACHE = Cache(backend)
+    return _CACHE
+
+
+def close_cache() -> None:
+    """
+    Closes the shared cache, if it was opened.
+    """
+    global _CACHE
+    if _CACHE is not None:
+        _CACHE.close()
+        _CACHE = None
@@ -0,0 +1,461 @@
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from server.utils.cache import EXTRACTED, SEARCH, SUMMARY, get_cache
+from server.utils.metrics import REGISTRY
+from server.utils.rate_limit import charge_tokens_to
+from server.utils.sqlite import SqliteConnections
+
+
+logger = logging.getLogger(__name__)
+
+WARMED_PAGES = REGISTRY.counter(
+    "content_writer_cache_warming_pages_total",
+    "Pages handled by the cache warmer, by result (refreshed from the cache, summarized, failed, "
+    "or skipped because the LLM budget was spent).",
+    ["result"],
+)
+WARMING_TOKENS = REGISTRY.counter(
+    "content_writer_cache_warming_llm_tokens_total",
+    "LLM prompt tokens spent by the cache warmer.",
+)
+
+_SPACES = re.compile(r"\s+")
+
+
+@dataclass
+class PopularRequest:
+    """
+    A topic and its sources, with how often they were requested.
+    """
+    topic: str
+    sources: List[str]
+    hits: float
+    last_seen: float
+
+
+def popularity_key(topic: str, sources: Sequence[str]) -> Tuple[str, List[str]]:
+    """
+    Returns the key requests for the same topic and sources are counted under, and the sources in
+    their canonical order.
+    """
+    sources = sorted({source.strip().lower() for source in sources if source and source.strip()})
+    topic = _SPACES.sub(" ", topic.strip().lower())
+    return json.dumps([topic, sources]), sources
+
+
+class MemoryPopularity:
+    """
+    Counts requests per topic and sources in the memory of the current process.
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        """
+        Args:
+            max_entries (int): Topics kept; the least recently requested are dropped first.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PopularRequest]" = OrderedDict()
+        self._runs: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, topic: str, sources: Sequence[str], now: float) -> None:
+        key, sources = popularity_key(topic, sources)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = PopularRequest(topic, sources, 0.0, now)
+            entry.topic, entry.hits, entry.last_seen = topic, entry.hits + 1, now
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def top(self, limit: int, seen_after: float) -> List[PopularRequest]:
+        with self._lock:
+            entries = [
+                PopularRequest(entry.topic, list(entry.sources), entry.hits, entry.last_seen)
+                for entry in self._entries.values() if entry.last_seen >= seen_after
+            ]
+        return sorted(entries, key=lambda entry: entry.hits, reverse=True)[:limit]
+
+    def decay(self, factor: float, seen_after: float) -> None:
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                entry.hits *= factor
+                if entry.last_seen < seen_after:
+                    del self._entries[key]
+
+    def claim_run(self, name: str, interval: float, now: float) -> bool:
+        with self._lock:
+            if self._runs.get(name, float("-inf")) > now - interval:
+                return False
+            self._runs[name] = now
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._runs.clear()
+
+
+class SqlitePopularity:
+    """
+    Counts requests per topic and sources in a SQLite database shared by every worker process on
+    the host, which also records when the cache was last warmed, so one worker warms it per interval.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The database file.
+        """
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS popular_requests ("
+            " key TEXT PRIMARY KEY, topic TEXT NOT NULL, sources TEXT NOT NULL,"
+            " hits REAL NOT NULL, last_seen REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS popular_requests_hits ON popular_requests (hits)",
+            "CREATE TABLE IF NOT EXISTS warming_runs (name TEXT PRIMARY KEY, started_at REAL NOT NULL)",
+        ])
+
+    def open(self) -> None:
+        """
+        Opens the database for the calling thread, raising if it cannot be used.
+        """
+        self._connections.get()
+
+    def record(self, topic: str, sources: Sequence[str], now: float) -> None:
+        key, sources = popularity_key(topic, sources)
+        self._connections.get().execute(
+            "INSERT INTO popular_requests (key, topic, sources, hits, last_seen) VALUES (?, ?, ?, 1, ?)"
+            " ON CONFLICT (key) DO UPDATE SET topic = excluded.topic, hits = hits + 1, last_seen = excluded.last_seen",
+            (key, topic, json.dumps(sources), now),
+        )
+
+    def top(self, limit: int, seen_after: float) -> List[PopularRequest]:
+        rows = self._connections.get().execute(
+            "SELECT topic, sources, hits, last_seen FROM popular_requests WHERE last_seen >= ?"
+            " ORDER BY hits DESC LIMIT ?",
+            (seen_after, limit),
+        ).fetchall()
+        return [PopularRequest(topic, json.loads(sources), hits, last_seen) for topic, sources, hits, last_seen in rows]
+
+    def decay(self, factor: float, seen_after: float) -> None:
+        connection = self._connections.get()
+        connection.execute("UPDATE popular_requests SET hits = hits * ?", (factor,))
+        connection.execute("DELETE FROM popular_requests WHERE last_seen < ?", (seen_after,))
+
+    def claim_run(self, name: str, interval: float, now: float) -> bool:
+        # Only the worker whose update lands claims the run
+        cursor = self._connections.get().execute(
+            "INSERT INTO warming_runs (name, started_at) VALUES (?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET started_at = excluded.started_at WHERE started_at <= ?",
+            (name, now, now - interval),
+        )
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+class Popularity:
+    """
+    Async facade over a popularity backend. Calls to the SQLite backend run in the default
+    executor, and errors are logged rather than failing the request.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._offload = isinstance(backend, SqlitePopularity)
+
+    async def _call(self, method, *args):
+        if self._offload:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def record(self, topic: str, sources: Sequence[str]) -> None:
+        """
+        Counts a request for a topic and its sources.
+
+        Args:
+            topic (str): The topic.
+            sources (Sequence[str]): The sources (domains).
+        """
+        try:
+            await self._call(self.backend.record, topic, list(sources), time.time())
+        except sqlite3.Error as e:
+            logger.error(f"Recording the popularity of '{topic}' failed: {e}")
+
+    async def top(self, limit: int, max_age: float) -> List[PopularRequest]:
+        """
+        Returns the most requested topics and sources.
+
+        Args:
+            limit (int): The number of requests to return at most.
+            max_age (float): Requests last seen longer ago than this many seconds are skipped.
+
+        Returns:
+            List[PopularRequest]: The requests, most popular first.
+        """
+        try:
+            return await self._call(self.backend.top, limit, time.time() - max_age)
+        except sqlite3.Error as e:
+            logger.error(f"Reading popular requests failed: {e}")
+            return []
+
+    async def decay(self, factor: float, max_age: float) -> None:
+        """
+        Scales every count by `factor`, so recent requests weigh more, and forgets requests last
+        seen longer ago than `max_age` seconds.
+        """
+        try:
+            await self._call(self.backend.decay, factor, time.time() - max_age)
+        except sqlite3.Error as e:
+            logger.error(f"Decaying popular requests failed: {e}")
+
+    async def claim_run(self, name: str, interval: float) -> bool:
+        """
+        Claims the run of a periodic task, unless it ran within `interval` seconds.
+
+        Returns:
+            bool: Whether this process should run it now.
+        """
+        try:
+            return await self._call(self.backend.claim_run, name, interval, time.time())
+        except sqlite3.Error as e:
+            logger.error(f"Claiming the {name} run failed: {e}")
+            return False
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+class LLMBudget:
+    """
+    The LLM prompt tokens a warming run may spend.
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+        self.spent = 0
+
+    def charge(self, tokens: int) -> None:
+        self.spent += tokens
+        WARMING_TOKENS.inc(tokens)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.spent >= self.max_tokens
+
+
+async def _ignore_event(event: str) -> None:
+    pass
+
+
+class CacheWarmer:
+    """
+    Refreshes the cache for the most requested topics and sources ahead of demand: it re-runs
+    their searches, keeps the summaries of pages already summarized from expiring, and summarizes
+    new pages while the LLM budget of the run lasts. Entries it refreshes are marked in the cache.
+    """
+
+    def __init__(self, popularity: Popularity, top_n: int, llm_budget_tokens: int, interval: float,
+                 max_age: float, half_life: float, search_agent=None, page_stages=None) -> None:
+        """
+        Args:
+            popularity (Popularity): The request counts.
+            top_n (int): Requests warmed per run.
+            llm_budget_tokens (int): LLM prompt tokens a run may spend on new pages.
+            interval (float): Seconds between runs, across all workers.
+            max_age (float): Requests last seen longer ago than this many seconds are not warmed.
+            half_life (float): Seconds after which a request counts half as much.
+            search_agent (Optional[AzureBingSearchAgent]): Searches the sources.
+            page_stages (Optional[WebPageStages]): Fetches, converts and summarizes pages.
+        """
+        self.popularity = popularity
+        self.top_n = top_n
+        self.llm_budget_tokens = llm_budget_tokens
+        self.interval = interval
+        self.max_age = max_age
+        self.half_life = half_life
+        self.search_agent = search_agent
+        self.page_stages = page_stages
+
+    def _agents(self):
+        if self.search_agent is None or self.page_stages is None:
+            from server.agents.system_agents.content_creator.stages import WebPageStages
+            from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+
+            self.search_agent = self.search_agent or AzureBingSearchAgent()
+            self.page_stages = self.page_stages or WebPageStages("cache-warming", _ignore_event)
+        return self.search_agent, self.page_stages
+
+    async def _warm_page(self, url: str, title: str, budget: LLMBudget) -> str:
+        from server.agents.system_agents.content_creator.stages import WebPage
+
+        cache = get_cache()
+        stages = self.page_stages
+        page = await stages.fetch(WebPage(url=url, title=title))
+        if page.summary:
+            # Written again so it does not expire before the next run
+            await cache.set(SUMMARY, url, page.summary)
+            await cache.mark_warmed(SUMMARY, url)
+            return "refreshed"
+        if page.failed:
+            return "failed"
+        if budget.exhausted:
+            return "skipped_budget"
+        with charge_tokens_to(budget):
+            for stage in (stages.parse, stages.convert, stages.summarize):
+                page = await stage(page)
+        if page.summary is None:
+            return "failed"
+        await cache.mark_warmed(EXTRACTED, url)
+        await cache.mark_warmed(SUMMARY, url)
+        return "summarized"
+
+    async def warm(self) -> Optional[Dict[str, int]]:
+        """
+        Runs one warming pass, unless another worker ran one within the interval.
+
+        Returns:
+            Optional[Dict[str, int]]: Pages per result and the LLM tokens spent, or None when
+                the run was not claimed.
+        """
+        from server.agents.workflow_agents.azure_bing_search.types import SEARCH_RESPONSE_TYPES
+
+        if not await self.popularity.claim_run("cache_warming", self.interval):
+            return None
+        await self.popularity.decay(0.5 ** (self.interval / self.half_life), self.max_age)
+        requests = await self.popularity.top(self.top_n, self.max_age)
+        search_agent, _ = self._agents()
+        budget = LLMBudget(self.llm_budget_tokens)
+        report: Dict[str, int] = {}
+        start = time.perf_counter()
+
+        for request in requests:
+            seen = set()
+            for source in request.sources:
+                response = await search_agent._bing_search(request.topic, source, refresh=True)
+                if not isinstance(response, SEARCH_RESPONSE_TYPES):
+                    logger.warning(f"Cache warming search failed for '{request.topic}' on {source}: {response}")
+                    continue
+                await get_cache().mark_warmed(SEARCH, search_agent.search_cache_key(request.topic, source))
+                # The pages requests would fetch for this search
+                for result in search_agent.select_results(request.topic, response.web_results):
+                    if result.url in seen:
+                        continue
+                    seen.add(result.url)
+                    try:
+                        result_name = await self._warm_page(result.url, result.title, budget)
+                    except Exception as e:
+                        logger.error(f"Cache warming failed for {result.url}: {e}")
+                        result_name = "failed"
+                    WARMED_PAGES.inc(result=result_name)
+                    report[result_name] = report.get(result_name, 0) + 1
+
+        report["llm_tokens"] = budget.spent
+        logger.info(f"Warmed the cache for {len(requests)} popular requests in {time.perf_counter() - start:.1f}s: {report}.")
+        return report
+
+    async def run(self) -> None:
+        """
+        Warms the cache periodically until cancelled. Workers check more often than the interval
+        so that a run missed by a worker that stopped is picked up by another.
+        """
+        check_every = min(self.interval, 300.0)
+        while True:
+            await asyncio.sleep(check_every)
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.error(f"Cache warming run failed: {e}")
+
+
+_POPULARITY: Optional[Popularity] = None
+_WARMING: Optional[asyncio.Task] = None
+
+
+def get_popularity() -> Popularity:
+    """
+    Returns the process wide request popularity, configured from the cache warming settings.
+
+    Returns:
+        Popularity: The shared popularity counts.
+    """
+    global _POPULARITY
+    if _POPULARITY is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.cache_warming
+        backend = None
+        if settings.store == "sqlite":
+            backend = SqlitePopularity(settings.path)
+            try:
+                backend.open()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Cannot open the popularity database {settings.path}, counting per worker: {e}")
+                backend.close()
+                backend = None
+        elif settings.store != "memory":
+            logger.warning(f"Unknown popularity store '{settings.store}', counting per worker.")
+        if backend is None:
+            backend = MemoryPopularity()
+        _POPULARITY = Popularity(backend)
+    return _POPULARITY
+
+
+async def record_request(topic: str, sources: Sequence[str]) -> None:
+    """
+    Counts a content request towards the popularity of its topic and sources, unless tracking is
+    disabled.
+    """
+    from server.setting import SETTINGS
+
+    if SETTINGS.cache_warming.track and topic and sources:
+        await get_popularity().record(topic, sources)
+
+
+def start_cache_warming() -> Optional[asyncio.Task]:
+    """
+    Starts warming the cache in the background when enabled. Must be called from the event loop.
+
+    Returns:
+        Optional[asyncio.Task]: The warming task, or None when cache warming is disabled.
+    """
+    global _WARMING
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.cache_warming
+    if not settings.enabled:
+        return None
+    warmer = CacheWarmer(
+        get_popularity(), settings.top_n, settings.llm_budget_tokens, settings.interval_seconds,
+        settings.max_age_hours * 3600, settings.half_life_hours * 3600,
+    )
+    _WARMING = asyncio.create_task(warmer.run())
+    return _WARMING
+
+
+async def stop_cache_warming() -> None:
+    """
+    Stops the background cache warming and closes the popularity counts.
+    """
+    global _WARMING, _POPULARITY
+    if _WARMING is not None:
+        _WARMING.cancel()
+        try:
+            await _WARMING
+        except asyncio.CancelledError:
+            pass
+        _WARMING = None
+    if _POPULARITY is not None:
+        _POPULARITY.close()
+        _POPULARITY = None
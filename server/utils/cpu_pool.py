@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from server.utils.metrics import REGISTRY, EXECUTOR_QUEUE_DEPTH
+
+
+logger = logging.getLogger(__name__)
+
+OFFLOAD_QUEUE_TIME = REGISTRY.histogram(
+    "content_writer_cpu_offload_queue_seconds",
+    "Time offloaded CPU work waited between submission and starting on a pool worker.",
+    ["task"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+OFFLOAD_TASKS = REGISTRY.counter(
+    "content_writer_cpu_tasks_total",
+    "CPU-bound tasks by task name and where they ran (inline on the event loop or offloaded).",
+    ["task", "path"],
+)
+
+
+def _timed_call(func: Callable, submitted_at: float, args: Tuple) -> Tuple[float, Any]:
+    # Runs in the worker process; the wall clock is shared, so the parent can compute queue time
+    started_at = time.time()
+    return started_at, func(*args)
+
+
+class CpuOffloadPool:
+    """
+    Runs CPU-bound functions either inline or in a bounded process pool, depending on the size of
+    their input. Small inputs stay on the event loop because pickling and IPC would cost more than
+    the work itself; large inputs are offloaded so they do not stall every other stream.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, start_method: Optional[str] = None) -> None:
+        """
+        Args:
+            max_workers (int): Number of worker processes. 0 disables offloading.
+            max_pending (int): Offloaded tasks allowed to wait for a worker before callers wait.
+            start_method (Optional[str]): multiprocessing start method, e.g. 'forkserver' or 'spawn'.
+                Defaults to the platform default.
+        """
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max(max_workers + max_pending, 1))
+        self._pending = 0
+        EXECUTOR_QUEUE_DEPTH.set_function(lambda: max(self._pending - self.max_workers, 0), executor="cpu_pool")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so that worker processes are only started once offloading is needed
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any, size: int = 0, threshold: int = 0, task: Optional[str] = None) -> Any:
+        """
+        Runs `func(*args)`, offloading it to the pool when `size` reaches `threshold`.
+
+        Args:
+            func (Callable): A picklable, module level function.
+            *args: Picklable arguments for `func`.
+            size (int): Size of the input, e.g. bytes of HTML.
+            threshold (int): Inputs at least this large are offloaded.
+            task (Optional[str]): Name used in metrics. Defaults to the function name.
+
+        Returns:
+            Any: The function's result.
+        """
+        task = task or func.__name__
+        if not self.enabled or size < threshold:
+            OFFLOAD_TASKS.inc(task=task, path="inline")
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            async with self._slots:
+                submitted_at = time.time()
+                try:
+                    started_at, result = await loop.run_in_executor(self._get_executor(), _timed_call, func, submitted_at, args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM killed); replace the pool and do this one inline
+                    logger.error(f"CPU pool broken while running {task}, recreating it.")
+                    self.shutdown(wait=False)
+                    OFFLOAD_TASKS.inc(task=task, path="inline")
+                    return func(*args)
+        finally:
+            self._pending -= 1
+
+        OFFLOAD_QUEUE_TIME.observe(max(started_at - submitted_at, 0.0), task=task)
+        OFFLOAD_TASKS.inc(task=task, path="offloaded")
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_POOL: Optional[CpuOffloadPool] = None
+
+
+def get_cpu_pool() -> CpuOffloadPool:
+    """
+    Returns the process wide CPU offload pool, configured from the CPU pool settings.
+
+    Returns:
+        CpuOffloadPool: The shared pool.
+    """
+    global _POOL
+    if _POOL is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.cpu_pool
+        _POOL = CpuOffloadPool(settings.workers, settings.max_pending, settings.start_method)
+    return _POOL
+
+
+def shutdown_cpu_pool() -> None:
+    """
+    Stops the worker processes of the shared pool, if it was started.
+    """
+    if _POOL is not None:
+        _POOL.shutdown()
@@ -0,0 +1,47 @@
+import logging
+from typing import TYPE_CHECKING, Optional
+
+# httpx is imported on first use, like the agents that need it, to keep `import server` fast
+if TYPE_CHECKING:
+    import httpx
+
+
+logger = logging.getLogger(__name__)
+
+_CLIENT: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    Returns the process wide HTTP client for Bing searches and page fetches, configured from the
+    HTTP client settings. Its connections are pooled, so requests to a host after the first reuse
+    an open connection instead of paying for the TCP and TLS handshakes again.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        import httpx
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.http_client
+        _CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.timeout_seconds, connect=settings.connect_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_connections,
+                keepalive_expiry=settings.keepalive_seconds,
+            ),
+        )
+    return _CLIENT
+
+
+async def close_http_client() -> None:
+    """
+    Closes the connections of the shared HTTP client, if it was created.
+    """
+    global _CLIENT
+    client, _CLIENT = _CLIENT, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from server.utils.metrics import REGISTRY, OPEN_CONNECTIONS
+
+# httpx is imported on first use, like the agents that need it, to keep `import server` fast
+if TYPE_CHECKING:
+    import httpx
+
+
+logger = logging.getLogger(__name__)
+
+LLM_RETRIES = REGISTRY.counter(
+    "content_writer_llm_retries_total",
+    "LLM calls retried by the LLM client, by agent and reason (status code or transport error).",
+    ["agent", "reason"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "content_writer_llm_tokens_total",
+    "Tokens reported by the LLM for calls made through the LLM client, by agent and kind (prompt or completion).",
+    ["agent", "kind"],
+)
+
+# Statuses worth retrying: throttling and transient server errors
+_RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# Keys of an llm_config entry that describe the connection rather than the request
+_CONNECTION_KEYS = frozenset({"model", "api_key", "base_url", "api_type", "api_version", "price", "tags", "cache_seed"})
+_MAX_BACKOFF = 30.0
+
+
+class LLMError(Exception):
+    """Raised when an LLM call fails after its retries, or returns no content."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def chat_completions_endpoint(config: Dict[str, Any]) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """
+    Returns the chat completions URL, query parameters and headers for an entry of
+    `llm_config_list`. Azure entries name the deployment in `model`; other entries are sent to an
+    OpenAI compatible `base_url`.
+
+    Args:
+        config (Dict[str, Any]): The llm_config entry.
+
+    Returns:
+        Tuple[str, Dict[str, str], Dict[str, str]]: The URL, query parameters and headers.
+    """
+    if str(config.get("api_type", "openai")).startswith("azure"):
+        url = f"{config['base_url'].rstrip('/')}/openai/deployments/{config['model']}/chat/completions"
+        return url, {"api-version": config["api_version"]}, {"api-key": config["api_key"]}
+    base_url = (config.get("base_url") or "https://api.openai.com/v1").rstrip("/")
+    return f"{base_url}/chat/completions", {}, {"Authorization": f"Bearer {config['api_key']}"}
+
+
+class LLMClient:
+    """
+    A thin async client for chat completions, for agents that make single stateless calls. It
+    keeps a pool of connections to the deployment, bounds every call with a timeout, retries
+    throttled and transient failures with backoff (honouring `Retry-After`), streams tokens on
+    request and can cache replies in the shared cache.
+    """
+
+    def __init__(self, config: Dict[str, Any], timeout: float = 60.0, connect_timeout: float = 5.0,
+                 max_retries: int = 2, max_connections: int = 32, cache: bool = False,
+                 keepalive: float = 120.0) -> None:
+        """
+        Args:
+            config (Dict[str, Any]): An entry of `llm_config_list`.
+            timeout (float): Seconds a call may wait for the LLM between bytes.
+            connect_timeout (float): Seconds to open a connection.
+            max_retries (int): Retries after the first attempt.
+            max_connections (int): Connections kept to the deployment.
+            cache (bool): Whether replies are cached, keyed by the request.
+            keepalive (float): Seconds idle connections are kept open.
+        """
+        self.url, self.query, self.headers = chat_completions_endpoint(config)
+        self.model = config.get("model", "")
+        self.azure = "api-key" in self.headers
+        # Request parameters configured alongside the connection, e.g. temperature
+        self.defaults = {key: value for key, value in config.items() if key not in _CONNECTION_KEYS}
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.cache = cache
+        self.keepalive = keepalive
+        self._http: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+                                    keepalive_expiry=self.keepalive),
+            )
+        return self._http
+
+    def _body(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Dict[str, Any]:
+        body = {**self.defaults, **params, "messages": messages}
+        if not self.azure:
+            body["model"] = self.model
+        return body
+
+    def cache_key(self, body: Dict[str, Any]) -> str:
+        """
+        Returns the cache key of a request: the deployment and everything sent to it.
+        """
+        return hashlib.sha256(json.dumps([self.url, body], sort_keys=True).encode()).hexdigest()
+
+    async def _backoff(self, agent: str, attempt: int, reason: str, retry_after: Optional[str] = None) -> None:
+        LLM_RETRIES.inc(agent=agent, reason=reason)
+        try:
+            delay = float(retry_after) if retry_after else 0.5 * 2 ** attempt * (1 + random.random())
+        except ValueError:
+            delay = 0.5 * 2 ** attempt
+        logger.warning(f"LLM call for {agent} failed ({reason}), retrying in {min(delay, _MAX_BACKOFF):.1f}s.")
+        await asyncio.sleep(min(delay, _MAX_BACKOFF))
+
+    async def _send(self, agent: str, body: Dict[str, Any], stream: bool) -> "httpx.Response":
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                request = self.http.build_request("POST", self.url, params=self.query, json=body)
+                response = await self.http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if last:
+                    raise LLMError(f"LLM request failed: {e}") from e
+                await self._backoff(agent, attempt, type(e).__name__)
+                continue
+            if response.status_code < 400:
+                return response
+            await response.aread()
+            await response.aclose()
+            if last or response.status_code not in _RETRY_STATUSES:
+                raise LLMError(f"LLM request failed with status {response.status_code}: {response.text[:200]}",
+                               response.status_code)
+            await self._backoff(agent, attempt, str(response.status_code), response.headers.get("retry-after"))
+
+    def _record_usage(self, agent: str, usage: Optional[Dict[str, int]]) -> None:
+        if usage:
+            LLM_TOKENS.inc(usage.get("prompt_tokens", 0), agent=agent, kind="prompt")
+            LLM_TOKENS.inc(usage.get("completion_tokens", 0), agent=agent, kind="completion")
+
+    async def complete(self, messages: List[Dict[str, str]], agent: str = "llm", cache: Optional[bool] = None,
+                       **params: Any) -> str:
+        """
+        Sends a chat completion and returns the reply.
+
+        Args:
+            messages (List[Dict[str, str]]): The messages, e.g. a system prompt and one user message.
+            agent (str): The calling agent, used in metrics.
+            cache (Optional[bool]): Overrides whether the reply is cached.
+            **params (Any): Request parameters, e.g. max_tokens.
+
+        Returns:
+            str: The content of the reply.
+
+        Raises:
+            LLMError: If the call fails after its retries or the reply has no content.
+        """
+        body = self._body(messages, params)
+        cached = self.cache if cache is None else cache
+        if cached:
+            from server.utils.cache import LLM, get_cache
+
+            key = self.cache_key(body)
+            reply = await get_cache().get(LLM, key)
+            if reply is not None:
+                return reply
+
+        with OPEN_CONNECTIONS.track_inprogress(target="llm"):
+            response = await self._send(agent, body, stream=False)
+        try:
+            payload = response.json()
+            reply = payload["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Unexpected LLM response: {e}") from e
+        if reply is None:
+            raise LLMError("The LLM returned no content.")
+        self._record_usage(agent, payload.get("usage"))
+
+        if cached:
+            await get_cache().set(LLM, key, reply)
+        return reply
+
+    async def stream(self, messages: List[Dict[str, str]], agent: str = "llm", **params: Any) -> AsyncGenerator[str, None]:
+        """
+        Sends a streaming chat completion and yields the content of the reply as it arrives. Only
+        opening the stream is retried; a stream that breaks off raises.
+
+        Args:
+            messages (List[Dict[str, str]]): The messages.
+            agent (str): The calling agent, used in metrics.
+            **params (Any): Request parameters, e.g. max_tokens.
+
+        Returns:
+            AsyncGenerator[str, None]: The content deltas of the reply.
+
+        Raises:
+            LLMError: If the call fails.
+        """
+        import httpx
+
+        body = {**self._body(messages, params), "stream": True}
+        with OPEN_CONNECTIONS.track_inprogress(target="llm"):
+            response = await self._send(agent, body, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    self._record_usage(agent, chunk.get("usage"))
+                    for choice in chunk.get("choices") or ():
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield content
+            except httpx.TransportError as e:
+                raise LLMError(f"LLM stream broke off: {e}") from e
+            finally:
+                await response.aclose()
+
+    async def aclose(self) -> None:
+        http, self._http = self._http, None
+        if http is not None:
+            await http.aclose()
+
+
+_CLIENT: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Returns the process wide LLM client for the first entry of `llm_config_list`, configured from
+    the LLM client settings.
+
+    Returns:
+        LLMClient: The shared client.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.llm_client
+        _CLIENT = LLMClient(
+            SETTINGS.llm_config_list[0], settings.timeout_seconds, settings.connect_timeout_seconds,
+            settings.max_retries, settings.max_connections, settings.cache, settings.keepalive_seconds,
+        )
+    return _CLIENT
+
+
+async def close_llm_client() -> None:
+    """
+    Closes the connections of the shared LLM client, if it was created.
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
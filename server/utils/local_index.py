@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from server.utils.sqlite import SqliteConnections
+
+
+logger = logging.getLogger(__name__)
+
+_TERM = re.compile(r"\w+")
+# Words that carry no topic on their own, dropped from queries
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to was were will with".split()
+)
+# Relative weight of a term in each field; titles and summaries describe the page best
+_FIELD_WEIGHTS = {"title": 2.0, "summary": 1.5, "content": 1.0}
+# Extracted content indexed per page; the start of an article is the most descriptive part
+_MAX_CONTENT_CHARS = 50_000
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+@dataclass
+class LocalHit:
+    """
+    A page found in the local index.
+    """
+    url: str
+    title: str
+    summary: str
+    score: float
+
+
+def query_terms(text: str) -> List[str]:
+    """
+    Splits a search query into lower-cased terms, without stopwords or repeats.
+
+    Args:
+        text (str): The query.
+
+    Returns:
+        List[str]: The terms, in query order.
+    """
+    return list(dict.fromkeys(term for term in _TERM.findall(text.lower()) if term not in _STOPWORDS))
+
+
+def page_site(url: str) -> str:
+    """
+    Returns the host of a URL without 'www.', the form sites are matched in.
+    """
+    host = urlsplit(url if "//" in url else f"//{url}").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _site_matches(site: str, wanted: Optional[str]) -> bool:
+    # Like Bing's site: operator, a domain also matches its subdomains
+    return not wanted or site == wanted or site.endswith(f".{wanted}")
+
+
+class MemoryLocalIndex:
+    """
+    An inverted index with BM25 ranking in the memory of the current process. Only the terms of a
+    page are kept, with its title and summary.
+    """
+
+    def __init__(self, max_documents: int) -> None:
+        """
+        Args:
+            max_documents (int): Pages kept; the least recently indexed are dropped first.
+        """
+        self.max_documents = max_documents
+        self._pages: Dict[str, dict] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+
+    def _remove(self, url: str) -> Optional[dict]:
+        page = self._pages.pop(url, None)
+        if page is not None:
+            for term in page["terms"]:
+                urls = self._postings.get(term)
+                if urls is not None:
+                    urls.discard(url)
+                    if not urls:
+                        del self._postings[term]
+            self._total_length -= page["length"]
+        return page
+
+    def add(self, url: str, title: Optional[str] = None, summary: Optional[str] = None,
+            content: Optional[str] = None) -> None:
+        with self._lock:
+            page = self._remove(url) or {"fields": {}}
+            fields = page["fields"]
+            for name, text in (("title", title), ("summary", summary), ("content", content)):
+                if text is not None:
+                    fields[name] = Counter(_TERM.findall(text[:_MAX_CONTENT_CHARS].lower()))
+            terms = Counter()
+            for name, counts in fields.items():
+                for term, count in counts.items():
+                    terms[term] += count * _FIELD_WEIGHTS[name]
+            page.update(
+                site=page_site(url), terms=terms, length=sum(terms.values()), indexed_at=time.time(),
+                title=title if title is not None else page.get("title", ""),
+                summary=summary if summary is not None else page.get("summary", ""),
+            )
+            self._pages[url] = page
+            self._total_length += page["length"]
+            for term in terms:
+                self._postings.setdefault(term, set()).add(url)
+            while len(self._pages) > self.max_documents:
+                self._remove(min(self._pages, key=lambda key: self._pages[key]["indexed_at"]))
+
+    def search(self, query: str, site: Optional[str], limit: int, indexed_after: float) -> List[LocalHit]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term, set()) for term in terms]
+            # Every term of the query must appear in the page
+            candidates = set.intersection(*postings) if all(postings) else set()
+            total = len(self._pages)
+            average_length = self._total_length / total if total else 0.0
+            hits = []
+            for url in candidates:
+                page = self._pages[url]
+                if page["indexed_at"] < indexed_after or not _site_matches(page["site"], site):
+                    continue
+                score = 0.0
+                for term, urls in zip(terms, postings):
+                    idf = math.log(1 + (total - len(urls) + 0.5) / (len(urls) + 0.5))
+                    frequency = page["terms"][term]
+                    norm = _K1 * (1 - _B + _B * page["length"] / average_length) if average_length else _K1
+                    score += idf * frequency * (_K1 + 1) / (frequency + norm)
+                hits.append(LocalHit(url, page["title"], page["summary"], score))
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return hits[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._postings.clear()
+            self._total_length = 0.0
+
+
+class SqliteLocalIndex:
+    """
+    A full text index in a SQLite database shared by every worker process on the host, ranked
+    with the BM25 function of FTS5. The pages live in a regular table that the FTS5 index follows
+    through triggers, so a page can be updated by URL.
+    """
+
+    def __init__(self, path: str, max_documents: int) -> None:
+        """
+        Args:
+            path (str): The database file.
+            max_documents (int): Pages kept; the least recently indexed are pruned on write.
+        """
+        self.max_documents = max_documents
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS local_pages ("
+            " id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, site TEXT NOT NULL,"
+            " title TEXT, summary TEXT, content TEXT, indexed_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS local_pages_indexed_at ON local_pages (indexed_at)",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS local_pages_fts USING fts5("
+            " title, summary, content, content='local_pages', content_rowid='id')",
+            "CREATE TRIGGER IF NOT EXISTS local_pages_insert AFTER INSERT ON local_pages BEGIN"
+            " INSERT INTO local_pages_fts (rowid, title, summary, content)"
+            " VALUES (new.id, new.title, new.summary, new.content); END",
+            "CREATE TRIGGER IF NOT EXISTS local_pages_delete AFTER DELETE ON local_pages BEGIN"
+            " INSERT INTO local_pages_fts (local_pages_fts, rowid, title, summary, content)"
+            " VALUES ('delete', old.id, old.title, old.summary, old.content); END",
+            "CREATE TRIGGER IF NOT EXISTS local_pages_update AFTER UPDATE ON local_pages BEGIN"
+            " INSERT INTO local_pages_fts (local_pages_fts, rowid, title, summary, content)"
+            " VALUES ('delete', old.id, old.title, old.summary, old.content);"
+            " INSERT INTO local_pages_fts (rowid, title, summary, content)"
+            " VALUES (new.id, new.title, new.summary, new.content); END",
+        ])
+        self._writes = 0
+
+    def open(self) -> None:
+        """
+        Opens the database for the calling thread, raising if it cannot be used.
+        """
+        self._connections.get()
+
+    def add(self, url: str, title: Optional[str] = None, summary: Optional[str] = None,
+            content: Optional[str] = None) -> None:
+        connection = self._connections.get()
+        now = time.time()
+        connection.execute(
+            "INSERT INTO local_pages (url, site, title, summary, content, indexed_at) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (url) DO UPDATE SET title = COALESCE(excluded.title, title),"
+            " summary = COALESCE(excluded.summary, summary), content = COALESCE(excluded.content, content),"
+            " indexed_at = excluded.indexed_at",
+            (url, page_site(url), title, summary, content[:_MAX_CONTENT_CHARS] if content else content, now),
+        )
+        # Prune now and then rather than on every write
+        self._writes += 1
+        if self._writes % 100 == 0:
+            connection.execute(
+                "DELETE FROM local_pages WHERE id NOT IN ("
+                " SELECT id FROM local_pages ORDER BY indexed_at DESC LIMIT ?)",
+                (self.max_documents,),
+            )
+
+    def search(self, query: str, site: Optional[str], limit: int, indexed_after: float) -> List[LocalHit]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Quoted terms are matched literally and all of them must appear
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        weights = ", ".join(str(_FIELD_WEIGHTS[name]) for name in ("title", "summary", "content"))
+        sql = (
+            f"SELECT p.url, p.title, p.summary, bm25(local_pages_fts, {weights}) AS rank"
+            " FROM local_pages_fts JOIN local_pages p ON p.id = local_pages_fts.rowid"
+            " WHERE local_pages_fts MATCH ? AND p.indexed_at >= ?"
+        )
+        params = [match, indexed_after]
+        if site:
+            sql += " AND (p.site = ? OR p.site LIKE ?)"
+            params += [site, f"%.{site}"]
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        # FTS5 ranks lower is better; scores are reported the other way round
+        return [
+            LocalHit(url, title or "", summary or "", -rank)
+            for url, title, summary, rank in self._connections.get().execute(sql, params).fetchall()
+        ]
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+class LocalIndex:
+    """
+    Async facade over a local index backend. Calls to the SQLite backend run in the default
+    executor, and index errors are logged rather than failing the request.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._offload = isinstance(backend, SqliteLocalIndex)
+
+    async def _call(self, method, *args):
+        if self._offload:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def add(self, url: str, title: Optional[str] = None, summary: Optional[str] = None,
+                  content: Optional[str] = None) -> None:
+        """
+        Indexes a page, or updates the given fields of a page already indexed.
+
+        Args:
+            url (str): The URL of the page.
+            title (Optional[str]): The title of the page.
+            summary (Optional[str]): The summary of the page.
+            content (Optional[str]): The extracted content of the page.
+        """
+        try:
+            await self._call(self.backend.add, url, title, summary, content)
+        except sqlite3.Error as e:
+            logger.error(f"Local index write failed for {url}: {e}")
+
+    async def search(self, query: str, site: Optional[str], limit: int, max_age: float) -> List[LocalHit]:
+        """
+        Finds the indexed pages containing every term of a query, best BM25 score first.
+
+        Args:
+            query (str): The search term.
+            site (Optional[str]): Restricts the results to a domain and its subdomains.
+            limit (int): The number of pages to return at most.
+            max_age (float): Pages indexed longer ago than this many seconds are stale and skipped.
+
+        Returns:
+            List[LocalHit]: The pages found.
+        """
+        site = page_site(site) if site else None
+        try:
+            return await self._call(self.backend.search, query, site, limit, time.time() - max_age)
+        except sqlite3.Error as e:
+            logger.error(f"Local index search failed for '{query}': {e}")
+            return []
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+_INDEX: Optional[LocalIndex] = None
+
+
+def get_local_index() -> LocalIndex:
+    """
+    Returns the process wide local index, configured from the local index settings.
+
+    Returns:
+        LocalIndex: The shared index.
+    """
+    global _INDEX
+    if _INDEX is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.local_index
+        backend = None
+        if settings.store == "sqlite":
+            backend = SqliteLocalIndex(settings.path, settings.max_documents)
+            try:
+                backend.open()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Cannot open the local index {settings.path}, using the in-memory index: {e}")
+                backend.close()
+                backend = None
+        elif settings.store != "memory":
+            logger.warning(f"Unknown local index store '{settings.store}', using the in-memory index.")
+        if backend is None:
+            backend = MemoryLocalIndex(settings.max_documents)
+        _INDEX = LocalIndex(backend)
+    return _INDEX
+
+
+def close_local_index() -> None:
+    """
+    Closes the shared local index, if it was opened.
+    """
+    global _INDEX
+    if _INDEX is not None:
+        _INDEX.close()
+        _INDEX = None
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Iterable, List, Optional, Union
+
+from server.utils.metrics import REGISTRY, record_error
+
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge(
+    "content_writer_pipeline_queue_depth",
+    "Items waiting in the input queue of a pipeline stage, over all running pipelines.",
+    ["pipeline", "stage"],
+)
+PIPELINE_BUSY_WORKERS = REGISTRY.gauge(
+    "content_writer_pipeline_busy_workers",
+    "Pipeline stage workers currently processing an item.",
+    ["pipeline", "stage"],
+)
+PIPELINE_ITEMS = REGISTRY.counter(
+    "content_writer_pipeline_items_total",
+    "Items processed by pipeline stages, by outcome (ok, dropped or error).",
+    ["pipeline", "stage", "outcome"],
+)
+
+# Marks the end of the items in a queue
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    A step of a pipeline.
+
+    Attributes:
+        name (str): Name of the stage in logs and metrics.
+        func (Callable[[Any], Awaitable[Any]]): Processes one item. Returning None drops the item;
+            exceptions are logged and drop it too.
+        workers (int): Items processed concurrently by this stage.
+        max_queue (int): Items allowed to wait for a worker before upstream stages block.
+            Defaults to twice the number of workers.
+        fan_out (bool): The function returns an iterable of items, each passed on separately.
+    """
+    name: str
+    func: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    max_queue: int = 0
+    fan_out: bool = False
+
+    @property
+    def queue_size(self) -> int:
+        return self.max_queue if self.max_queue > 0 else 2 * max(self.workers, 1)
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages. Every stage has its own pool of workers and a bounded
+    input queue, so different items are in different stages at the same time (e.g. one page being
+    fetched while another is parsed and a third summarized), and a slow stage makes the stages
+    before it wait instead of piling up work.
+
+    Stage functions can publish intermediate results, such as status events, with `emit`; they
+    are yielded by `run` along with the results of the last stage.
+    """
+
+    def __init__(self, name: str, stages: List[Stage], max_output: int = 64) -> None:
+        """
+        Args:
+            name (str): Name of the pipeline in logs and metrics.
+            stages (List[Stage]): The stages, in order.
+            max_output (int): Results buffered for the consumer before the last stage waits.
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.name = name
+        self.stages = stages
+        self._output: Optional[asyncio.Queue] = None
+        self._max_output = max_output
+        self._depth = {stage.name: 0 for stage in stages}
+
+    async def emit(self, item: Any) -> None:
+        """
+        Publishes an item to the consumer of the pipeline, waiting while the consumer is behind.
+
+        Args:
+            item (Any): The item, e.g. a status event.
+        """
+        await self._output.put(item)
+
+    async def _put(self, queue: asyncio.Queue, stage: Optional[Stage], item: Any) -> None:
+        await queue.put(item)
+        if stage is not None:
+            self._depth[stage.name] += 1
+            PIPELINE_QUEUE_DEPTH.inc(pipeline=self.name, stage=stage.name)
+
+    async def _feed(self, source: Union[Iterable, AsyncIterable], inbox: asyncio.Queue) -> None:
+        stage = self.stages[0]
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await self._put(inbox, stage, item)
+        else:
+            for item in source:
+                await self._put(inbox, stage, item)
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue,
+                      next_stage: Optional[Stage]) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            self._depth[stage.name] -= 1
+            PIPELINE_QUEUE_DEPTH.dec(pipeline=self.name, stage=stage.name)
+
+            try:
+                with PIPELINE_BUSY_WORKERS.track_inprogress(pipeline=self.name, stage=stage.name):
+                    result = await stage.func(item)
+            except Exception as e:
+                record_error(stage.name, e)
+                logger.error(f"Pipeline {self.name} stage {stage.name} failed: {e}")
+                PIPELINE_ITEMS.inc(pipeline=self.name, stage=stage.name, outcome="error")
+                continue
+
+            if result is None:
+                PIPELINE_ITEMS.inc(pipeline=self.name, stage=stage.name, outcome="dropped")
+                continue
+            PIPELINE_ITEMS.inc(pipeline=self.name, stage=stage.name, outcome="ok")
+            for output in (result if stage.fan_out else (result,)):
+                await self._put(outbox, next_stage, output)
+
+    async def _run_stage(self, index: int, inbox: asyncio.Queue, outbox: asyncio.Queue,
+                         upstream: asyncio.Task) -> None:
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        workers = [
+            asyncio.create_task(self._worker(stage, inbox, outbox, next_stage))
+            for _ in range(max(stage.workers, 1))
+        ]
+        try:
+            # Once everything upstream is done, each worker stops at its end marker
+            await upstream
+            for _ in workers:
+                await inbox.put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def run(self, source: Union[Iterable, AsyncIterable]) -> AsyncGenerator[Any, None]:
+        """
+        Runs the items of `source` through the stages. A pipeline runs one source at a time.
+
+        Args:
+            source (Union[Iterable, AsyncIterable]): The input items of the first stage.
+
+        Yields:
+            Any: Emitted items and the results of the last stage, in the order they are produced.
+        """
+        self._output = asyncio.Queue(maxsize=self._max_output)
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages] + [self._output]
+
+        upstream = asyncio.create_task(self._feed(source, queues[0]))
+        tasks = [upstream]
+        for index in range(len(self.stages)):
+            upstream = asyncio.create_task(self._run_stage(index, queues[index], queues[index + 1], upstream))
+            tasks.append(upstream)
+
+        async def finish() -> None:
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                await self._output.put(_DONE)
+
+        finisher = asyncio.create_task(finish())
+        try:
+            while True:
+                item = await self._output.get()
+                if item is _DONE:
+                    break
+                yield item
+            await finisher
+        finally:
+            # Stop every stage if the consumer went away early
+            for task in tasks + [finisher]:
+                task.cancel()
+            for stage_name, pending in self._depth.items():
+                if pending:
+                    PIPELINE_QUEUE_DEPTH.dec(pending, pipeline=self.name, stage=stage_name)
+                    self._depth[stage_name] = 0
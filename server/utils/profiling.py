@@ -0,0 +1,203 @@
+import cProfile
+import importlib.util
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+_REQ_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+# Both pyinstrument and cProfile install a per-thread profiler hook, and every request shares the
+# event loop thread, so only one request is profiled at a time.
+_ACTIVE_PROFILE = threading.Lock()
+
+
+def _settings():
+    from server.setting import SETTINGS
+
+    return SETTINGS.profiling
+
+
+def is_authorized(user: str) -> bool:
+    """
+    Checks whether a user may request profiles and download them.
+
+    Args:
+        user (str): The user from the request headers.
+
+    Returns:
+        bool: True if the user is in the authorized users list.
+    """
+    return user in _settings().authorized_users
+
+
+def should_profile(headers, user: str) -> bool:
+    """
+    Decides whether a request is profiled: authorized users can ask for it with the `X-Profile`
+    header, and any request can be picked by the configured sampling rate.
+
+    Args:
+        headers (Mapping[str, str]): The request headers.
+        user (str): The user making the request.
+
+    Returns:
+        bool: True if the request should be profiled.
+    """
+    settings = _settings()
+    if not settings.enabled:
+        return False
+    if headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes") and is_authorized(user):
+        return True
+    return settings.sample_rate > 0 and random.random() < settings.sample_rate
+
+
+def is_valid_req_id(req_id: str) -> bool:
+    return bool(_REQ_ID_PATTERN.match(req_id or ""))
+
+
+class _Profiler:
+    """
+    Wall-clock, async-aware profiling with pyinstrument when installed. Falls back to cProfile,
+    which measures the event loop thread only and so also includes other requests' work that ran
+    while this one was awaiting.
+    """
+
+    def __init__(self) -> None:
+        self.backend = "pyinstrument" if importlib.util.find_spec("pyinstrument") else "cprofile"
+        if self.backend == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler(async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.backend == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.backend == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, path_without_extension: str) -> str:
+        if self.backend == "pyinstrument":
+            path = f"{path_without_extension}.html"
+            with open(path, "w", encoding="utf-8") as profile_file:
+                profile_file.write(self._profiler.output_html())
+            return path
+
+        path = f"{path_without_extension}.prof"
+        self._profiler.dump_stats(path)
+        # A plain text summary next to the raw stats for quick inspection
+        summary = io.StringIO()
+        pstats.Stats(self._profiler, stream=summary).sort_stats("cumulative").print_stats(60)
+        with open(f"{path_without_extension}.txt", "w", encoding="utf-8") as summary_file:
+            summary_file.write(summary.getvalue())
+        return path
+
+
+async def profile_stream(req_id: str, kind: str, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """
+    Profiles the full execution of a streaming agent run and stores the result keyed by req_id.
+
+    Args:
+        req_id (str): The request identifier used as the profile name.
+        kind (str): What is being profiled, e.g. "get-content".
+        stream (AsyncGenerator[str, None]): The agent's event stream.
+
+    Yields:
+        str: The events of the wrapped stream, unchanged.
+    """
+    if not is_valid_req_id(req_id) or not _ACTIVE_PROFILE.acquire(blocking=False):
+        logger.info(f"[{req_id}] Skipping profiling; another request is being profiled or the id is invalid.")
+        async for event in stream:
+            yield event
+        return
+
+    profiler = _Profiler()
+    started_at = time.time()
+    try:
+        profiler.start()
+        try:
+            async for event in stream:
+                yield event
+        finally:
+            profiler.stop()
+            directory = _settings().directory
+            os.makedirs(directory, exist_ok=True)
+            path = profiler.save(os.path.join(directory, req_id))
+            metadata = {
+                "req_id": req_id,
+                "kind": kind,
+                "backend": profiler.backend,
+                "file": os.path.basename(path),
+                "started_at": started_at,
+                "duration_s": round(time.time() - started_at, 3),
+            }
+            with open(os.path.join(directory, f"{req_id}.json"), "w", encoding="utf-8") as metadata_file:
+                json.dump(metadata, metadata_file)
+            logger.info(f"[{req_id}] Stored {profiler.backend} profile at {path}.")
+    finally:
+        _ACTIVE_PROFILE.release()
+
+
+def list_profiles() -> List[Dict]:
+    """
+    Lists stored profiles, newest first.
+
+    Returns:
+        List[Dict]: Profile metadata records.
+    """
+    directory = _settings().directory
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as metadata_file:
+                profiles.append(json.load(metadata_file))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda profile: profile.get("started_at", 0), reverse=True)
+
+
+def get_profile_path(req_id: str) -> Optional[str]:
+    """
+    Returns the path of the stored profile for a request, if any.
+
+    Args:
+        req_id (str): The request identifier.
+
+    Returns:
+        Optional[str]: The profile file path, or None.
+    """
+    if not is_valid_req_id(req_id):
+        return None
+
+    directory = _settings().directory
+    try:
+        with open(os.path.join(directory, f"{req_id}.json"), encoding="utf-8") as metadata_file:
+            metadata = json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+    path = os.path.join(directory, os.path.basename(metadata.get("file", "")))
+    return path if os.path.isfile(path) else None
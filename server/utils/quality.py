@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from server.utils.metrics import REGISTRY
+
+
+REFLECTION_PATHS = REGISTRY.counter(
+    "content_writer_reflection_total",
+    "Drafts by reflection path chosen by the quality gate: skipped, short (one critique turn) or full.",
+    ["agent", "path"],
+)
+QUALITY_GATE_FAILURES = REGISTRY.counter(
+    "content_writer_quality_gate_failures_total",
+    "Quality gate checks failed by drafts.",
+    ["agent", "check"],
+)
+
+_HASHTAG_PATTERN = re.compile(r"(?<![\w#])#[A-Za-z][\w]*")
+_URL_PATTERN = re.compile(r"https?://\S+")
+# Phrases that invite the reader to act or respond, besides ending on a question
+_CTA_PATTERN = re.compile(
+    r"\b(share|comment|let me know|let us know|tell (me|us)|join|reach out|connect|learn more|read more|"
+    r"explore|discover|follow|subscribe|sign up|register|contact|check out|i invite|i encourage|"
+    r"what do you think|how (do|does|is|are|will|can) (you|your))\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class QualityReport:
+    """
+    The outcome of the local quality checks of a draft.
+    """
+    words: int
+    checks: Dict[str, bool] = field(default_factory=dict)
+
+    @property
+    def failures(self) -> List[str]:
+        return [name for name, passed in self.checks.items() if not passed]
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+
+def _closing_text(post: str) -> str:
+    # The last paragraphs that are not just hashtags, where a call to action is expected
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", post.strip()) if p.strip()]
+    prose = [p for p in paragraphs if len(_HASHTAG_PATTERN.findall(p)) < max(len(p.split()) / 2, 1)]
+    return "\n".join(prose[-2:])
+
+
+def evaluate_post(post: str, source_url: Optional[str] = None, target_words: int = 350,
+                  word_tolerance: float = 0.3, min_hashtags: int = 2, require_source_link: bool = False) -> QualityReport:
+    """
+    Checks a draft against the post guidelines that can be verified without a model: its length
+    against the target, a call to action near the end, hashtags and, optionally, a link to the source.
+
+    Args:
+        post (str): The draft.
+        source_url (Optional[str]): The article the post is based on.
+        target_words (int): The target length in words.
+        word_tolerance (float): Allowed relative deviation from the target length.
+        min_hashtags (int): Hashtags the post must contain.
+        require_source_link (bool): Whether the post must link to the source article.
+
+    Returns:
+        QualityReport: The word count and the result of each check.
+    """
+    words = len(_HASHTAG_PATTERN.sub("", post).split())
+    closing = _closing_text(post)
+    checks = {
+        "length": abs(words - target_words) <= target_words * word_tolerance,
+        "call_to_action": "?" in closing or bool(_CTA_PATTERN.search(closing)),
+        "hashtags": len(set(_HASHTAG_PATTERN.findall(post))) >= min_hashtags,
+    }
+    if require_source_link and source_url:
+        domain = urlparse(source_url).netloc.lower()
+        domain = domain[4:] if domain.startswith("www.") else domain
+        links = [url.lower() for url in _URL_PATTERN.findall(post)]
+        checks["source_link"] = any(source_url.lower() in url or (domain and domain in url) for url in links)
+    return QualityReport(words=words, checks=checks)
+
+
+def gate_reflection(agent: str, draft: Optional[str], reflection_chat: dict, max_turns: int,
+                    source_url: Optional[str] = None) -> bool:
+    """
+    Decides how much reflection a draft gets. Drafts passing every check skip it; drafts failing
+    few checks get a single critique turn, and the others the full `max_turns`. The turns are set
+    on the nested reflection chat, which autogen copies each time it runs.
+
+    Only called when an agent's user proxy replies to a draft. With the agents as the service
+    creates them today that does not happen (the editor runs a single turn and the writer is not
+    on a route), so the gate has no effect until reflection is enabled there.
+
+    Args:
+        agent (str): Name of the agent in metrics.
+        draft (Optional[str]): The draft to check.
+        reflection_chat (dict): The nested reflection chat registered with the user proxy.
+        max_turns (int): Reflection turns for drafts that fail the gate.
+        source_url (Optional[str]): The article the draft is based on.
+
+    Returns:
+        bool: True if reflection should be skipped.
+    """
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.quality_gate
+    if not settings.enabled or not draft:
+        reflection_chat["max_turns"] = max_turns
+        REFLECTION_PATHS.inc(agent=agent, path="full")
+        return False
+
+    report = evaluate_post(
+        draft,
+        source_url=source_url,
+        target_words=settings.target_words,
+        word_tolerance=settings.word_tolerance,
+        min_hashtags=settings.min_hashtags,
+        require_source_link=settings.require_source_link,
+    )
+    for check in report.failures:
+        QUALITY_GATE_FAILURES.inc(agent=agent, check=check)
+
+    if report.passed:
+        path = "skipped"
+    elif len(report.failures) <= settings.short_reflection_failures:
+        path = "short"
+        reflection_chat["max_turns"] = 1
+    else:
+        path = "full"
+        reflection_chat["max_turns"] = max_turns
+    REFLECTION_PATHS.inc(agent=agent, path=path)
+    return path == "skipped"
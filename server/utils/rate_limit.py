@@ -0,0 +1,483 @@
+import asyncio
+import contextvars
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+
+from server.utils.metrics import REGISTRY
+from server.utils.sqlite import SqliteConnections
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = REGISTRY.counter(
+    "content_writer_rate_limited_total",
+    "Requests rejected by the per-user limits, by limit (requests, tokens or streams).",
+    ["limit"],
+)
+
+# The lease of the user whose pipeline step is running, or another account LLM prompt tokens are charged to
+_CURRENT_LEASE: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("rate_limit_lease", default=None)
+
+# (start of the current window, requests in it, requests in the previous window)
+WindowState = Tuple[float, float, float]
+# (tokens left, time of the last refill)
+BucketState = Tuple[float, float]
+
+
+def window_hit(state: Optional[WindowState], limit: int, window: float, now: float) -> Tuple[bool, float, WindowState]:
+    """
+    Counts a request in a sliding window approximated from two fixed windows: the requests of the
+    previous window are weighted by how much of it still overlaps the sliding window.
+
+    Args:
+        state (Optional[WindowState]): The state of the key, None for a new key.
+        limit (int): Requests allowed per window.
+        window (float): The window in seconds.
+        now (float): The current time.
+
+    Returns:
+        Tuple[bool, float, WindowState]: Whether the request is allowed, the seconds until it
+            would be, and the new state.
+    """
+    start = math.floor(now / window) * window
+    if state is None or state[0] != start:
+        previous = state[1] if state is not None and state[0] == start - window else 0.0
+        state = (start, 0.0, previous)
+    _, current, previous = state
+    weight = 1 - (now - start) / window
+    if previous * weight + current + 1 <= limit:
+        return True, 0.0, (start, current + 1, previous)
+    if current + 1 > limit or not previous:
+        return False, start + window - now, state
+    # The previous window's weight must drop until the request fits
+    return False, (1 - (limit - 1 - current) / previous) * window - (now - start), state
+
+
+def bucket_refill(state: Optional[BucketState], capacity: float, rate: float, now: float) -> BucketState:
+    """
+    Returns a token bucket refilled at `rate` tokens per second up to `capacity`.
+    """
+    if state is None:
+        return capacity, now
+    tokens, updated_at = state
+    return min(capacity, tokens + max(now - updated_at, 0.0) * rate), now
+
+
+class MemoryRateLimitBackend:
+    """
+    Keeps the limit state of each user in the memory of the current process, with O(1) work per
+    request. Only suitable for a single worker: every process enforces its own limits.
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        """
+        Args:
+            max_keys (int): Keys kept; the least recently used are dropped first.
+        """
+        self.max_keys = max_keys
+        self._states: "OrderedDict[str, Any]" = OrderedDict()
+        self._leases: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key: str, state: Any) -> None:
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_keys:
+            self._states.popitem(last=False)
+
+    def hit_window(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            allowed, retry_after, state = window_hit(self._states.get(key), limit, window, now)
+            self._store(key, state)
+        return allowed, retry_after
+
+    def check_bucket(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, _ = bucket_refill(self._states.get(key), capacity, rate, now)
+        return tokens > 0, (1 - tokens) / rate if tokens <= 0 and rate else 0.0
+
+    def charge_bucket(self, key: str, amount: float, capacity: float, rate: float, now: float) -> None:
+        with self._lock:
+            tokens, updated_at = bucket_refill(self._states.get(key), capacity, rate, now)
+            self._store(key, (tokens - amount, updated_at))
+
+    def acquire_lease(self, key: str, lease_id: str, limit: int, expires_at: float, now: float) -> bool:
+        with self._lock:
+            leases = self._leases.setdefault(key, {})
+            for expired in [lease for lease, expiry in leases.items() if expiry < now]:
+                del leases[expired]
+            if len(leases) >= limit:
+                return False
+            leases[lease_id] = expires_at
+            return True
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        with self._lock:
+            leases = self._leases.get(key)
+            if leases is not None:
+                leases.pop(lease_id, None)
+                if not leases:
+                    del self._leases[key]
+
+    def close(self) -> None:
+        with self._lock:
+            self._states.clear()
+            self._leases.clear()
+
+
+class SqliteRateLimitBackend:
+    """
+    Keeps the limit state of each user in a SQLite database shared by every worker process on the
+    host, so limits hold across workers. Each update reads and writes one row inside an immediate
+    transaction. Stream leases expire, so a worker that dies does not hold its users' streams.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The database file.
+        """
+        self._connections = SqliteConnections(path, [
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, a REAL, b REAL, c REAL)",
+            "CREATE TABLE IF NOT EXISTS rate_limit_leases ("
+            " key TEXT NOT NULL, lease_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS rate_limit_leases_key ON rate_limit_leases (key, expires_at)",
+        ])
+
+    def open(self) -> None:
+        """
+        Opens the database for the calling thread, raising if it cannot be used.
+        """
+        self._connections.get()
+
+    def _update(self, key: str, update):
+        connection = self._connections.get()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT a, b, c FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            result, state = update(tuple(value for value in row if value is not None) if row else None)
+            if state is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, a, b, c) VALUES (?, ?, ?, ?)",
+                    (key, *state, *(None,) * (3 - len(state))),
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def hit_window(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        def update(state):
+            allowed, retry_after, state = window_hit(state, limit, window, now)
+            return (allowed, retry_after), state
+        return self._update(key, update)
+
+    def check_bucket(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        row = self._connections.get().execute("SELECT a, b FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        tokens, _ = bucket_refill(tuple(row) if row else None, capacity, rate, now)
+        return tokens > 0, (1 - tokens) / rate if tokens <= 0 and rate else 0.0
+
+    def charge_bucket(self, key: str, amount: float, capacity: float, rate: float, now: float) -> None:
+        def update(state):
+            tokens, updated_at = bucket_refill(state, capacity, rate, now)
+            return None, (tokens - amount, updated_at)
+        self._update(key, update)
+
+    def acquire_lease(self, key: str, lease_id: str, limit: int, expires_at: float, now: float) -> bool:
+        connection = self._connections.get()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM rate_limit_leases WHERE key = ? AND expires_at < ?", (key, now))
+            (count,) = connection.execute("SELECT count(*) FROM rate_limit_leases WHERE key = ?", (key,)).fetchone()
+            if count < limit:
+                connection.execute(
+                    "INSERT INTO rate_limit_leases (key, lease_id, expires_at) VALUES (?, ?, ?)", (key, lease_id, expires_at)
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return count < limit
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        self._connections.get().execute("DELETE FROM rate_limit_leases WHERE lease_id = ?", (lease_id,))
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+class RateLimited(HTTPException):
+    """Raised when a user exceeds one of their limits; carries the `Retry-After` header."""
+
+    def __init__(self, limit: str, detail: str, retry_after: float) -> None:
+        self.limit = limit
+        super().__init__(status_code=429, detail=detail, headers={"Retry-After": str(max(math.ceil(retry_after), 1))})
+
+
+class UserLease:
+    """
+    A stream slot of a user, and the account LLM prompt tokens of the user's pipeline are charged
+    to. The slot is released once, when the guarded stream ends; a lease whose stream never
+    starts must be released explicitly.
+    """
+
+    def __init__(self, limiter: "RateLimiter", user: str, lease_id: Optional[str]) -> None:
+        self.limiter = limiter
+        self.user = user
+        self._lease_id = lease_id
+        self._pending_tokens = 0
+
+    def charge(self, tokens: int) -> None:
+        # Called from synchronous code; flushed to the backend between pipeline steps
+        self._pending_tokens += tokens
+
+    async def flush(self) -> None:
+        tokens, self._pending_tokens = self._pending_tokens, 0
+        if tokens:
+            await self.limiter.charge(self.user, tokens)
+
+    async def release(self) -> None:
+        lease_id, self._lease_id = self._lease_id, None
+        if lease_id is not None:
+            await self.limiter.release(self.user, lease_id)
+
+    async def guard(self, stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+        """
+        Yields the items of a pipeline stream with this lease current while each step runs, so the
+        prompts it sends are charged to the user, and releases the stream slot when it ends.
+
+        Args:
+            stream (AsyncGenerator[Any, None]): The pipeline stream.
+
+        Returns:
+            AsyncGenerator[Any, None]: A generator yielding the items of `stream`.
+        """
+        try:
+            while True:
+                # Only current while the stream runs, never while it is suspended
+                token = _CURRENT_LEASE.set(self)
+                try:
+                    item = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _CURRENT_LEASE.reset(token)
+                await self.flush()
+                yield item
+        finally:
+            # Shielded, so a cancelled stream still frees its slot
+            try:
+                await asyncio.shield(self.release())
+            finally:
+                await stream.aclose()
+                await asyncio.shield(self.flush())
+
+
+class RateLimiter:
+    """
+    Enforces per-user limits on requests (sliding window), LLM prompt tokens (token bucket
+    refilled over the cooldown) and concurrent streams (expiring leases). Calls to the SQLite
+    backend run in the default executor; backend errors are logged and let the request through.
+    """
+
+    def __init__(self, backend, requests: int, window: float, tokens: int, cooldown: float, streams: int,
+                 lease_seconds: float) -> None:
+        """
+        Args:
+            backend: The limit state backend.
+            requests (int): Requests per user per window. 0 disables the limit.
+            window (float): The request window in seconds.
+            tokens (int): LLM prompt tokens per user, refilled over the cooldown. 0 disables the limit.
+            cooldown (float): Seconds for an exhausted token budget to refill completely.
+            streams (int): Concurrent streams per user. 0 disables the limit.
+            lease_seconds (float): Seconds after which a stream slot is freed even if never released.
+        """
+        self.backend = backend
+        self.requests = requests
+        self.window = window
+        self.tokens = tokens
+        self.rate = tokens / cooldown if cooldown else float(tokens)
+        self.streams = streams
+        self.lease_seconds = lease_seconds
+        self._offload = isinstance(backend, SqliteRateLimitBackend)
+
+    async def _call(self, method, *args):
+        if self._offload:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def _reject(self, user: str, limit: str, detail: str, retry_after: float) -> RateLimited:
+        RATE_LIMITED.inc(limit=limit)
+        logger.warning(f"Rate limited user {user} ({limit}), retry after {retry_after:.0f}s.")
+        return RateLimited(limit, detail, retry_after)
+
+    async def admit(self, user: str, stream: bool = True) -> UserLease:
+        """
+        Counts a request of a user against their limits.
+
+        Args:
+            user (str): The user.
+            stream (bool): Whether the request holds a stream slot until its stream ends.
+
+        Returns:
+            UserLease: The lease to guard the request's pipeline stream with.
+
+        Raises:
+            RateLimited: If the user is over one of their limits.
+        """
+        now = time.time()
+        try:
+            if self.tokens:
+                allowed, retry_after = await self._call(self.backend.check_bucket, f"tokens:{user}", self.tokens, self.rate, now)
+                if not allowed:
+                    raise self._reject(user, "tokens", "LLM token limit reached. Please retry later.", retry_after)
+            if self.requests:
+                allowed, retry_after = await self._call(self.backend.hit_window, f"requests:{user}", self.requests, self.window, now)
+                if not allowed:
+                    raise self._reject(user, "requests", "Too many requests. Please retry later.", retry_after)
+            lease_id = None
+            if stream and self.streams:
+                lease_id = uuid.uuid4().hex
+                if not await self._call(self.backend.acquire_lease, user, lease_id, self.streams, now + self.lease_seconds, now):
+                    raise self._reject(user, "streams", "Too many concurrent streams. Please wait for one to finish.", self.window)
+        except sqlite3.Error as e:
+            logger.error(f"Rate limit check failed for user {user}, letting the request through: {e}")
+            lease_id = None
+        return UserLease(self, user, lease_id)
+
+    async def charge(self, user: str, tokens: int) -> None:
+        if not self.tokens:
+            return
+        try:
+            await self._call(self.backend.charge_bucket, f"tokens:{user}", tokens, self.tokens, self.rate, time.time())
+        except sqlite3.Error as e:
+            logger.error(f"Charging {tokens} tokens to user {user} failed: {e}")
+
+    async def release(self, user: str, lease_id: str) -> None:
+        try:
+            await self._call(self.backend.release_lease, user, lease_id)
+        except sqlite3.Error as e:
+            logger.error(f"Releasing a stream of user {user} failed, it expires on its own: {e}")
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+@contextmanager
+def charge_tokens_to(account: Any) -> Iterator[None]:
+    """
+    Charges the LLM prompt tokens of the calls made inside the block to `account` instead of a
+    user, e.g. the budget of the cache warmer. Any object with a `charge(tokens)` method will do.
+    """
+    token = _CURRENT_LEASE.set(account)
+    try:
+        yield
+    finally:
+        _CURRENT_LEASE.reset(token)
+
+
+def charge_llm_tokens(tokens: int) -> None:
+    """
+    Charges LLM prompt tokens to the user whose pipeline is running, if any.
+
+    Args:
+        tokens (int): The tokens of the prompt.
+    """
+    lease = _CURRENT_LEASE.get()
+    if lease is not None:
+        lease.charge(tokens)
+
+
+_LIMITER: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the process wide rate limiter, configured from the rate limit settings.
+
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    global _LIMITER
+    if _LIMITER is None:
+        from server.setting import SETTINGS
+
+        settings = SETTINGS.rate_limit
+        backend = None
+        if settings.backend == "sqlite":
+            backend = SqliteRateLimitBackend(settings.path)
+            try:
+                backend.open()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Cannot open the rate limit database {settings.path}, limiting per worker: {e}")
+                backend.close()
+                backend = None
+        elif settings.backend != "memory":
+            logger.warning(f"Unknown rate limit backend '{settings.backend}', limiting per worker.")
+        if backend is None:
+            backend = MemoryRateLimitBackend()
+        _LIMITER = RateLimiter(
+            backend, settings.requests, settings.window_seconds, settings.llm_tokens,
+            settings.cooldown_hours * 3600, settings.max_streams, settings.stream_lease_seconds,
+        )
+    return _LIMITER
+
+
+async def limit_user(user: str, stream: bool = True) -> Optional[UserLease]:
+    """
+    Counts a request against the user's limits, unless rate limiting is disabled.
+
+    Args:
+        user (str): The user, from the `user` header.
+        stream (bool): Whether the request holds a stream slot until its stream ends.
+
+    Returns:
+        Optional[UserLease]: The lease, or None when rate limiting is disabled.
+
+    Raises:
+        RateLimited: If the user is over one of their limits.
+    """
+    from server.setting import SETTINGS
+
+    if not SETTINGS.rate_limit.enabled:
+        return None
+    return await get_rate_limiter().admit(user, stream)
+
+
+def guard_user_stream(lease: Optional[UserLease], stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+    """
+    Ties a user's lease to a pipeline stream, see `UserLease.guard`.
+    """
+    return lease.guard(stream) if lease is not None else stream
+
+
+def charge_user_stream(user: str, stream: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+    """
+    Charges the LLM prompt tokens of a pipeline stream to a user without holding a stream slot,
+    e.g. for a queued job that was counted against the user's limits when it was submitted.
+    """
+    from server.setting import SETTINGS
+
+    if not SETTINGS.rate_limit.enabled:
+        return stream
+    return UserLease(get_rate_limiter(), user, None).guard(stream)
+
+
+def close_rate_limiter() -> None:
+    """
+    Closes the shared rate limiter, if it was opened.
+    """
+    global _LIMITER
+    if _LIMITER is not None:
+        _LIMITER.close()
+        _LIMITER = None
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Tuple
+
+
+class SqliteConnections:
+    """
+    Hands out one SQLite connection per thread and per process for a database file shared by
+    several worker processes. Connections are opened lazily, so the owner can be created before
+    the server forks, and WAL mode lets readers proceed while another process writes.
+    """
+
+    def __init__(self, path: str, schema: Iterable[str] = ()) -> None:
+        """
+        Args:
+            path (str): The database file.
+            schema (Iterable[str]): Statements run on every new connection, e.g. CREATE TABLE IF NOT EXISTS.
+        """
+        self.path = path
+        self.schema = tuple(schema)
+        self._local = threading.local()
+        # Every connection opened, with the process that opened it, so close() reaches all threads
+        self._opened: List[Tuple[int, sqlite3.Connection]] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, and each thread uses its own connection
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Not bound to the opening thread, so that close() can close it from any thread
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                for statement in self.schema:
+                    connection.execute(statement)
+            except sqlite3.Error:
+                connection.close()
+                raise
+            with self._lock:
+                self._opened.append((os.getpid(), connection))
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def close(self) -> None:
+        """
+        Closes the connections opened by every thread of this process. Connections inherited from
+        a parent process are left to it.
+        """
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for pid, connection in opened:
+            if pid == os.getpid():
+                connection.close()
+        self._local = threading.local()
@@ -0,0 +1,43 @@
+import re
+from typing import Dict, Optional
+
+
+_EVENT_PATTERN = re.compile(
+    r"<event_type>(?P<type>.*?)</event_type><event_data>(?P<data>.*?)</event_data><source>(?P<source>.*?)</source>",
+    re.DOTALL,
+)
+
+
+def format_sse(event_id: int, data: str, event: Optional[str] = None) -> str:
+    """
+    Formats one server-sent event. Multi-line data is split over several `data:` fields, which
+    the client joins back together with newlines.
+
+    Args:
+        event_id (int): The event id; clients send the last one back in `Last-Event-ID` to resume.
+        data (str): The event payload.
+        event (Optional[str]): The event name.
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    lines = [f"id: {event_id}"]
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_agent_event(event: str) -> Optional[Dict[str, str]]:
+    """
+    Splits an agent stream event of the form
+    `<event_type>..</event_type><event_data>..</event_data><source>..</source>` into its fields.
+
+    Args:
+        event (str): The raw event.
+
+    Returns:
+        Optional[Dict[str, str]]: The `type`, `data` and `source` fields, or None for other formats.
+    """
+    match = _EVENT_PATTERN.search(event)
+    return match.groupdict() if match else None
@@ -0,0 +1,297 @@
+import logging
+import math
+import re
+import string
+import threading
+from typing import Dict, Optional, Tuple
+
+from server.utils.metrics import REGISTRY
+from server.utils.rate_limit import charge_llm_tokens
+
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    "content_writer_prompt_tokens",
+    "Tokens of the prompts sent to the LLM (system prompt included), by agent, after fitting the budget.",
+    ["agent"],
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072),
+)
+PROMPT_TOKENS_SAVED = REGISTRY.counter(
+    "content_writer_prompt_tokens_saved_total",
+    "Prompt tokens removed to fit the budgets, by agent and step (compress or truncate).",
+    ["agent", "step"],
+)
+PROMPTS_OVER_BUDGET = REGISTRY.counter(
+    "content_writer_prompts_over_budget_total",
+    "Prompts whose content did not fit the budget, by agent and what was done (truncated or sent as is).",
+    ["agent", "action"],
+)
+
+# Tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Characters per token of typical English text, for estimates
+_CHARS_PER_TOKEN = 4
+# Characters per token are rarely above this, so text longer than this many characters per token
+# of budget is over budget for sure and can be cut before it is tokenized
+_MAX_CHARS_PER_TOKEN = 8
+
+# Runs of spaces inside a line; leading indentation is kept for nested lists and code
+_SPACES = re.compile(r"(?<=\S)[ \t\f\v\u00a0]{2,}")
+_BLANK_LINES = re.compile(r"\n\s*\n(\s*\n)+")
+# Lines that are nothing but a link, e.g. navigation menus, footers and "related articles" lists
+_LINK_LINE = re.compile(
+    r"^\s*(?:[-*+]|\d+[.)])?\s*(?:\[[^\]]*\]\([^)]*\)|<a\b[^>]*>.*?</a>|https?://\S+)\s*[|,]?\s*$",
+    re.IGNORECASE,
+)
+_MIN_LINK_LIST = 3
+# Shorter lines may legitimately repeat, e.g. closing braces in code or list bullets
+_MIN_REPEATED_LINE = 24
+
+
+class Tokenizer:
+    """
+    Counts tokens with the model's tiktoken encoding. The encoding is loaded in the background on
+    first use (tiktoken may have to download it), and until it is available, or when it cannot be
+    loaded offline, counts are estimated from the length of the text.
+    """
+
+    def __init__(self, encoding_name: str) -> None:
+        """
+        Args:
+            encoding_name (str): The tiktoken encoding, e.g. 'cl100k_base'.
+        """
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._load_started = False
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def load(self) -> bool:
+        """
+        Loads the encoding in the calling thread.
+
+        Returns:
+            bool: Whether exact counting is available.
+        """
+        if self._encoding is None:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logger.warning(f"Tokenizer {self.encoding_name} unavailable, estimating token counts: {e}")
+        return self.exact
+
+    def _start_loading(self) -> None:
+        with self._lock:
+            if self._load_started:
+                return
+            self._load_started = True
+        threading.Thread(target=self.load, name="tokenizer-load", daemon=True).start()
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is None:
+            self._start_loading()
+            return math.ceil(len(text) / _CHARS_PER_TOKEN)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cuts text to at most `max_tokens` tokens, preferably at the end of a line.
+
+        Args:
+            text (str): The text.
+            max_tokens (int): The tokens to keep.
+
+        Returns:
+            str: The beginning of the text.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            cut = text[:max_tokens * _CHARS_PER_TOKEN]
+        else:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            cut = self._encoding.decode(tokens[:max_tokens])
+        if len(cut) >= len(text):
+            return text
+        line_end = cut.rfind("\n")
+        return cut[:line_end] if line_end > len(cut) * 0.8 else cut
+
+
+def compress(text: str) -> str:
+    """
+    Removes what costs tokens without carrying content: runs of whitespace, blank lines, lines
+    repeated verbatim (footers, cookie banners, share prompts) and lists of links (menus).
+
+    Args:
+        text (str): Page content, as HTML or markdown.
+
+    Returns:
+        str: The compressed text.
+    """
+    lines = [_SPACES.sub(" ", line).rstrip() for line in text.splitlines()]
+
+    kept, seen, links = [], set(), []
+    for line in lines:
+        if line.strip() and _LINK_LINE.match(line):
+            links.append(line)
+            continue
+        # A short run of links is kept, e.g. a source list; longer ones are navigation
+        if 0 < len(links) < _MIN_LINK_LIST:
+            kept.extend(links)
+        links = []
+        if len(line.strip()) >= _MIN_REPEATED_LINE:
+            if line.strip() in seen:
+                continue
+            seen.add(line.strip())
+        kept.append(line)
+    if 0 < len(links) < _MIN_LINK_LIST:
+        kept.extend(links)
+    return _BLANK_LINES.sub("\n\n", "\n".join(kept)).strip("\n")
+
+
+_TOKENIZER: Optional[Tokenizer] = None
+
+
+def get_tokenizer() -> Tokenizer:
+    """
+    Returns the process wide tokenizer, using the encoding from the token budget settings.
+
+    Returns:
+        Tokenizer: The shared tokenizer.
+    """
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        from server.setting import SETTINGS
+
+        _TOKENIZER = Tokenizer(SETTINGS.token_budget.encoding)
+    return _TOKENIZER
+
+
+class PromptBudget:
+    """
+    Fits the prompts of an agent into a token budget. The tokens of the system prompt and of the
+    template are counted once, when the exact tokenizer is available; each prompt then only
+    measures its variable fields. The content field is compressed and, if it still does not fit,
+    truncated, unless the budget is lossless. Agents share one budget per template, see
+    `get_prompt_budget`.
+    """
+
+    def __init__(self, agent: str, template: str, max_tokens: int, system_prompt: str = "",
+                 lossless: bool = False) -> None:
+        """
+        Args:
+            agent (str): Name of the agent in metrics.
+            template (str): The prompt template, filled with `str.format`.
+            max_tokens (int): Tokens the system prompt and the filled template may use together.
+                0 disables the budget.
+            system_prompt (str): The system message sent along with every prompt.
+            lossless (bool): Only measure prompts; content is never compressed or truncated,
+                e.g. for a post the user is editing.
+        """
+        self.agent = agent
+        self.template = template
+        self.max_tokens = max_tokens
+        self.lossless = lossless
+        self.system_prompt = system_prompt
+        fields = {name: "" for _, name, _, _ in string.Formatter().parse(template) if name}
+        self._blank_template = template.format(**fields)
+        self._fixed_tokens: Optional[int] = None
+
+    @property
+    def fixed_tokens(self) -> int:
+        """
+        Tokens of the system prompt, the template without its fields and the message framing.
+        Estimates made while the encoding loads are not kept.
+        """
+        if self._fixed_tokens is not None:
+            return self._fixed_tokens
+        tokenizer = get_tokenizer()
+        exact = tokenizer.exact
+        tokens = tokenizer.count(self.system_prompt) + tokenizer.count(self._blank_template) + 2 * MESSAGE_OVERHEAD_TOKENS
+        if exact:
+            self._fixed_tokens = tokens
+        return tokens
+
+    def fit(self, field: str, content: str, **fields: str) -> str:
+        """
+        Fills the template, fitting `content` into the tokens left by everything else.
+
+        Args:
+            field (str): The template field holding the content, e.g. 'data'.
+            content (str): The content, e.g. a page or a post.
+            **fields (str): The other template fields.
+
+        Returns:
+            str: The prompt.
+        """
+        from server.setting import SETTINGS
+
+        tokenizer = get_tokenizer()
+        settings = SETTINGS.token_budget
+        content = content or ""
+        used = self.fixed_tokens + sum(tokenizer.count(str(value)) for value in fields.values())
+        available = self.max_tokens - used
+
+        if settings.enabled and self.max_tokens and not self.lossless:
+            if settings.compress:
+                compressed = compress(content)
+                # Estimated from the characters removed, so the raw page is never tokenized
+                saved = math.ceil((len(content) - len(compressed)) / _CHARS_PER_TOKEN)
+                if saved > 0:
+                    PROMPT_TOKENS_SAVED.inc(saved, agent=self.agent, step="compress")
+                content = compressed
+            # Cut before anything is counted, so only text that can be sent is tokenized
+            if len(content) > max(available, 0) * _MAX_CHARS_PER_TOKEN:
+                content = content[:max(available, 0) * _MAX_CHARS_PER_TOKEN]
+
+        tokens = tokenizer.count(content)
+        if settings.enabled and self.max_tokens and tokens > available:
+            if self.lossless:
+                PROMPTS_OVER_BUDGET.inc(agent=self.agent, action="sent")
+                logger.warning(f"{self.agent} prompt of {used + tokens} tokens exceeds its budget of {self.max_tokens}.")
+            else:
+                content = tokenizer.truncate(content, available)
+                truncated_tokens = tokenizer.count(content)
+                PROMPTS_OVER_BUDGET.inc(agent=self.agent, action="truncated")
+                PROMPT_TOKENS_SAVED.inc(max(tokens - truncated_tokens, 0), agent=self.agent, step="truncate")
+                tokens = truncated_tokens
+
+        PROMPT_TOKENS.observe(used + tokens, agent=self.agent)
+        charge_llm_tokens(used + tokens)
+        return self.template.format(**{field: content, **fields})
+
+
+_PROMPT_BUDGETS: Dict[Tuple[str, str, int, str, bool], PromptBudget] = {}
+
+
+def get_prompt_budget(agent: str, template: str, max_tokens: int, system_prompt: str = "",
+                      lossless: bool = False) -> PromptBudget:
+    """
+    Returns the process wide budget of a prompt template. Agents are created per request, so
+    sharing the budget counts the system prompt and the template once per process.
+
+    Args:
+        agent (str): Name of the agent in metrics.
+        template (str): The prompt template.
+        max_tokens (int): Tokens the system prompt and the filled template may use together.
+        system_prompt (str): The system message sent along with every prompt.
+        lossless (bool): Only measure prompts, see `PromptBudget`.
+
+    Returns:
+        PromptBudget: The shared budget.
+    """
+    key = (agent, template, max_tokens, system_prompt, lossless)
+    budget = _PROMPT_BUDGETS.get(key)
+    if budget is None:
+        budget = _PROMPT_BUDGETS.setdefault(key, PromptBudget(agent, template, max_tokens, system_prompt, lossless))
+    return budget
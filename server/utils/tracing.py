@@ -0,0 +1,435 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Callable, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# The span that is active in the current task/thread. asyncio tasks inherit a copy of the
+# context at creation time, so spans opened before `asyncio.gather` become the parents of
+# spans opened inside the gathered coroutines.
+_CURRENT_SPAN: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(num_bytes: int) -> str:
+    return os.urandom(num_bytes).hex()
+
+
+class Span:
+    """
+    A timed operation within a trace. Spans are exported as OpenTelemetry (OTLP/JSON) shaped
+    records so they can be loaded into any OTel compatible viewer.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns",
+                 "attributes", "status", "events", "thread")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "UNSET"
+        self.events: List[Dict[str, Any]] = []
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.add_event("exception", **{"exception.type": type(error).__name__, "exception.message": str(error)})
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": {**self.attributes, "thread.name": self.thread},
+            "status": {"code": self.status},
+            "events": self.events,
+        }
+
+
+class _NoopSpan:
+    """
+    Stand-in returned when tracing is disabled so call sites never need to check.
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class ConsoleSpanExporter:
+    """
+    Writes each finished span as one JSON line to stderr.
+    """
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class FileSpanExporter:
+    """
+    Appends each finished span as one JSON line to a local file, usable fully offline. Spans are
+    queued and written in batches by a background thread, so exporting never blocks the event loop
+    on file I/O.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write, name="span-exporter", daemon=True)
+        self._writer.start()
+
+    def export(self, span: Span) -> None:
+        if not self._closed:
+            self._queue.put(span.to_dict())
+
+    def _write(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = [json.dumps(item, default=str) + "\n" for item in batch if isinstance(item, dict)]
+                try:
+                    trace_file.writelines(lines)
+                    trace_file.flush()
+                except OSError as e:
+                    logger.warning(f"Failed to write {len(lines)} spans to {self.path}: {e}")
+                # Flush requests are events, set once everything queued before them is written
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if any(item is self._STOP for item in batch):
+                    return
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the spans exported so far are written.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most.
+
+        Returns:
+            bool: Whether everything was written in time.
+        """
+        if not self._writer.is_alive():
+            return True
+        written = threading.Event()
+        self._queue.put(written)
+        return written.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Writes the queued spans and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._writer.join(timeout)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished spans to the configured exporter.
+    """
+
+    def __init__(self, exporter=None, service_name: str = "content-writer") -> None:
+        self.exporter = exporter
+        self.service_name = service_name
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def close(self) -> None:
+        close = getattr(self.exporter, "close", None)
+        if close is not None:
+            close()
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+    @contextmanager
+    def start_span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        span = Span(name, parent=_CURRENT_SPAN.get(), attributes={"service.name": self.service_name, **attributes})
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            self._finish(span)
+
+    async def trace_generator(self, name: str, generator: AsyncGenerator[Any, None],
+                              **attributes: Any) -> AsyncGenerator[Any, None]:
+        if not self.enabled:
+            async for item in generator:
+                yield item
+            return
+
+        span = Span(name, parent=_CURRENT_SPAN.get(), attributes={"service.name": self.service_name, **attributes})
+        try:
+            while True:
+                # The span is only active while the generator runs, never while it is suspended
+                token = _CURRENT_SPAN.set(span)
+                try:
+                    item = await generator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _CURRENT_SPAN.reset(token)
+                yield item
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            await generator.aclose()
+            self._finish(span)
+
+
+_TRACER: Optional[Tracer] = None
+_TRACER_LOCK = threading.Lock()
+
+
+def _build_tracer() -> Tracer:
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.tracing
+    if not settings.enabled:
+        return Tracer(exporter=None)
+    if settings.exporter == "file":
+        exporter = FileSpanExporter(settings.file_path)
+    else:
+        exporter = ConsoleSpanExporter()
+    return Tracer(exporter=exporter, service_name=settings.service_name)
+
+
+def get_tracer() -> Tracer:
+    """
+    Returns the process wide tracer, configured from the tracing settings on first use.
+
+    Returns:
+        Tracer: The shared tracer.
+    """
+    global _TRACER
+    if _TRACER is None:
+        with _TRACER_LOCK:
+            if _TRACER is None:
+                _TRACER = _build_tracer()
+    return _TRACER
+
+
+def set_tracer(tracer: Tracer) -> None:
+    """
+    Replaces the process wide tracer, e.g. to export to a different destination.
+
+    Args:
+        tracer (Tracer): The tracer to use from now on.
+    """
+    global _TRACER
+    _TRACER = tracer
+
+
+def close_tracer() -> None:
+    """
+    Writes the spans still buffered by the process wide tracer and stops its exporter.
+    """
+    global _TRACER
+    with _TRACER_LOCK:
+        tracer, _TRACER = _TRACER, None
+    if tracer is not None:
+        tracer.close()
+
+
+def start_span(name: str, **attributes: Any):
+    """
+    Opens a span as a child of the currently active span.
+
+    Args:
+        name (str): The span name, e.g. "http.get" or "WebContentSummaryAgent.run".
+        **attributes: Attributes attached to the span.
+
+    Returns:
+        ContextManager: A context manager yielding the span.
+    """
+    return get_tracer().start_span(name, **attributes)
+
+
+def trace_generator(name: str, generator: AsyncGenerator[Any, None], **attributes: Any) -> AsyncGenerator[Any, None]:
+    """
+    Wraps an async generator in a span covering all of its steps. Unlike a `start_span` block
+    around `yield`, the span is only the current span while the generator runs, so it does not
+    leak into the consumer between items.
+
+    Args:
+        name (str): The span name, e.g. "ContentCreationSystemAgent.run".
+        generator (AsyncGenerator[Any, None]): The generator to trace.
+        **attributes: Attributes attached to the span.
+
+    Returns:
+        AsyncGenerator[Any, None]: A generator yielding the items of `generator`.
+    """
+    return get_tracer().trace_generator(name, generator, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    """
+    Returns the active span, if any.
+    """
+    return _CURRENT_SPAN.get()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator that wraps a coroutine function in a span named after it.
+
+    Args:
+        name (Optional[str]): The span name. Defaults to the function's qualified name.
+
+    Returns:
+        Callable: The decorated coroutine function.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """
+    Loads spans written by the file exporter.
+
+    Args:
+        path (str): The path of the span file.
+
+    Returns:
+        List[Dict[str, Any]]: The exported span records.
+    """
+    with open(path, encoding="utf-8") as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def render_waterfall(spans: List[Dict[str, Any]], width: int = 60) -> str:
+    """
+    Renders the spans of a single trace as a text waterfall, children indented below parents.
+
+    Args:
+        spans (List[Dict[str, Any]]): Span records belonging to one trace.
+        width (int): Width of the timeline bar in characters.
+
+    Returns:
+        str: The waterfall diagram.
+    """
+    if not spans:
+        return ""
+
+    start = min(span["startTimeUnixNano"] for span in spans)
+    end = max(span["endTimeUnixNano"] or span["startTimeUnixNano"] for span in spans)
+    total = max(end - start, 1)
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    for span in sorted(spans, key=lambda s: s["startTimeUnixNano"]):
+        children.setdefault(span["parentSpanId"], []).append(span)
+
+    span_ids = {span["spanId"] for span in spans}
+    roots = [span for span in spans if span["parentSpanId"] not in span_ids]
+    lines = []
+
+    def render(span: Dict[str, Any], depth: int) -> None:
+        offset = int((span["startTimeUnixNano"] - start) / total * width)
+        span_end = span["endTimeUnixNano"] or span["startTimeUnixNano"]
+        length = max(int((span_end - span["startTimeUnixNano"]) / total * width), 1)
+        bar = " " * offset + "#" * length
+        duration_ms = (span_end - span["startTimeUnixNano"]) / 1e6
+        label = ("  " * depth + span["name"])[:40]
+        lines.append(f"{label:<40} |{bar:<{width}}| {duration_ms:9.1f} ms")
+        for child in children.get(span["spanId"], []):
+            render(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s["startTimeUnixNano"]):
+        render(root, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.utils.tracing traces.jsonl [trace_id | req_id]
+    records = load_spans(sys.argv[1])
+    selector = sys.argv[2] if len(sys.argv) > 2 else None
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        traces.setdefault(record["traceId"], []).append(record)
+    for trace_id, trace_spans in traces.items():
+        req_ids = {span["attributes"].get("req_id") for span in trace_spans}
+        if selector and selector != trace_id and selector not in req_ids:
+            continue
+        print(f"trace {trace_id} req_id={','.join(sorted(r for r in req_ids if r))}")
+        print(render_waterfall(trace_spans))
+        print()
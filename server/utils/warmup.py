@@ -0,0 +1,250 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from server.utils.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STEP_SECONDS = REGISTRY.gauge(
+    "content_writer_warmup_step_seconds",
+    "Seconds each warmup step took in this worker process (preimport, agents, connections, tokenizer, llm).",
+    ["step"],
+)
+READY = REGISTRY.gauge(
+    "content_writer_ready",
+    "1 once this worker process finished its warmup, as reported by /api/ready.",
+)
+
+# Modules that are imported on first use rather than when `server` is imported. Importing the
+# system agents pulls in autogen (and with it openai, flaml and numpy), httpx and the workflow agents.
+HEAVY_MODULES = (
+    "autogen",
+    "httpx",
+    "bs4",
+    "server.agents.system_agents.content_creator.agent",
+    "server.agents.system_agents.content_editor.agent",
+)
+
+
+def heavy_modules() -> Iterable[str]:
+    """
+    Returns the modules to pre-import, including the configured HTML parser backend's package.
+
+    Returns:
+        Iterable[str]: Module names in import order.
+    """
+    from server.setting import SETTINGS
+    from server.agents.workflow_agents.web_extraction.parsers import get_backend
+
+    modules = list(HEAVY_MODULES)
+    backend = get_backend(SETTINGS.web_extraction.parser_backend)
+    if backend.requires and backend.requires not in modules:
+        modules.append(backend.requires)
+    return modules
+
+
+def preimport(modules: Iterable[str] = None) -> Dict[str, float]:
+    """
+    Imports the heavy modules ahead of the first request. Modules that are already imported cost
+    nothing, so this is safe to run while requests are being served; a request that needs a
+    module still being imported waits on the import lock.
+
+    Args:
+        modules (Iterable[str]): The modules to import. Defaults to `heavy_modules()`.
+
+    Returns:
+        Dict[str, float]: Seconds spent importing each module.
+    """
+    timings = {}
+    for module in modules if modules is not None else heavy_modules():
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Warmup could not import {module}: {e}")
+            continue
+        timings[module] = time.perf_counter() - start
+
+    logger.info(f"Pre-imported {len(timings)} modules in {sum(timings.values()):.2f}s.")
+    return timings
+
+
+_BACKGROUND_PREIMPORT: Optional[asyncio.Future] = None
+
+
+def start_background_preimport() -> asyncio.Future:
+    """
+    Runs `preimport` in a worker thread. Must be called from the event loop.
+
+    Returns:
+        asyncio.Future: Completes when the modules are imported.
+    """
+    global _BACKGROUND_PREIMPORT
+    _BACKGROUND_PREIMPORT = asyncio.ensure_future(asyncio.to_thread(preimport))
+    return _BACKGROUND_PREIMPORT
+
+
+async def wait_for_preimport() -> None:
+    """
+    Waits for a background pre-import that is still running. Code that lazily imports the heavy
+    modules calls this first: importing the same packages from two threads at once can hand one
+    of them a partially initialised module.
+    """
+    if _BACKGROUND_PREIMPORT is not None and not _BACKGROUND_PREIMPORT.done():
+        await asyncio.shield(_BACKGROUND_PREIMPORT)
+
+
+def _construct_agents() -> None:
+    # Building the agents sets up their autogen and OpenAI clients, which the first request would pay for
+    from server.agents.system_agents.content_creator.agent import ContentCreationSystemAgent
+    from server.agents.workflow_agents.content_editor.agent import ContentEditorAgent
+
+    ContentCreationSystemAgent(req_id="warmup", user="warmup")
+    ContentEditorAgent()
+
+
+async def _open_connections() -> None:
+    from server.setting import SETTINGS
+    from server.utils.cache import get_cache
+    from server.utils.local_index import get_local_index
+    from server.agents.system_agents.content_editor.versions import get_version_store
+
+    # The stores open their databases lazily; touch each from the threads requests use
+    await get_cache().delete("WARMUP", "warmup")
+    await get_local_index().search("warmup", None, 1, 0)
+    await get_version_store().owner("warmup")
+    if SETTINGS.streams.resumable:
+        from server.jobs import get_stream_manager
+
+        await get_stream_manager().get("warmup")
+    if SETTINGS.rate_limit.enabled:
+        from server.utils.rate_limit import get_rate_limiter
+
+        get_rate_limiter()
+
+    # Open a pooled connection to Bing and to the LLM deployment, so the first search and LLM call
+    # do not pay for the DNS lookup and the TCP and TLS handshakes. Any response will do.
+    from server.utils.http import get_http_client
+
+    requests = [get_http_client().head(SETTINGS.azure.bing.endpoint)]
+    if SETTINGS.llm_client.enabled:
+        from server.utils.llm import get_llm_client
+
+        llm_client = get_llm_client()
+        requests.append(llm_client.http.head(llm_client.url, params=llm_client.query))
+    errors = [result for result in await asyncio.gather(*requests, return_exceptions=True)
+              if isinstance(result, BaseException)]
+    if errors:
+        raise errors[0]
+
+
+def _load_tokenizer() -> None:
+    from server.utils.tokens import get_tokenizer
+
+    get_tokenizer().load()
+
+
+async def _call_llm() -> None:
+    from server.setting import SETTINGS
+
+    if SETTINGS.llm_client.enabled:
+        from server.utils.llm import get_llm_client
+
+        # Through the pooled client the extraction and summary agents use
+        await get_llm_client().complete([{"content": "ping", "role": "user"}], agent="warmup", cache=False, max_tokens=1)
+        return
+
+    from autogen import AssistantAgent
+
+    # Not cached, so the call really reaches the deployment and opens its connection
+    agent = AssistantAgent(name="Warmup", llm_config={**SETTINGS.llm_config_list[0], "cache_seed": None, "max_tokens": 1})
+    await agent.a_generate_reply(messages=[{"content": "ping", "role": "user"}])
+
+
+def warmup_steps() -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    """
+    Returns the configured warmup steps in the order they run.
+
+    Returns:
+        List[Tuple[str, Callable[[], Awaitable[Any]]]]: The name of each step and a function running it.
+    """
+    from server.setting import SETTINGS
+
+    settings = SETTINGS.warmup
+    steps = []
+    if settings.preimport:
+        steps.append(("preimport", lambda: asyncio.shield(start_background_preimport())))
+        steps.append(("agents", lambda: asyncio.to_thread(_construct_agents)))
+    steps.append(("connections", _open_connections))
+    steps.append(("tokenizer", lambda: asyncio.to_thread(_load_tokenizer)))
+    if settings.llm_call:
+        steps.append(("llm", _call_llm))
+    return steps
+
+
+_READY = False
+_REPORT: Dict[str, Dict[str, Any]] = {}
+_WARMUP: Optional[asyncio.Future] = None
+
+
+async def warmup() -> Dict[str, Dict[str, Any]]:
+    """
+    Runs the warmup steps one after the other and marks the worker ready. A step that fails or
+    times out is logged and skipped: the worker still serves requests, which then pay for it.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The status ('ok', 'failed' or 'timeout') and seconds of each step.
+    """
+    global _READY
+    from server.setting import SETTINGS
+
+    timeout = SETTINGS.warmup.step_timeout_seconds or None
+    for name, step in warmup_steps():
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(step(), timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            logger.warning(f"Warmup step {name} timed out after {timeout:.0f}s.")
+            status = "timeout"
+        except Exception as e:
+            logger.warning(f"Warmup step {name} failed: {e}")
+            status = "failed"
+        seconds = time.perf_counter() - start
+        _REPORT[name] = {"status": status, "seconds": round(seconds, 3)}
+        WARMUP_STEP_SECONDS.set(seconds, step=name)
+
+    _READY = True
+    READY.set(1)
+    logger.info("Warmup finished: " + ", ".join(f"{name} {step['seconds']:.2f}s" for name, step in _REPORT.items()) + ".")
+    return dict(_REPORT)
+
+
+def start_warmup() -> asyncio.Future:
+    """
+    Runs `warmup` in the background. Must be called from the event loop.
+
+    Returns:
+        asyncio.Future: Completes when the worker is ready.
+    """
+    global _WARMUP
+    _WARMUP = asyncio.ensure_future(warmup())
+    return _WARMUP
+
+
+def is_ready() -> bool:
+    """
+    Returns whether the warmup finished, so load balancers can send this worker traffic.
+    """
+    return _READY
+
+
+def warmup_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the status and seconds of the warmup steps run so far.
+    """
+    return dict(_REPORT)
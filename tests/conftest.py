@@ -0,0 +1,19 @@
+import os
+
+# Settings are read from the environment; the tests never reach Azure, Bing or the web
+for key, value in {
+    "AZURE_OPENAI_DEPLOYMENT_NAME_GPT4": "test-gpt",
+    "AZURE_OPENAI_API_KEY": "test-key",
+    "AZURE_OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OPENAI_API_VERSION": "2024-02-01",
+    "AZURE_BING_SEARCH_END_POINT": "http://127.0.0.1:9/v7.0/search",
+    "AZURE_BING_SEARCH_SUBSCRIPTION_KEY": "test-key",
+    "CACHE_BACKEND": "memory",
+    "JOBS_STORE": "memory",
+    "STREAM_STORE": "memory",
+    "EDIT_SESSION_STORE": "memory",
+    "LOCAL_INDEX_STORE": "memory",
+    "RATE_LIMIT_BACKEND": "memory",
+    "CACHE_WARMING_STORE": "memory",
+}.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,95 @@
+import asyncio
+import gc
+
+import pytest
+
+from server.utils import admission
+from server.utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_pipelines_beyond_the_limit_wait_their_turn():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+        first = await controller.admit("test")
+        order = []
+
+        async def queued(name):
+            ticket = await controller.admit("test")
+            order.append(name)
+            return ticket
+
+        waiting = [asyncio.create_task(queued(name)) for name in ("second", "third")]
+        await asyncio.sleep(0.01)
+        assert controller.in_flight == 1 and order == []
+
+        first.release()
+        second = await waiting[0]
+        # Released twice, counted once
+        first.release()
+        assert order == ["second"] and controller.in_flight == 1
+
+        second.release()
+        (await waiting[1]).release()
+        assert order == ["second", "third"] and controller.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_full_queue_is_rejected_with_429_and_timeouts_with_503():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05, retry_after=4)
+        ticket = await controller.admit("test")
+        waiting = asyncio.create_task(controller.admit("test"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.admit("test")
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiting
+        ticket.release()
+        return full.value, timed_out.value, controller.in_flight
+
+    full, timed_out, in_flight = asyncio.run(main())
+    assert full.status_code == 429 and full.headers == {"Retry-After": "8"}
+    assert timed_out.status_code == 503
+    assert in_flight == 0
+
+
+def test_no_pipeline_starts_while_memory_is_exhausted(monkeypatch):
+    memory = {"rss": 2000}
+    monkeypatch.setattr(admission, "resident_memory", lambda: memory["rss"])
+
+    async def main():
+        controller = AdmissionController(max_in_flight=4, max_queue=4, queue_timeout=0.05, max_memory_bytes=1000)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit("test")
+        memory["rss"] = 500
+        (await controller.admit("test")).release()
+        return rejected.value
+
+    assert asyncio.run(main()).status_code == 503
+
+
+def test_guarded_stream_releases_its_slot():
+    async def stream():
+        yield 1
+        yield 2
+
+    async def main():
+        controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1)
+        assert [item async for item in (await controller.admit("test")).guard(stream())] == [1, 2]
+
+        # Closed early by a disconnecting client
+        guarded = (await controller.admit("test")).guard(stream())
+        assert await guarded.__anext__() == 1
+        await guarded.aclose()
+        assert controller.in_flight == 0
+
+        # Never started, e.g. the response was not sent
+        guarded = (await controller.admit("test")).guard(stream())
+        assert controller.in_flight == 1
+        del guarded
+        gc.collect()
+        return controller.in_flight
+
+    assert asyncio.run(main()) == 0
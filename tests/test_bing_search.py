@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+from server.agents.workflow_agents.azure_bing_search.types import BingSearchResponse, WebHits
+from server.utils import http
+
+RESPONSE = {
+    "_type": "SearchResponse",
+    "webPages": {"value": [
+        {
+            "name": f"Result {i}", "url": f"https://example.com/{i}", "snippet": f"snippet {i}",
+            "displayUrl": f"example.com/{i}", "language": "en", "isFamilyFriendly": True,
+            "deepLinks": [{"name": "more", "url": f"https://example.com/{i}#more"}],
+        }
+        for i in range(3)
+    ]},
+    "relatedSearches": {"value": [{"text": "related", "url": "https://www.bing.com/search?q=related"}]},
+    "images": {"value": [{"name": "image", "contentUrl": "https://example.com/a.jpg", "thumbnailUrl": "t"}]},
+}
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, content=json.dumps(RESPONSE).encode())
+
+    monkeypatch.setattr(http, "_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return seen
+
+
+def test_lean_records_build_the_same_full_models():
+    agent = AzureBingSearchAgent()
+    hits = agent.process_lean_results(RESPONSE)
+    assert [(hit.title, hit.url, hit.snippet) for hit in hits.web_results] == [
+        (f"Result {i}", f"https://example.com/{i}", f"snippet {i}") for i in range(3)
+    ]
+    assert "deepLinks" not in hits.web_results[0].raw
+    assert not hasattr(hits.web_results[0], "__dict__")
+
+    full = agent.process_search_results(RESPONSE)
+    assert hits.full().web_results == full.web_results
+
+
+def test_lean_search_requests_web_pages_only_and_caches_records(requests):
+    agent = AzureBingSearchAgent()
+    agent.lean = True
+
+    first = asyncio.run(agent._bing_search("lean topic", "example.com"))
+    assert isinstance(first, WebHits)
+    assert requests[0].url.params["responseFilter"] == "Webpages"
+
+    cached = asyncio.run(agent._bing_search("lean topic", "example.com"))
+    assert len(requests) == 1
+    assert cached == first
+
+
+def test_full_search_keeps_every_answer(requests):
+    agent = AzureBingSearchAgent()
+    agent.lean = False
+
+    response = asyncio.run(agent._bing_search("full topic", "example.com"))
+    assert isinstance(response, BingSearchResponse)
+    assert "responseFilter" not in requests[0].url.params
+    assert len(response.images) == 1 and len(response.related_searches) == 1
@@ -0,0 +1,56 @@
+import asyncio
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from server.setting import SETTINGS
+from server.utils import cache
+from server.utils.sqlite import SqliteConnections
+
+
+@pytest.fixture
+def cache_settings(monkeypatch):
+    def configure(backend, path):
+        monkeypatch.setattr(SETTINGS, "cache", SimpleNamespace(backend=backend, path=path, ttl_seconds=60.0, max_entries=10))
+        cache.close_cache()
+
+    yield configure
+    cache.close_cache()
+
+
+def test_sqlite_cache_round_trip(cache_settings, tmp_path):
+    cache_settings("sqlite", str(tmp_path / "cache.sqlite3"))
+
+    async def main():
+        await cache.get_cache().set(cache.SEARCH, "query", {"results": [1, 2]})
+        return await cache.get_cache().get(cache.SEARCH, "query"), await cache.get_cache().get(cache.SEARCH, "other")
+
+    assert isinstance(cache.get_cache().backend, cache.SqliteCacheBackend)
+    assert asyncio.run(main()) == ({"results": [1, 2]}, None)
+
+
+def test_cache_falls_back_to_memory_when_the_database_cannot_be_opened(cache_settings, tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    cache_settings("sqlite", str(blocker / "cache.sqlite3"))
+
+    assert isinstance(cache.get_cache().backend, cache.MemoryCacheBackend)
+
+
+def test_close_closes_the_connections_of_every_thread(tmp_path):
+    connections = SqliteConnections(str(tmp_path / "db.sqlite3"), ["CREATE TABLE IF NOT EXISTS t (x)"])
+    opened = [connections.get()]
+    thread = threading.Thread(target=lambda: opened.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert opened[0] is not opened[1]
+
+    connections.close()
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    # A new connection is opened on the next use
+    assert connections.get().execute("SELECT count(*) FROM t").fetchone() == (0,)
+    connections.close()
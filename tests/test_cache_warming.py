@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from server.agents.workflow_agents.azure_bing_search.types import WebHit, WebHits
+from server.utils import cache
+from server.utils.cache import EXTRACTED, SEARCH, SUMMARY, get_cache
+from server.utils.cache_warming import (
+    CacheWarmer,
+    MemoryPopularity,
+    Popularity,
+    SqlitePopularity,
+    popularity_key,
+)
+from server.utils.rate_limit import charge_llm_tokens
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def popularity(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryPopularity()
+    else:
+        backend = SqlitePopularity(str(tmp_path / "popularity.sqlite3"))
+    yield Popularity(backend)
+    backend.close()
+
+
+@pytest.fixture
+def shared_cache():
+    cache.close_cache()
+    yield get_cache()
+    cache.close_cache()
+
+
+def test_requests_for_the_same_topic_and_sources_count_together():
+    assert popularity_key(" AI  Agents", ["b.com", "A.com", "a.com"]) == popularity_key("ai agents", ["a.com", "b.com"])
+
+
+def test_most_requested_topics_come_first_and_decay(popularity):
+    async def main():
+        for _ in range(3):
+            await popularity.record("AI agents", ["a.com"])
+        await popularity.record("Credit unions", ["b.com", "c.com"])
+        top = await popularity.top(10, max_age=60)
+        await popularity.decay(0.5, max_age=60)
+        return top, await popularity.top(1, max_age=60)
+
+    top, decayed = asyncio.run(main())
+    assert [(entry.topic, entry.sources, entry.hits) for entry in top] == [
+        ("AI agents", ["a.com"], 3), ("Credit unions", ["b.com", "c.com"], 1),
+    ]
+    assert [(entry.topic, entry.hits) for entry in decayed] == [("AI agents", 1.5)]
+
+
+def test_one_worker_claims_each_run(popularity):
+    async def main():
+        return [await popularity.claim_run("cache_warming", 60), await popularity.claim_run("cache_warming", 60),
+                await popularity.claim_run("cache_warming", 0)]
+
+    assert asyncio.run(main()) == [True, False, True]
+
+
+class FakeSearch:
+    lean = True
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.searches = []
+
+    def search_cache_key(self, topic, source):
+        return f"{topic}:{source}"
+
+    def select_results(self, topic, web_results):
+        return web_results
+
+    async def _bing_search(self, topic, source, refresh=False):
+        self.searches.append((topic, source, refresh))
+        return WebHits(web_results=[WebHit(title=url, url=url, snippet="", raw={}) for url in self.urls[source]])
+
+
+class FakeStages:
+    def __init__(self):
+        self.summarized = []
+
+    async def fetch(self, page):
+        page.summary = await get_cache().get(SUMMARY, page.url)
+        page.markdown = "# Page"
+        return page
+
+    async def parse(self, page):
+        return page
+
+    async def convert(self, page):
+        charge_llm_tokens(60)
+        return page
+
+    async def summarize(self, page):
+        charge_llm_tokens(40)
+        self.summarized.append(page.url)
+        page.summary = f"Summary of {page.url}"
+        await get_cache().set(SUMMARY, page.url, page.summary)
+        return page
+
+
+def test_warming_refreshes_popular_requests_within_the_llm_budget(shared_cache):
+    search = FakeSearch({"a.com": ["https://a.com/1", "https://a.com/2"], "b.com": ["https://b.com/1", "https://a.com/1"]})
+    stages = FakeStages()
+    popularity = Popularity(MemoryPopularity())
+
+    async def main():
+        await shared_cache.set(SUMMARY, "https://a.com/1", "Cached summary")
+        for _ in range(2):
+            await popularity.record("AI agents", ["a.com", "b.com"])
+        await popularity.record("Rare topic", ["c.com"])
+        warmer = CacheWarmer(popularity, top_n=1, llm_budget_tokens=100, interval=60, max_age=60, half_life=60,
+                             search_agent=search, page_stages=stages)
+        report = await warmer.warm()
+        return report, await warmer.warm(), [
+            await shared_cache.warmed_at(SUMMARY, "https://a.com/1"),
+            await shared_cache.warmed_at(SUMMARY, "https://a.com/2"),
+            await shared_cache.warmed_at(EXTRACTED, "https://b.com/1"),
+            await shared_cache.warmed_at(SEARCH, "AI agents:b.com"),
+        ]
+
+    report, second, warmed = asyncio.run(main())
+    # Only the most popular request is warmed, with fresh searches
+    assert search.searches == [("AI agents", "a.com", True), ("AI agents", "b.com", True)]
+    # The cached summary is kept, one new page fits the budget and the next waits for another run
+    assert report == {"refreshed": 1, "summarized": 1, "skipped_budget": 1, "llm_tokens": 100}
+    assert stages.summarized == ["https://a.com/2"]
+    assert second is None
+    assert warmed[0] and warmed[1] and warmed[2] is None and warmed[3]
@@ -0,0 +1,25 @@
+import asyncio
+import multiprocessing
+import operator
+
+from server.setting import SETTINGS
+from server.utils.cpu_pool import CpuOffloadPool
+
+
+def test_default_start_method_does_not_fork():
+    assert SETTINGS.cpu_pool.start_method in ("forkserver", "spawn")
+    assert SETTINGS.cpu_pool.start_method in multiprocessing.get_all_start_methods()
+
+
+def test_large_inputs_are_offloaded_to_worker_processes():
+    pool = CpuOffloadPool(max_workers=1, max_pending=1, start_method=SETTINGS.cpu_pool.start_method)
+
+    async def main():
+        inline = await pool.run(operator.add, 1, 2, size=1, threshold=10)
+        offloaded = await pool.run(operator.add, 3, 4, size=10, threshold=10)
+        return inline, offloaded, pool._executor is not None
+
+    try:
+        assert asyncio.run(main()) == (3, 7, True)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from server.agents.system_agents.content_editor.sessions import EditSessionStore
+
+
+def _store(**limits):
+    return EditSessionStore(**{"max_sessions": 10, "max_bytes": 1000, "idle_ttl": 60, **limits})
+
+
+def test_least_recently_used_sessions_are_evicted_first():
+    store = _store(max_sessions=2)
+    store.get_or_create("a", "u")
+    store.get_or_create("b", "u")
+    store.get("a")
+    store.get_or_create("c", "u")
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.get("c") is not None
+
+
+def test_idle_and_oversized_sessions_are_evicted():
+    store = _store(max_bytes=100)
+    idle = store.get_or_create("idle", "u")
+    idle.updated_at = time.time() - 120
+    big = store.get_or_create("big", "u")
+    big.size_bytes = 80
+    small = store.get_or_create("small", "u")
+    small.size_bytes = 30
+    store.update(store.get_or_create("new", "u"))
+    assert store.get("idle") is None
+    # Over the memory limit, the least recently used session goes first
+    assert store.get("big") is None
+    assert store.get("small") is small
+
+
+def test_sessions_mid_round_are_not_evicted():
+    async def main():
+        store = _store(max_sessions=1, idle_ttl=0.01)
+        busy = store.get_or_create("busy", "u")
+        async with busy.lock:
+            await asyncio.sleep(0.02)
+            store.get_or_create("other", "u")
+            return store.get("busy") is busy
+
+    assert asyncio.run(main())
+
+
+def test_a_session_dropped_while_waiting_is_kept_after_its_round():
+    store = _store(max_sessions=1)
+    session = store.get_or_create("a", "u")
+    store.get_or_create("b", "u")
+    assert store.get("a") is None
+    store.update(session)
+    assert store.get("a") is session
+
+
+def test_a_session_left_by_another_user_is_replaced():
+    store = _store()
+    stale = store.get_or_create("a", "mallory")
+    session = store.get_or_create("a", "alice")
+    assert session is not stale and session.user == "alice"
+
+
+def test_requests_of_other_users_do_not_touch_the_session():
+    from server.agents.system_agents.content_editor.agent import ContentEditorSystemAgent
+    from server.agents.system_agents.content_editor.sessions import SESSIONS
+    from server.agents.system_agents.content_editor.versions import get_version_store
+
+    async def main():
+        await get_version_store().add("owned-session", "alice", "A post.")
+        agent = ContentEditorSystemAgent(req_id="owned-session", user="mallory")
+        return [event async for event in agent.run("Make it shorter.")]
+
+    (event,) = asyncio.run(main())
+    assert "belongs to another user" in event
+    assert SESSIONS.get("owned-session") is None
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from server.jobs import Job, JobManager, JobStatus
+from server.jobs.store import MemoryJobStore, SqliteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryJobStore() if request.param == "memory" else SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_store_replays_events_after_a_sequence_number(store):
+    async def main():
+        job = Job(job_id="job", user="user", topic="topic")
+        await store.save_job(job)
+        for seq in range(1, 6):
+            await store.add_event(job.job_id, seq, f"event {seq}")
+        await store.trim_events(job.job_id, 1)
+        return (
+            await store.read_events(job.job_id),
+            await store.read_events(job.job_id, after=3),
+            await store.read_events(job.job_id, after=1, limit=2),
+        )
+
+    everything, resumed, limited = asyncio.run(main())
+    assert everything == [(seq, f"event {seq}") for seq in range(2, 6)]
+    assert resumed == [(4, "event 4"), (5, "event 5")]
+    assert limited == [(2, "event 2"), (3, "event 3")]
+
+
+def test_store_prunes_expired_and_orphaned_jobs(store):
+    now = time.time()
+
+    async def main():
+        jobs = {
+            "finished_old": Job(job_id="finished_old", user="u", topic="t", finished_at=now - 100),
+            "finished_new": Job(job_id="finished_new", user="u", topic="t", finished_at=now),
+            "orphaned": Job(job_id="orphaned", user="u", topic="t", status=JobStatus.RUNNING, created_at=now - 100),
+            "running": Job(job_id="running", user="u", topic="t", status=JobStatus.RUNNING),
+        }
+        for job in jobs.values():
+            await store.save_job(job)
+            await store.add_event(job.job_id, 1, "event")
+        await store.prune(finished_before=now - 50, created_before=now - 50)
+        return {job_id: (await store.get_job(job_id) is not None, len(await store.read_events(job_id))) for job_id in jobs}
+
+    assert asyncio.run(main()) == {
+        "finished_old": (False, 0),
+        "finished_new": (True, 1),
+        "orphaned": (False, 0),
+        "running": (True, 1),
+    }
+
+
+def test_concurrent_starts_of_a_job_run_it_once(store):
+    runs = []
+
+    def stream(job):
+        async def events():
+            runs.append(job.job_id)
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield f"event {i}"
+        return events()
+
+    async def main():
+        manager = JobManager(store, workers=1, max_queue=1, result_ttl=60, poll_interval=0.01)
+        first, second = await asyncio.gather(
+            manager.start(Job(job_id="job", user="u", topic="t"), stream),
+            manager.start(Job(job_id="job", user="u", topic="t"), stream),
+        )
+        # Subscribing right away waits for the job to be saved instead of ending early
+        events = [event async for _, event in manager.subscribe("job")]
+        job = await manager.get("job")
+        return first.job_id, second.job_id, events, job.status
+
+    assert asyncio.run(main()) == ("job", "job", ["event 0", "event 1", "event 2"], JobStatus.SUCCEEDED)
+    assert runs == ["job"]
+
+
+def test_concurrent_first_requests_for_a_stream_hold_no_slots_for_the_loser(monkeypatch):
+    from fastapi import HTTPException
+
+    import server.jobs
+    from server.api.handlers import content_handler
+    from server.utils import admission
+    from server.utils.admission import AdmissionController
+
+    manager = JobManager(MemoryJobStore(), workers=1, max_queue=1, result_ttl=60, poll_interval=0.01)
+    controller = AdmissionController(max_in_flight=4, max_queue=4, queue_timeout=1)
+    monkeypatch.setattr(server.jobs, "get_stream_manager", lambda: manager)
+    monkeypatch.setattr(admission, "_CONTROLLER", controller)
+
+    def create_agent_stream(*_):
+        async def events():
+            await asyncio.sleep(0.01)
+            yield "event"
+        return events()
+
+    class FakeRequest:
+        headers = {}
+
+    async def start():
+        try:
+            return await content_handler._resumable_content_stream(
+                "concurrent-stream", FakeRequest(), "concurrent-user", "t", [], create_agent_stream,
+            )
+        except HTTPException as e:
+            return e.status_code
+
+    async def main():
+        results = await asyncio.gather(start(), start())
+        await asyncio.gather(*manager._detached.values())
+        return results, controller.in_flight
+
+    (first, second), in_flight = asyncio.run(main())
+    assert second == 409 and first != 409
+    assert in_flight == 0
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from server.utils import cache
+from server.utils.llm import LLMClient, LLMError, chat_completions_endpoint
+
+AZURE = {
+    "model": "gpt-deployment",
+    "api_key": "secret",
+    "base_url": "https://example.openai.azure.com/",
+    "api_type": "azure",
+    "api_version": "2024-02-01",
+    "temperature": 0.2,
+}
+
+
+def completion(content, prompt_tokens=10):
+    return {
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 2, "total_tokens": prompt_tokens + 2},
+    }
+
+
+def client_with(handler, **kwargs):
+    client = LLMClient(AZURE, **kwargs)
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=client.headers)
+    return client
+
+
+def test_endpoints_follow_the_llm_config():
+    assert chat_completions_endpoint(AZURE) == (
+        "https://example.openai.azure.com/openai/deployments/gpt-deployment/chat/completions",
+        {"api-version": "2024-02-01"},
+        {"api-key": "secret"},
+    )
+    assert chat_completions_endpoint({"model": "gpt-4o", "api_key": "secret"}) == (
+        "https://api.openai.com/v1/chat/completions", {}, {"Authorization": "Bearer secret"},
+    )
+
+
+def test_complete_sends_one_request_with_the_configured_parameters():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=completion("# Markdown"))
+
+    reply = asyncio.run(client_with(handler).complete([{"role": "user", "content": "hi"}], max_tokens=5))
+    assert reply == "# Markdown"
+    (request,) = requests
+    assert request.url.path == "/openai/deployments/gpt-deployment/chat/completions"
+    assert request.url.params["api-version"] == "2024-02-01" and request.headers["api-key"] == "secret"
+    assert json.loads(request.content) == {"temperature": 0.2, "max_tokens": 5, "messages": [{"role": "user", "content": "hi"}]}
+
+
+def test_throttled_and_failed_calls_are_retried_then_raise():
+    statuses = iter([429, 503, 200])
+
+    def handler(request):
+        status = next(statuses)
+        if status == 200:
+            return httpx.Response(200, json=completion("done"))
+        return httpx.Response(status, headers={"Retry-After": "0"}, text="busy")
+
+    assert asyncio.run(client_with(handler, max_retries=2).complete([{"role": "user", "content": "hi"}])) == "done"
+
+    calls = []
+
+    def failing(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad request")
+
+    with pytest.raises(LLMError) as error:
+        asyncio.run(client_with(failing, max_retries=2).complete([{"role": "user", "content": "hi"}]))
+    # Client errors are not retried
+    assert error.value.status_code == 400 and len(calls) == 1
+
+
+def test_stream_yields_the_content_deltas():
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        chunks = [{"choices": [{"delta": {"content": word}}]} for word in ("Hello", " world")]
+        body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    async def main():
+        return [delta async for delta in client_with(handler).stream([{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(main()) == ["Hello", " world"]
+
+
+def test_cached_replies_skip_the_llm():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=completion(f"reply {len(calls)}"))
+
+    async def main():
+        client = client_with(handler, cache=True)
+        messages = [{"role": "user", "content": "hi"}]
+        return [await client.complete(messages), await client.complete(messages),
+                await client.complete(messages, cache=False)]
+
+    cache.close_cache()
+    try:
+        assert asyncio.run(main()) == ["reply 1", "reply 1", "reply 2"]
+    finally:
+        cache.close_cache()
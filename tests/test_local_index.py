@@ -0,0 +1,87 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from server.setting import SETTINGS
+from server.utils import local_index
+from server.utils.local_index import LocalIndex, MemoryLocalIndex, SqliteLocalIndex, query_terms
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def index(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryLocalIndex(max_documents=100)
+    else:
+        backend = SqliteLocalIndex(str(tmp_path / "index.sqlite3"), max_documents=100)
+    yield LocalIndex(backend)
+    backend.close()
+
+
+def test_query_terms_drop_stopwords_and_repeats():
+    assert query_terms("The future of AI and the AI agents") == ["future", "ai", "agents"]
+
+
+def test_search_ranks_pages_matching_every_term(index):
+    async def main():
+        await index.add("https://www.example.com/a", content="Credit unions invest in AI. AI helps members.")
+        await index.add("https://www.example.com/a", title="AI at credit unions", summary="AI for members.")
+        await index.add("https://blog.example.com/b", content="A note on AI and credit unions.")
+        await index.add("https://example.com/c", content="Credit unions and their members.")
+        await index.add("https://other.org/d", content="AI in credit unions, AI everywhere.")
+        return (
+            await index.search("AI credit unions", "example.com", 10, max_age=60),
+            await index.search("AI credit unions", None, 10, max_age=60),
+            await index.search("quantum", "example.com", 10, max_age=60),
+        )
+
+    site_hits, all_hits, none = asyncio.run(main())
+    assert [hit.url for hit in site_hits] == ["https://www.example.com/a", "https://blog.example.com/b"]
+    assert site_hits[0].title == "AI at credit unions" and site_hits[0].summary == "AI for members."
+    assert site_hits[0].score > site_hits[1].score > 0
+    assert {hit.url for hit in all_hits} == {"https://www.example.com/a", "https://blog.example.com/b", "https://other.org/d"}
+    assert none == []
+
+
+def test_stale_pages_are_skipped(index):
+    asyncio.run(index.add("https://example.com/a", content="AI news"))
+    assert asyncio.run(index.search("ai", None, 10, max_age=60))
+    time.sleep(0.02)
+    assert asyncio.run(index.search("ai", None, 10, max_age=0.01)) == []
+
+
+def test_memory_index_drops_the_oldest_pages():
+    index = MemoryLocalIndex(max_documents=2)
+    for name in "abc":
+        index.add(f"https://example.com/{name}", content="AI news")
+    assert sorted(hit.url for hit in index.search("ai", None, 10, 0)) == ["https://example.com/b", "https://example.com/c"]
+    assert "news" in index._postings and len(index._postings["news"]) == 2
+
+
+def test_search_is_served_locally_when_enough_pages_match(monkeypatch):
+    from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+    from server.agents.workflow_agents.azure_bing_search.types import WebHits
+
+    monkeypatch.setattr(SETTINGS, "local_index", SimpleNamespace(
+        enabled=True, store="memory", path="", max_age_seconds=60.0, min_results=0, max_documents=100,
+    ))
+    local_index.close_local_index()
+    agent = AzureBingSearchAgent()
+    agent.SEARCH_COUNT = 2
+
+    async def main():
+        index = local_index.get_local_index()
+        await index.add("https://example.com/a", title="Robots", summary="Robots in factories")
+        missing = await agent._local_search("robots", "example.com")
+        await index.add("https://example.com/b", title="More robots", summary="Robots at home")
+        return missing, await agent._bing_search("robots", "example.com")
+
+    try:
+        missing, found = asyncio.run(main())
+    finally:
+        local_index.close_local_index()
+    assert missing is None
+    # Bing is unreachable in tests, so these results can only come from the index
+    assert isinstance(found, WebHits)
+    assert sorted(hit.url for hit in found.web_results) == ["https://example.com/a", "https://example.com/b"]
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from server.utils.metrics import IN_FLIGHT_REQUESTS, InFlightRequestsMiddleware, Registry
+
+
+def test_registry_renders_counters_gauges_and_histograms():
+    registry = Registry()
+    requests = registry.counter("test_requests_total", "Requests.", ["path"])
+    depth = registry.gauge("test_depth", "Queue depth.")
+    latency = registry.histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    depth.set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_requests_total Requests.",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{path="/a\\"b"} 3',
+        "# HELP test_depth Queue depth.",
+        "# TYPE test_depth gauge",
+        "test_depth 7",
+        "# HELP test_latency_seconds Latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1"} 2',
+        'test_latency_seconds_bucket{le="+Inf"} 3',
+        "test_latency_seconds_sum 5.55",
+        "test_latency_seconds_count 3",
+    ]
+
+
+def test_registry_rejects_duplicates_and_wrong_labels():
+    registry = Registry()
+    counter = registry.counter("test_total", "Test.", ["stage"])
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Test.")
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, stage="x")
+
+
+def _call(app, path="/"):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    return InFlightRequestsMiddleware(app)({"type": "http", "path": path}, receive, send)
+
+
+def test_in_flight_requests_cover_streamed_bodies():
+    seen = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for chunk in (b"a", b"b"):
+            seen.append(IN_FLIGHT_REQUESTS.value())
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    before = IN_FLIGHT_REQUESTS.value()
+    asyncio.run(_call(streaming_app))
+    assert seen == [before + 1, before + 1]
+    assert IN_FLIGHT_REQUESTS.value() == before
+
+
+def test_in_flight_requests_are_released_when_the_body_never_starts():
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    async def cancelled_app(scope, receive, send):
+        # e.g. the client disconnected before the response started
+        raise asyncio.CancelledError
+
+    before = IN_FLIGHT_REQUESTS.value()
+    with pytest.raises(RuntimeError):
+        asyncio.run(_call(failing_app))
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_call(cancelled_app))
+    assert IN_FLIGHT_REQUESTS.value() == before
@@ -0,0 +1,57 @@
+from server.agents.workflow_agents.content_editor.paragraphs import (
+    contiguous_runs,
+    diff_paragraphs,
+    find_target_paragraphs,
+    format_paragraph_excerpt,
+    split_paragraphs,
+)
+
+POST = (
+    "Innovation starts with people.\n\n"
+    "We built a new platform for members.\n\n"
+    "It saves time every single day.\n\n"
+    "Our teams worked on it for a year.\n\n"
+    "What would you build next?\n\n"
+    "#AI #Tech"
+)
+
+
+def test_find_target_paragraphs_from_references():
+    paragraphs = split_paragraphs(POST)
+    assert find_target_paragraphs("Rework the second paragraph", paragraphs) == [1]
+    assert find_target_paragraphs("Shorten paragraph 3", paragraphs) == [2]
+    # The last prose paragraph, not the hashtags
+    assert find_target_paragraphs("Change the last sentence to a statement", paragraphs) == [4]
+    assert find_target_paragraphs("Use other hashtags", paragraphs) == [5]
+    assert find_target_paragraphs('Rephrase "saves time every"', paragraphs) == [2]
+    assert find_target_paragraphs("Punch up the hook and the fourth paragraph", paragraphs) == [0, 3]
+
+
+def test_find_target_paragraphs_leaves_whole_post_feedback_alone():
+    paragraphs = split_paragraphs(POST)
+    assert find_target_paragraphs("Make the whole post more formal", paragraphs) is None
+    assert find_target_paragraphs("Make it friendlier", paragraphs) is None
+    assert find_target_paragraphs("Fix paragraph 1, paragraph 2, paragraph 3 and paragraph 4", paragraphs) is None
+    assert find_target_paragraphs("Rework the second paragraph", ["Only one paragraph."]) is None
+
+
+def test_diff_paragraphs():
+    before = ["a", "b", "c"]
+    after = ["a", "B", "c", "d"]
+    assert diff_paragraphs(before, after) == [
+        {"op": "replace", "before_index": [1], "after_index": [1], "before": "b", "after": "B"},
+        {"op": "insert", "before_index": [], "after_index": [3], "before": "", "after": "d"},
+    ]
+    assert diff_paragraphs(before, before) == []
+
+
+def test_excerpt_gives_each_run_of_targets_its_own_context():
+    paragraphs = [f"P{i}" for i in range(7)]
+    assert contiguous_runs([0, 1, 4, 6]) == [[0, 1], [4], [6]]
+    assert format_paragraph_excerpt(paragraphs, [1, 5]).split("\n\n") == [
+        "[Context] P0", "[Revise 1] P1", "[Context] P2", "[...]",
+        "[Context] P4", "[Revise 2] P5", "[Context] P6", "(end of the post)",
+    ]
+    assert format_paragraph_excerpt(paragraphs, [0, 2]).split("\n\n") == [
+        "(start of the post)", "[Revise 1] P0", "[Context] P1", "[Revise 2] P2", "[Context] P3", "[...]",
+    ]
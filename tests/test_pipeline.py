@@ -0,0 +1,126 @@
+import asyncio
+import re
+
+from server.utils.pipeline import Pipeline, Stage
+
+
+def test_pipeline_runs_items_through_stages_and_fans_out():
+    async def expand(item):
+        return [item * 10, item * 10 + 1]
+
+    async def keep_odd(item):
+        return item if item % 2 else None
+
+    async def main():
+        pipeline = Pipeline("test_fan_out", [Stage("expand", expand, fan_out=True), Stage("keep_odd", keep_odd, workers=3)])
+        return [item async for item in pipeline.run(range(3))]
+
+    assert sorted(asyncio.run(main())) == [1, 11, 21]
+
+
+def test_pipeline_drops_items_whose_stage_fails():
+    async def fail_on_two(item):
+        if item == 2:
+            raise ValueError("boom")
+        return item
+
+    async def main():
+        pipeline = Pipeline("test_errors", [Stage("fail_on_two", fail_on_two)])
+        return [item async for item in pipeline.run([1, 2, 3])]
+
+    assert asyncio.run(main()) == [1, 3]
+
+
+def test_bounded_queues_make_upstream_wait_for_a_slow_stage():
+    produced = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def fast(item):
+            produced.append(item)
+            return item
+
+        async def slow(item):
+            await gate.wait()
+            return item
+
+        pipeline = Pipeline("test_backpressure", [
+            Stage("fast", fast, workers=1, max_queue=1),
+            Stage("slow", slow, workers=1, max_queue=1),
+        ])
+        results = []
+
+        async def consume():
+            async for item in pipeline.run(range(100)):
+                results.append(item)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        # One item in the slow worker, one in its queue, one held by the fast worker: the rest wait
+        in_flight = len(produced)
+        gate.set()
+        await consumer
+        return in_flight, results
+
+    in_flight, results = asyncio.run(main())
+    assert in_flight <= 3
+    assert sorted(results) == list(range(100))
+
+
+def test_emitted_items_are_yielded_with_the_results():
+    async def main():
+        pipeline = None
+
+        async def announce(item):
+            await pipeline.emit(f"status {item}")
+            return item
+
+        pipeline = Pipeline("test_emit", [Stage("announce", announce)])
+        return [item async for item in pipeline.run([1, 2])]
+
+    assert asyncio.run(main()) == ["status 1", 1, "status 2", 2]
+
+
+def test_content_creation_emits_web_data_per_page():
+    from server.agents.system_agents.content_creator.agent import ContentCreationSystemAgent
+    from server.agents.workflow_agents.azure_bing_search.types import BingSearchResponse, WebResult
+
+    agent = ContentCreationSystemAgent(req_id="test", user="user")
+
+    async def search(topic, source):
+        results = [
+            WebResult(title=f"{topic} on {source} {i}", url=f"https://{source}/{i}", snippet="", display_url=source)
+            for i in range(2)
+        ]
+        return BingSearchResponse(web_results=results, related_searches=[], images=[])
+
+    async def fetch_page(url):
+        return b"<html><body><p>page</p></body></html>"
+
+    async def parse_page(url, content):
+        return "<p>page</p>"
+
+    async def convert(url, content):
+        return f"# {url}"
+
+    async def summarize(markdown):
+        return f"summary of {markdown[2:]}"
+
+    agent.azure_bing_search_agent._bing_search = search
+    agent.web_content_extractor_agent.fetch_page = fetch_page
+    agent.web_content_extractor_agent.parse_page = parse_page
+    agent.web_content_extractor_agent.convert = convert
+    agent.web_content_summary_agent.run = summarize
+
+    async def main():
+        return [event async for event in agent._search_and_create_content("topic", ["a.test", "b.test"])]
+
+    events = asyncio.run(main())
+    web_data = re.findall(
+        r"<event_type>WEB_DATA</event_type><event_data>(.*?)</event_data><source>(.*?)</source>", "".join(events)
+    )
+    assert sorted(source for _, source in web_data) == [
+        "https://a.test/0", "https://a.test/1", "https://b.test/0", "https://b.test/1",
+    ]
+    assert all(summary == f"summary of {source}" for summary, source in web_data)
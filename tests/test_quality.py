@@ -0,0 +1,40 @@
+from server.utils.quality import evaluate_post, gate_reflection
+
+BODY = " ".join(["word"] * 340)
+GOOD_POST = f"{BODY}\n\nWhat would you build next?\n\n#AI #Tech"
+
+
+def test_evaluate_post_passes_a_post_following_the_guidelines():
+    report = evaluate_post(GOOD_POST)
+    assert report.words == 345
+    assert report.passed
+
+
+def test_evaluate_post_reports_each_failed_check():
+    report = evaluate_post("Too short.\n\n#AI")
+    assert set(report.failures) == {"length", "call_to_action", "hashtags"}
+
+    # Hashtags do not count as words, and the call to action is looked for before them
+    report = evaluate_post(f"{BODY}\n\nShare your thoughts below.\n\n#One #Two #Three")
+    assert report.passed
+
+
+def test_evaluate_post_checks_the_source_link_when_required():
+    url = "https://www.example.com/articles/1"
+    assert evaluate_post(GOOD_POST, source_url=url, require_source_link=True).failures == ["source_link"]
+    linked = GOOD_POST.replace("What", "Read it at https://example.com/articles/1 . What")
+    assert evaluate_post(linked, source_url=url, require_source_link=True).passed
+    # Not required: not checked
+    assert "source_link" not in evaluate_post(GOOD_POST, source_url=url).checks
+
+
+def test_gate_reflection_paths():
+    chat = {"max_turns": 3}
+    assert gate_reflection("test", GOOD_POST, chat, max_turns=3) is True
+
+    # One failed check gets a single critique turn
+    assert gate_reflection("test", GOOD_POST.replace(" #Tech", ""), chat, max_turns=3) is False
+    assert chat["max_turns"] == 1
+
+    assert gate_reflection("test", "Too short.", chat, max_turns=3) is False
+    assert chat["max_turns"] == 3
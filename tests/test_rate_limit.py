@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from server.utils.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimited,
+    RateLimiter,
+    SqliteRateLimitBackend,
+    charge_llm_tokens,
+    window_hit,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryRateLimitBackend()
+    else:
+        backend = SqliteRateLimitBackend(str(tmp_path / "limits.sqlite3"))
+    yield backend
+    backend.close()
+
+
+def limiter(backend, requests=0, tokens=0, streams=0):
+    return RateLimiter(backend, requests, window=60, tokens=tokens, cooldown=100, streams=streams, lease_seconds=60)
+
+
+def test_sliding_window_weights_the_previous_window():
+    state = None
+    for _ in range(4):
+        allowed, _, state = window_hit(state, limit=4, window=10, now=5)
+        assert allowed
+    allowed, retry_after, state = window_hit(state, limit=4, window=10, now=9)
+    assert not allowed and retry_after == 1
+
+    # A quarter into the next window, three quarters of the previous requests still count
+    allowed, _, state = window_hit(state, limit=4, window=10, now=12.5)
+    assert allowed
+    allowed, retry_after, state = window_hit(state, limit=4, window=10, now=12.5)
+    assert not allowed and retry_after == pytest.approx(2.5)
+    allowed, _, state = window_hit(state, limit=4, window=10, now=15)
+    assert allowed and state == (10, 2, 4)
+
+
+def test_requests_beyond_the_window_limit_are_rejected(backend):
+    async def main():
+        rate_limiter = limiter(backend, requests=2)
+        for _ in range(2):
+            await rate_limiter.admit("alice", stream=False)
+        with pytest.raises(RateLimited) as rejected:
+            await rate_limiter.admit("alice", stream=False)
+        # Limits are per user
+        await rate_limiter.admit("bob", stream=False)
+        return rejected.value
+
+    rejected = asyncio.run(main())
+    assert rejected.status_code == 429 and rejected.limit == "requests"
+    assert int(rejected.headers["Retry-After"]) >= 1
+
+
+def test_token_budget_goes_into_debt_and_refills(backend):
+    async def main():
+        rate_limiter = limiter(backend, tokens=100)
+        await rate_limiter.admit("alice", stream=False)
+        # The prompt that exhausts the budget is still sent; the next request waits for the refill
+        await rate_limiter.charge("alice", 150)
+        with pytest.raises(RateLimited) as rejected:
+            await rate_limiter.admit("alice", stream=False)
+        allowed, _ = backend.check_bucket("tokens:alice", 100, rate_limiter.rate, 1e12)
+        return rejected.value, allowed
+
+    rejected, refilled = asyncio.run(main())
+    assert rejected.limit == "tokens" and int(rejected.headers["Retry-After"]) >= 50
+    assert refilled
+
+
+def test_stream_slots_are_released_when_the_stream_ends(backend):
+    async def stream():
+        charge_llm_tokens(30)
+        yield 1
+        charge_llm_tokens(20)
+        yield 2
+
+    async def main():
+        rate_limiter = limiter(backend, tokens=1000, streams=1)
+        lease = await rate_limiter.admit("alice")
+        with pytest.raises(RateLimited) as rejected:
+            await rate_limiter.admit("alice")
+        assert rejected.value.limit == "streams"
+        # Outside a guarded stream nothing is charged
+        charge_llm_tokens(500)
+        assert [item async for item in lease.guard(stream())] == [1, 2]
+
+        # A lease whose stream never starts is released explicitly, and only once
+        lease = await rate_limiter.admit("alice")
+        await lease.release()
+        await lease.release()
+        await (await rate_limiter.admit("alice")).release()
+
+        # A stream cancelled while it runs still frees its slot
+        async def endless():
+            while True:
+                await asyncio.sleep(1)
+                yield 0
+
+        consumer = asyncio.create_task(anext((await rate_limiter.admit("alice")).guard(endless())))
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        await (await rate_limiter.admit("alice")).release()
+        return backend.check_bucket("tokens:alice", 1000, 0, 0)
+
+    assert asyncio.run(main()) == (True, 0.0)
+    if isinstance(backend, MemoryRateLimitBackend):
+        assert backend._states["tokens:alice"][0] == pytest.approx(950, abs=1)
+
+
+def test_expired_stream_slots_are_reclaimed(backend):
+    assert backend.acquire_lease("alice", "a", 1, expires_at=10, now=0)
+    assert not backend.acquire_lease("alice", "b", 1, expires_at=20, now=5)
+    assert backend.acquire_lease("alice", "b", 1, expires_at=20, now=11)
+
+
+def test_slots_of_a_response_whose_body_never_starts_are_released(backend):
+    from server.api.handlers.content_handler import _PipelineResponse
+    from server.utils.admission import AdmissionController
+
+    started = []
+
+    async def stream():
+        started.append(True)
+        yield "event"
+
+    async def disconnected(message):
+        raise OSError("client went away")
+
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        rate_limiter = limiter(backend, streams=1)
+        ticket, lease = await controller.admit("test"), await rate_limiter.admit("alice")
+        response = _PipelineResponse(stream(), ticket, lease, media_type="application/json")
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, disconnected)
+        # Both slots are free again, although the stream never ran
+        (await controller.admit("test")).release()
+        await (await rate_limiter.admit("alice")).release()
+        return controller.in_flight
+
+    assert asyncio.run(main()) == 0
+    assert not started
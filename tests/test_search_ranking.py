@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from server.agents.workflow_agents.azure_bing_search.agent import AzureBingSearchAgent
+from server.agents.workflow_agents.azure_bing_search.ranking import rank_results
+from server.agents.workflow_agents.azure_bing_search.types import WebHit, WebResult
+from server.setting import SETTINGS
+
+
+def result(title, snippet="", **fields):
+    return WebResult(title=title, url=f"https://example.com/{title}", snippet=snippet, display_url="example.com", **fields)
+
+
+def titles(ranked):
+    return [item.result.title for item in ranked]
+
+
+def test_results_covering_the_topic_in_stronger_fields_rank_first():
+    results = [
+        result("Cooking tips", "Nothing about the topic"),
+        result("Latest news", "How <b>credit unions</b> use AI agents"),
+        result("AI agents at credit unions"),
+        result("Banking", keywords="credit union, ai agent"),
+    ]
+    ranked = rank_results("AI agents for credit unions", results, top_k=3, min_score=0.2)
+    assert titles(ranked) == ["AI agents at credit unions", "Banking", "Latest news"]
+    assert ranked[0].score > ranked[1].score > ranked[2].score
+
+
+def test_results_in_other_languages_and_below_the_minimum_score_are_dropped():
+    results = [
+        result("AI agents", language="de"),
+        result("Unrelated page"),
+        result("AI agents explained", language="en-US"),
+    ]
+    assert titles(rank_results("AI agents", results, top_k=5, min_score=0.2, language="en")) == ["AI agents explained"]
+    # Without a language every language is kept
+    assert titles(rank_results("AI agents", results, top_k=5, min_score=0.2)) == ["AI agents", "AI agents explained"]
+
+
+def test_the_best_result_is_kept_when_none_scores_high_enough():
+    hits = [WebHit(title=title, url=f"https://example.com/{title}", snippet="", raw={}) for title in ("One", "Agents")]
+    assert titles(rank_results("AI agents", hits, top_k=2, min_score=0.9)) == ["Agents"]
+
+
+def test_the_search_agent_requests_more_results_than_it_fetches(monkeypatch):
+    ranking = SimpleNamespace(enabled=True, search_count=10, top_k=2, min_score=0.2, language="en")
+    monkeypatch.setattr(SETTINGS, "search_ranking", ranking)
+    agent = AzureBingSearchAgent()
+    assert (agent.SEARCH_COUNT, agent.fetch_count) == (10, 2)
+
+    results = [result(f"Page {i}") for i in range(4)] + [result("AI agents"), result("AI agents today")]
+    assert [item.title for item in agent.select_results("AI agents", results)] == ["AI agents", "AI agents today"]
+
+    monkeypatch.setattr(SETTINGS, "search_ranking", SimpleNamespace(**{**vars(ranking), "enabled": False}))
+    assert AzureBingSearchAgent().select_results("AI agents", results) == results
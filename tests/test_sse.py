@@ -0,0 +1,12 @@
+from server.utils.sse import format_sse, parse_agent_event
+
+
+def test_format_sse_splits_multi_line_data():
+    assert format_sse(3, "first\nsecond") == "id: 3\ndata: first\ndata: second\n\n"
+    assert format_sse(4, "done", event="end") == "id: 4\nevent: end\ndata: done\n\n"
+
+
+def test_parse_agent_event():
+    event = "<event_type>WEB_DATA</event_type><event_data>a\nb</event_data><source>https://a.test</source>"
+    assert parse_agent_event(event) == {"type": "WEB_DATA", "data": "a\nb", "source": "https://a.test"}
+    assert parse_agent_event("<status>data_message</status><data>post</data>") is None
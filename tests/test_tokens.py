@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+
+from server.setting import SETTINGS
+from server.utils import tokens
+from server.utils.tokens import PromptBudget, Tokenizer, compress, get_prompt_budget
+
+
+class WordEncoding:
+    """One token per whitespace separated word, so counts are easy to check."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split(" ")
+
+    def decode(self, words):
+        return " ".join(words)
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    tokenizer = Tokenizer("test")
+    tokenizer._encoding = WordEncoding()
+    monkeypatch.setattr(tokens, "_TOKENIZER", tokenizer)
+    return tokenizer
+
+
+@pytest.fixture
+def budget_settings(monkeypatch):
+    def configure(enabled=True, compress=True):
+        monkeypatch.setattr(SETTINGS, "token_budget", SimpleNamespace(enabled=enabled, compress=compress))
+    configure()
+    return configure
+
+
+def test_tokenizer_estimates_until_the_encoding_is_loaded(monkeypatch):
+    tokenizer = Tokenizer("missing")
+    monkeypatch.setattr(tokenizer, "_start_loading", lambda: None)
+    assert not tokenizer.exact
+    assert tokenizer.count("") == 0
+    assert tokenizer.count("abcdefgh") == 2
+    assert tokenizer.truncate("abcdefgh", 1) == "abcd"
+
+
+def test_truncate_prefers_a_line_boundary(tokenizer):
+    text = "one two three four five six seven eight nine\n ten eleven"
+    assert tokenizer.truncate(text, 20) == text
+    assert tokenizer.truncate(text, 10) == "one two three four five six seven eight nine"
+    assert tokenizer.truncate(text, 3) == "one two three"
+
+
+def test_compress_drops_boilerplate_and_keeps_content():
+    footer = "Subscribe to our newsletter for weekly updates"
+    page = "\n".join([
+        "* [Home](/)", "* [News](/news)", "* [About](/about)", "* [Contact](/contact)",
+        "# Title", "", "", "",
+        "Some    text   here.", footer,
+        "  - nested item", "}", "}",
+        "Sources:", "https://example.com/a",
+        footer,
+    ])
+    assert compress(page) == "\n".join([
+        "# Title", "",
+        "Some text here.", footer,
+        "  - nested item", "}", "}",
+        "Sources:", "https://example.com/a",
+    ])
+
+
+def test_prompt_budget_fits_content_into_the_remaining_tokens(tokenizer, budget_settings):
+    budget_settings(compress=False)
+    budget = PromptBudget("test", "Topic: {topic} Data: {data}", 20)
+    fixed = budget.fixed_tokens
+
+    prompt = budget.fit("data", "short", topic="ai")
+    assert prompt == "Topic: ai Data: short"
+
+    content = " ".join(f"w{i}" for i in range(100))
+    prompt = budget.fit("data", content, topic="ai")
+    kept = prompt[len("Topic: ai Data: "):].split(" ")
+    assert kept == [f"w{i}" for i in range(20 - fixed - 1)]
+
+
+def test_lossless_budget_never_changes_the_content(tokenizer, budget_settings):
+    budget = PromptBudget("test", "{content}", 5, lossless=True)
+    content = " ".join(["word"] * 50) + "\n\n\n\n" + " ".join(["word"] * 50)
+    assert budget.fit("content", content) == content
+
+
+def test_disabled_budget_sends_content_as_is(tokenizer, budget_settings):
+    budget_settings(enabled=False)
+    content = " ".join(["word"] * 50)
+    assert PromptBudget("test", "{data}", 5).fit("data", content) == content
+    budget_settings(enabled=True)
+    assert PromptBudget("test", "{data}", 0).fit("data", content) == content
+
+
+def test_fixed_tokens_are_counted_once_the_encoding_is_loaded(monkeypatch):
+    tokenizer = Tokenizer("test")
+    monkeypatch.setattr(tokenizer, "_start_loading", lambda: None)
+    monkeypatch.setattr(tokens, "_TOKENIZER", tokenizer)
+    budget = get_prompt_budget("test", "Summarize: {data}", 100, "You are a helpful assistant")
+    assert get_prompt_budget("test", "Summarize: {data}", 100, "You are a helpful assistant") is budget
+
+    # Estimates are not kept while the encoding loads
+    estimated = budget.fixed_tokens
+    tokenizer._encoding = WordEncoding()
+    assert budget.fixed_tokens == 5 + 2 + 2 * tokens.MESSAGE_OVERHEAD_TOKENS != estimated
+    tokenizer._encoding = None
+    assert budget.fixed_tokens == 5 + 2 + 2 * tokens.MESSAGE_OVERHEAD_TOKENS
+
+
+def test_only_text_that_can_be_sent_is_tokenized(tokenizer, budget_settings):
+    encoded = []
+    encode = tokenizer._encoding.encode
+    tokenizer._encoding.encode = lambda text, disallowed_special=(): encoded.append(len(text)) or encode(text)
+
+    page = "\n".join(f"Paragraph {i} of a long page." for i in range(10000))
+    prompt = PromptBudget("test", "{data}", 50).fit("data", page)
+    assert prompt.startswith("Paragraph 0 of")
+    assert max(encoded) <= 50 * tokens._MAX_CHARS_PER_TOKEN
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from server.utils.tracing import (
+    FileSpanExporter,
+    Tracer,
+    current_span,
+    load_spans,
+    set_tracer,
+    start_span,
+    trace_generator,
+)
+
+
+class _ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter():
+    exporter = _ListExporter()
+    set_tracer(Tracer(exporter=exporter))
+    yield exporter
+    set_tracer(Tracer(exporter=None))
+
+
+def test_traced_generator_span_is_not_active_between_items(exporter):
+    async def steps():
+        for step in range(2):
+            with start_span(f"step {step}"):
+                await asyncio.sleep(0)
+            yield step
+
+    async def main():
+        seen = []
+        with start_span("request") as request:
+            async for step in trace_generator("generator", steps()):
+                # The consumer still sees its own span, not the generator's
+                seen.append(current_span() is request)
+        return seen, current_span()
+
+    seen, after = asyncio.run(main())
+    assert seen == [True, True]
+    assert after is None
+
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {"request", "generator", "step 0", "step 1"}
+    assert spans["generator"].parent_span_id == spans["request"].span_id
+    assert spans["step 0"].parent_span_id == spans["generator"].span_id
+    assert spans["step 1"].parent_span_id == spans["generator"].span_id
+
+
+def test_traced_generator_records_errors_and_early_close(exporter):
+    async def failing():
+        yield 1
+        raise RuntimeError("boom")
+
+    async def endless():
+        while True:
+            yield 1
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async for _ in trace_generator("failing", failing()):
+                pass
+        generator = trace_generator("closed", endless())
+        await generator.__anext__()
+        await generator.aclose()
+
+    asyncio.run(main())
+    spans = {span.name: span for span in exporter.spans}
+    assert spans["failing"].status == "ERROR"
+    assert spans["closed"].status == "UNSET"
+    assert spans["closed"].end_ns is not None
+
+
+def test_file_exporter_writes_spans_from_a_background_thread(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    exporter = FileSpanExporter(path)
+    tracer = Tracer(exporter=exporter)
+    for step in range(3):
+        with tracer.start_span(f"step {step}"):
+            pass
+    assert exporter.flush(timeout=5)
+    assert [span["name"] for span in load_spans(path)] == ["step 0", "step 1", "step 2"]
+
+    with tracer.start_span("last"):
+        pass
+    tracer.close()
+    assert load_spans(path)[-1]["name"] == "last"
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from server.agents.system_agents.content_editor.versions import (
+    MemoryVersionStore,
+    SqliteVersionStore,
+    VersionOwnerError,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryVersionStore(max_versions=3)
+    else:
+        store = SqliteVersionStore(str(tmp_path / "versions.sqlite3"), max_versions=3)
+    yield store
+    store.close()
+
+
+def test_versions_are_numbered_and_trimmed(store):
+    async def main():
+        numbers = [await store.add("req", "user", f"post {i}") for i in range(1, 6)]
+        return numbers, await store.latest("req"), await store.list("req"), await store.owner("req")
+
+    numbers, latest, versions, owner = asyncio.run(main())
+    assert numbers == [1, 2, 3, 4, 5]
+    assert latest == (5, "post 5")
+    assert versions == [(3, "post 3"), (4, "post 4"), (5, "post 5")]
+    assert owner == "user"
+
+
+def test_versions_belong_to_one_user(store):
+    async def main():
+        await store.add("req", "user", "post")
+        await store.add("req", "other", "post")
+
+    with pytest.raises(VersionOwnerError):
+        asyncio.run(main())
+
+
+def test_sqlite_versions_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "versions.sqlite3")
+    first, second = SqliteVersionStore(path, max_versions=20), SqliteVersionStore(path, max_versions=20)
+
+    async def main():
+        await first.add("req", "user", "from the first worker")
+        await second.add("req", "user", "from the second worker")
+        return await first.list("req")
+
+    try:
+        assert asyncio.run(main()) == [(1, "from the first worker"), (2, "from the second worker")]
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+from server.setting import SETTINGS
+from server.utils import warmup
+
+
+def test_warmup_times_every_step_and_then_reports_ready(monkeypatch):
+    monkeypatch.setattr(SETTINGS, "warmup", SimpleNamespace(
+        preimport=False, blocking=False, llm_call=False, step_timeout_seconds=0.05,
+    ))
+    monkeypatch.setattr(warmup, "_READY", False)
+    monkeypatch.setattr(warmup, "_REPORT", {})
+    ran = []
+
+    async def step(name, seconds=0.0, error=None):
+        ran.append(name)
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+
+    monkeypatch.setattr(warmup, "warmup_steps", lambda: [
+        ("first", lambda: step("first")),
+        ("broken", lambda: step("broken", error=RuntimeError("no route to host"))),
+        ("slow", lambda: step("slow", seconds=1)),
+        ("last", lambda: step("last")),
+    ])
+
+    async def main():
+        task = warmup.start_warmup()
+        await asyncio.sleep(0)
+        assert not warmup.is_ready()
+        return await task
+
+    report = asyncio.run(main())
+    # A failing or hanging step does not keep the worker out of rotation
+    assert ran == ["first", "broken", "slow", "last"]
+    assert {name: step["status"] for name, step in report.items()} == {
+        "first": "ok", "broken": "failed", "slow": "timeout", "last": "ok",
+    }
+    assert report["slow"]["seconds"] < 1
+    assert warmup.is_ready() and warmup.warmup_report() == report
+
+
+def test_steps_follow_the_settings(monkeypatch):
+    monkeypatch.setattr(SETTINGS, "warmup", SimpleNamespace(
+        preimport=True, blocking=False, llm_call=True, step_timeout_seconds=30.0,
+    ))
+    assert [name for name, _ in warmup.warmup_steps()] == ["preimport", "agents", "connections", "tokenizer", "llm"]
+
+    monkeypatch.setattr(SETTINGS, "warmup", SimpleNamespace(
+        preimport=False, blocking=False, llm_call=False, step_timeout_seconds=30.0,
+    ))
+    assert [name for name, _ in warmup.warmup_steps()] == ["connections", "tokenizer"]
+
+
+def test_connections_step_opens_the_bing_and_llm_pools(monkeypatch):
+    import httpx
+
+    from server.utils import http, llm
+
+    hosts = []
+
+    def handler(request):
+        hosts.append((request.method, request.url.host))
+        return httpx.Response(405)
+
+    client = llm.LLMClient({"model": "m", "api_key": "k", "base_url": "https://llm.example.com", "api_type": "azure",
+                            "api_version": "2024-02-01"})
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http, "_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm, "_CLIENT", client)
+    monkeypatch.setattr(SETTINGS, "llm_client", SimpleNamespace(enabled=True))
+
+    asyncio.run(warmup._open_connections())
+    assert sorted(hosts) == sorted([("HEAD", "llm.example.com"), ("HEAD", "127.0.0.1")])